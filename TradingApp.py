@@ -1,15 +1,27 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-from datetime import datetime, timedelta
-import pytz
-import json
+from datetime import datetime
+import functools
 import os
-import time
-import pandas_ta as ta
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import random
+import uuid
+from market_data import quote_cache
+from bar_store import bar_store
+from indicators import indicator_engine, indicator_name
+import chart_pipeline
+from chart_pipeline import CANDLE_BUDGET, finer_interval, line_trace
+from order_engine import LIMIT, STOP, TRAILING
+from journal import session_journal, journal_for
+from trading_core import trading_core
+from storage import Trade
+from news_store import news_store, news_prefetcher
+from tracing import tracer
+from learn_content import LEARN_VIDEOS, QUIZ_BANK
+from price_feed import price_feed
+from backtest import backtest, STRATEGIES, STRATEGY_LABELS, EXIT_REASONS
+from ledger import LotLedger, analyze_matches
+from portfolio_analytics import PortfolioAnalytics
+from screener import screen, CROSSES
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -21,74 +33,109 @@ st.set_page_config(
 # --- App Title ---
 st.title("🚀 Odyssey Trading Terminal")
 
-# --- Helper Functions (Backend Logic) ---
-def is_market_open():
-    """Checks if the NYSE market is open."""
-    tz = pytz.timezone('US/Eastern')
-    now = datetime.now(tz)
-    # Market is open 9:30 AM to 4:00 PM ET, Mon-Fri
-    return not (now.weekday() > 4 or now.hour < 9 or (now.hour == 9 and now.minute < 30) or now.hour >= 16)
+# --- Tracing ---
+# One trace per rerun, keyed by session so a rerun cut short by st.rerun() is closed by the next one.
+tracer.begin("rerun", key=st.session_state.setdefault('feed_owner', uuid.uuid4().hex))
 
+# --- Helper Functions (Backend Logic) ---
 def get_current_price(ticker):
-    """Fetches the current market price of a stock."""
-    try:
-        stock = yf.Ticker(ticker)
-        price = stock.info.get('regularMarketPrice')
-        # Fallback to previous close if live price isn't available
-        return price if price else stock.info.get('previousClose')
-    except Exception:
-        return None
+    """Fetches the current market price of a stock from the shared quote cache."""
+    return quote_cache.get_price(ticker)
+
+def get_current_prices(tickers):
+    """Fetches current prices for many stocks in one batch. Returns (prices, errors)."""
+    return quote_cache.get_prices(tickers)
+
+def get_refresh_interval():
+    """Returns the live-refresh interval in seconds, or None when auto-refresh is off."""
+    return st.session_state.get('refresh_seconds', 30) if st.session_state.get('auto_refresh') else None
+
+def traced_fragment(name, fn):
+    """Wraps a fragment body in a span; a fragment-only rerun becomes its own trace."""
+    @functools.wraps(fn)
+    def run():
+        with tracer.span(name, root=True): fn()
+    return run
+
+def subscribe_live(ticker, interval):
+    """Renews this session's price-feed subscription for ``ticker``; returns its latest tick."""
+    price_feed.subscribe(ticker, st.session_state.setdefault('feed_owner', uuid.uuid4().hex), interval)
+    return price_feed.latest(ticker)
+
+# Account data lives in the trading core; a saved session holds only these per-account preferences.
+# Anything else in session_state (form widgets, older saves' account keys) is neither saved nor loaded.
+PREFERENCE_KEYS = ('watchlist', 'main_ticker', 'chart_period', 'chart_interval', 'show_ema20', 'show_sma10', 'show_sma20', 'show_sma50', 'show_ema200', 'auto_refresh', 'refresh_seconds')
+DEFAULT_ACCOUNT = "default"
 
 def save_state():
-    """Saves the session state to a JSON file."""
-    state_to_save = {key: val for key, val in st.session_state.items() if isinstance(val, (int, float, str, list, dict, bool))}
-    with open("portfolio.json", 'w') as f:
-        json.dump(state_to_save, f, indent=4)
+    """Appends the account's preference changes since the last save to its journal."""
+    state_to_save = {key: st.session_state[key] for key in PREFERENCE_KEYS if key in st.session_state}
+    journal_for(f"account_{st.session_state.account.id}").save(state_to_save)
     st.toast("Session Saved!", icon="💾")
 
 def load_state():
-    """Loads the session state from a JSON file."""
-    if os.path.exists("portfolio.json"):
-        with open("portfolio.json", 'r') as f:
-            data = json.load(f)
-            for key, val in data.items():
-                st.session_state[key] = val
+    """Loads the account's preferences from the latest snapshot plus the journal tail.
+
+    Runs as a button callback, before any widget whose key it writes is drawn.
+    """
+    data = journal_for(f"account_{st.session_state.account.id}").load()
+    if data is not None:
+        for key in PREFERENCE_KEYS:
+            if key in data: st.session_state[key] = data[key]
         st.toast("Session Loaded!", icon="📂")
 
+def switch_account(name):
+    """Points this session at account ``name``, creating it if needed."""
+    account, created = trading_core.open(name)
+    if created and name == DEFAULT_ACCOUNT and session_journal.exists():
+        trading_core.store.import_state(account.id, session_journal.load())  # carry over the single-user save file
+    st.session_state.account = account
+    for key in ('ledger', 'analytics'): st.session_state.pop(key, None)
+
 # --- Initialize Session State ---
-if 'cash_balance' not in st.session_state:
-    st.session_state.cash_balance = 100000.0
-    st.session_state.portfolio = {}
-    st.session_state.trade_history = []
+if 'account' not in st.session_state:
+    switch_account(DEFAULT_ACCOUNT)
     st.session_state.watchlist = ['AAPL', 'MSFT', 'GOOGL', 'TSLA']
     st.session_state.main_ticker = "NVDA"
     st.session_state.show_order_form = False
+with tracer.span("sync_account"): st.session_state.account.sync()
+account = st.session_state.account
+
+def watched_symbols():
+    """The symbols this session follows: the charted ticker, holdings and the watchlist."""
+    return {st.session_state.main_ticker, *account.positions, *st.session_state.watchlist}
+news_prefetcher.watch(st.session_state.feed_owner, watched_symbols())
+
+# Chart overlay colors and line widths, keyed by indicator column name
+OVERLAY_STYLES = {'EMA_20': ('orange', 1), 'SMA_10': ('blue', 1), 'SMA_20': ('red', 1), 'SMA_50': ('green', 1), 'EMA_200': ('purple', 1.5)}
+
+# Screener column headers, keyed by the column names screener.screen returns
+SCREEN_LABELS = {'as_of': 'As Of', 'price': 'Price', 'change_pct': 'Change', 'volume': 'Volume', 'volume_ratio': 'Vol / 20d Avg', 'RSI_14': 'RSI (14)', 'EMA_20': 'EMA (20)', 'SMA_50': 'SMA (50)', 'SMA_200': 'SMA (200)',
+                 'EMA_20>SMA_50': 'EMA 20 > SMA 50', 'EMA_20xSMA_50': 'EMA 20 / SMA 50 Cross (bars ago)', 'SMA_50>SMA_200': 'SMA 50 > SMA 200', 'SMA_50xSMA_200': 'SMA 50 / SMA 200 Cross (bars ago)'}
+
+# --- Trade Ledger ---
+def get_ledger():
+    """Returns this session's FIFO lot ledger, folding in any trades recorded since the last call."""
+    ledger = st.session_state.get('ledger')
+    if ledger is None or ledger.n > len(account.trades):
+        ledger = st.session_state.ledger = LotLedger()
+    ledger.extend(account.trades)
+    return ledger
+
+def get_portfolio_analytics():
+    """Returns this session's equity-curve analytics, updated with new trades and bars."""
+    if 'analytics' not in st.session_state: st.session_state.analytics = PortfolioAnalytics()
+    return st.session_state.analytics.update(account.trades)
 
 # --- Automatic Order Checking ---
+ORDER_REASONS = {STOP: "Stop-Loss", LIMIT: "Take-Profit", TRAILING: "Trailing-Stop"}
+
 def check_orders():
-    if not is_market_open(): return
-    for ticker in list(st.session_state.portfolio):
-        if ticker not in st.session_state.portfolio: continue
-        data = st.session_state.portfolio[ticker]
-        price = get_current_price(ticker)
-        if not price: continue
-        
-        reason = None
-        if data.get('stop_loss') and price <= data['stop_loss']:
-            reason = "Stop-Loss"
-        elif data.get('take_profit') and price >= data['take_profit']:
-            reason = "Take-Profit"
-        
-        if reason:
-            st.toast(f"{reason} triggered for {ticker}!", icon="🔔")
-            shares_to_sell = data['shares']
-            proceeds = price * shares_to_sell
-            avg_price = st.session_state.portfolio[ticker]['avg_price']
-            profit_loss = (price - avg_price) * shares_to_sell
-            st.session_state.cash_balance += proceeds
-            del st.session_state.portfolio[ticker]
-            st.session_state.trade_history.append({'timestamp': datetime.now().isoformat(), 'type': 'SELL', 'ticker': ticker, 'shares': shares_to_sell, 'price': price, 'profit_loss': profit_loss})
-            st.rerun()
+    fills = account.check_orders()
+    for order, result in fills:
+        if result.error: continue     # already closed, possibly by another session on this account
+        st.toast(f"{ORDER_REASONS[order.kind]} triggered for {order.ticker}!", icon="🔔")
+    if fills: st.rerun()
 
 # --- Main two-column layout ---
 col1, col2 = st.columns([1, 2])
@@ -97,27 +144,44 @@ col1, col2 = st.columns([1, 2])
 with col1:
     st.header("⚙️ Control Panel")
     
-    with st.container(border=True):
+    with st.container(border=True), tracer.span("section.account"):
         st.subheader("💰 Account")
-        st.metric("Cash Balance", f"${st.session_state.cash_balance:,.2f}")
+        accounts = trading_core.accounts()
+        chosen = st.selectbox("Account", accounts, index=accounts.index(account.name))
+        if chosen != account.name: switch_account(chosen); st.rerun()
+        new_col, create_col = st.columns([2, 1], vertical_alignment="bottom")
+        new_account = new_col.text_input("New Account", key="new_account").strip()
+        if create_col.button("Create", use_container_width=True) and new_account: switch_account(new_account); st.rerun()
+        st.metric("Cash Balance", f"${account.cash:,.2f}")
         save_col, load_col = st.columns(2)
-        if save_col.button("Save Session", use_container_width=True): save_state()
-        if load_col.button("Load Session", use_container_width=True): load_state(); st.rerun()
+        save_col.button("Save Session", use_container_width=True, on_click=save_state)
+        load_col.button("Load Session", use_container_width=True, on_click=load_state)
 
-    with st.container(border=True):
+    with st.container(border=True), tracer.span("section.market_info"):
         st.subheader("📈 Market Info")
-        st.session_state.main_ticker = st.text_input("Stock Ticker", st.session_state.main_ticker).upper()
+        # Keyed so Load Session and the screener can set it; they write it from callbacks, before it is drawn.
+        st.text_input("Stock Ticker", key="main_ticker", on_change=lambda: st.session_state.update(main_ticker=st.session_state.main_ticker.upper()))
         current_price = get_current_price(st.session_state.main_ticker)
         st.session_state.current_price_for_calc = current_price if current_price else 0.0
         
         price_col, market_status_col = st.columns(2)
-        price_col.metric("Current Price", f"${current_price:,.2f}" if current_price else "N/A")
-        if is_market_open():
+
+        def live_price_metric():
+            refresh = get_refresh_interval()
+            tick = subscribe_live(st.session_state.main_ticker, refresh) if refresh else None
+            if tick:
+                st.session_state.current_price_for_calc = tick.price
+                st.metric("Current Price", f"${tick.price:,.2f}", f"{tick.price - tick.prev:+,.2f}" if tick.prev else None,
+                          chart_data=[price for _, price in price_feed.history(st.session_state.main_ticker)])
+            else:
+                st.metric("Current Price", f"${current_price:,.2f}" if current_price else "N/A")
+        with price_col: st.fragment(traced_fragment("fragment.live_price", live_price_metric), run_every=get_refresh_interval())()
+        if trading_core.is_open():      # the same hours check that gates orders
             market_status_col.success("Market is Open")
         else:
             market_status_col.error("Market is Closed")
 
-    with st.expander("▶️ Place New Order"):
+    with st.expander("▶️ Place New Order"), tracer.span("section.order_form"):
         st.subheader("New Order")
         shares_input = st.number_input("Shares", min_value=1, step=1, key="shares")
 
@@ -144,60 +208,37 @@ with col1:
             sl_col1.number_input("Price", key="sl_price_form", step=0.01, format="%.2f", on_change=update_ticks_from_price, args=('sl',))
             sl_col2.number_input("Ticks", key="sl_ticks_form", step=1, on_change=update_price_from_ticks, args=('sl',))
 
+        ts_enabled = st.checkbox("Trailing stop")
+        if ts_enabled:
+            st.number_input("Trail by ($)", key="ts_offset_form", min_value=0.01, value=1.00, step=0.01, format="%.2f")
+
         buy_col, sell_col = st.columns(2)
         if buy_col.button("Submit Buy Order", use_container_width=True):
-            if not is_market_open(): st.error("Market is closed.")
-            else:
-                price = st.session_state.current_price_for_calc
-                sl_price = st.session_state.get('sl_price_form') if sl_enabled else None
-                tp_price = st.session_state.get('tp_price_form') if tp_enabled else None
-                valid_trade = True
-                if sl_enabled and sl_price >= price: st.error("Stop-Loss must be below current price."); valid_trade = False
-                if tp_enabled and tp_price <= price: st.error("Take-Profit must be above current price."); valid_trade = False
-                
-                if valid_trade:
-                    cost = price * shares_input
-                    if st.session_state.cash_balance >= cost:
-                        st.session_state.cash_balance -= cost
-                        if st.session_state.main_ticker in st.session_state.portfolio:
-                            current_shares = st.session_state.portfolio[st.session_state.main_ticker]['shares']
-                            current_cost = st.session_state.portfolio[st.session_state.main_ticker]['avg_price'] * current_shares
-                            total_shares = current_shares + shares_input
-                            total_cost = current_cost + cost
-                            st.session_state.portfolio[st.session_state.main_ticker]['avg_price'] = total_cost / total_shares
-                            st.session_state.portfolio[st.session_state.main_ticker]['shares'] = total_shares
-                        else: st.session_state.portfolio[st.session_state.main_ticker] = {'shares': shares_input, 'avg_price': price}
-                        st.session_state.portfolio[st.session_state.main_ticker]['stop_loss'] = sl_price
-                        st.session_state.portfolio[st.session_state.main_ticker]['take_profit'] = tp_price
-                        st.session_state.trade_history.append({'timestamp': datetime.now().isoformat(), 'type': 'BUY', 'ticker': st.session_state.main_ticker, 'shares': shares_input, 'price': price, 'profit_loss': 0})
-                        st.success(f"Bought {shares_input} of {st.session_state.main_ticker}!")
-                        st.rerun()
-                    else: st.error("Not enough cash.")
+            sl_price = st.session_state.get('sl_price_form') if sl_enabled else None
+            tp_price = st.session_state.get('tp_price_form') if tp_enabled else None
+            ts_offset = st.session_state.get('ts_offset_form') if ts_enabled else None
+            try:
+                account.buy(st.session_state.main_ticker, shares_input, st.session_state.current_price_for_calc or None, sl_price, tp_price, ts_offset)
+                st.success(f"Bought {shares_input} of {st.session_state.main_ticker}!")
+                st.rerun()
+            except ValueError as e: st.error(str(e))
 
         if sell_col.button("Submit Sell Order", use_container_width=True):
-            if not is_market_open(): st.error("Market is closed.")
-            elif st.session_state.main_ticker not in st.session_state.portfolio or st.session_state.portfolio[st.session_state.main_ticker]['shares'] < shares_input: st.error("Not enough shares to sell.")
-            else:
-                price = get_current_price(st.session_state.main_ticker)
-                if price:
-                    proceeds = price * shares_input
-                    st.session_state.cash_balance += proceeds
-                    avg_price = st.session_state.portfolio[st.session_state.main_ticker]['avg_price']
-                    profit_loss = (price - avg_price) * shares_input
-                    st.session_state.portfolio[st.session_state.main_ticker]['shares'] -= shares_input
-                    if st.session_state.portfolio[st.session_state.main_ticker]['shares'] == 0: del st.session_state.portfolio[st.session_state.main_ticker]
-                    st.session_state.trade_history.append({'timestamp': datetime.now().isoformat(), 'type': 'SELL', 'ticker': st.session_state.main_ticker, 'shares': shares_input, 'price': price, 'profit_loss': profit_loss})
-                    st.success(f"Sold {shares_input} of {st.session_state.main_ticker}!")
-                    st.rerun()
+            try:
+                account.sell(st.session_state.main_ticker, shares_input)
+                st.success(f"Sold {shares_input} of {st.session_state.main_ticker}!")
+                st.rerun()
+            except ValueError as e: st.error(str(e))
 
-    with st.expander("⭐ Watchlist"):
-        watchlist_add = st.text_input("Add Ticker", key="watchlist_add").upper()
+    with st.expander("⭐ Watchlist"), tracer.span("section.watchlist"):
+        watchlist_add = st.text_input("Add Ticker", key="watchlist_add", help="Separate several tickers with commas or spaces.").upper()
         if st.button("Add to Watchlist"):
-            if watchlist_add and watchlist_add not in st.session_state.watchlist: st.session_state.watchlist.append(watchlist_add); st.rerun()
+            added = [t for t in dict.fromkeys(watchlist_add.replace(',', ' ').split()) if t not in st.session_state.watchlist]
+            if added: st.session_state.watchlist.extend(added); st.rerun()
         st.dataframe(pd.DataFrame(st.session_state.watchlist, columns=["Ticker"]))
 
 # This must be called before the main display elements
-check_orders()
+with tracer.span("check_orders"): check_orders()
 
 # --- COLUMN 2: Visual Display ---
 with col2:
@@ -206,248 +247,390 @@ with col2:
     with st.container(border=True):
         st.subheader(f"Interactive Chart for {st.session_state.main_ticker}")
         
-        c_period = st.selectbox("Period", ["1d", "5d", "1mo", "6mo", "1y", "2y", "5y", "max"], index=2)
-        c_interval = st.selectbox("Interval", ["1m", "2m", "5m", "15m", "30m", "1h", "1d", "1wk"], index=6)
+        c_period = st.selectbox("Period", ["1d", "5d", "1mo", "6mo", "1y", "2y", "5y", "max"], index=2, key="chart_period")
+        c_interval = st.selectbox("Interval", ["1m", "2m", "5m", "15m", "30m", "1h", "1d", "1wk"], index=6, key="chart_interval")
 
         st.write("Moving Averages:")
         ma_col1, ma_col2, ma_col3, ma_col4, ma_col5 = st.columns(5)
-        show_ema20 = ma_col1.checkbox("EMA (20)", value=True)
-        show_sma10 = ma_col2.checkbox("SMA (10)")
-        show_sma20 = ma_col3.checkbox("SMA (20)")
-        show_sma50 = ma_col4.checkbox("SMA (50)")
-        show_ema200 = ma_col5.checkbox("EMA (200)")
-
-        auto_refresh = st.checkbox("Enable Auto-Refresh (every 30s)")
-        
-        chart_placeholder = st.empty()
-        
+        show_ema20 = ma_col1.checkbox("EMA (20)", value=True, key="show_ema20")
+        show_sma10 = ma_col2.checkbox("SMA (10)", key="show_sma10")
+        show_sma20 = ma_col3.checkbox("SMA (20)", key="show_sma20")
+        show_sma50 = ma_col4.checkbox("SMA (50)", key="show_sma50")
+        show_ema200 = ma_col5.checkbox("EMA (200)", key="show_ema200")
+
+        refresh_col1, refresh_col2 = st.columns(2)
+        refresh_col1.checkbox("Enable Auto-Refresh", key="auto_refresh")
+        refresh_col2.select_slider("Refresh every (seconds)", options=[1, 2, 5, 10, 30, 60], value=30, key="refresh_seconds", disabled=not st.session_state.auto_refresh)
+
+        # Auto-refresh reruns only this fragment: bars come from the local store
+        # and the live price from the shared feed, not a full script rerun.  While
+        # auto-refresh is on, bars and figure are rebuilt only when the feed has a
+        # new tick for the ticker or the chart settings change; otherwise the last
+        # figure is sent again, which Streamlit ships as a reference to the copy the
+        # browser already has.
         def draw_interactive_chart():
+            chart_placeholder = st.empty()
             try:
-                history = yf.Ticker(st.session_state.main_ticker).history(period=c_period, interval=c_interval)
-                if history.empty:
-                    chart_placeholder.warning("No data found for the selected period/interval.")
-                    return
-
-                if show_ema20: history['EMA_20'] = ta.ema(history['Close'], length=20)
-                if show_sma10: history['SMA_10'] = ta.sma(history['Close'], length=10)
-                if show_sma20: history['SMA_20'] = ta.sma(history['Close'], length=20)
-                if show_sma50: history['SMA_50'] = ta.sma(history['Close'], length=50)
-                if show_ema200: history['EMA_200'] = ta.ema(history['Close'], length=200)
-
-                fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.1, row_heights=[0.7, 0.3])
-                fig.add_trace(go.Candlestick(x=history.index, open=history['Open'], high=history['High'], low=history['Low'], close=history['Close'], name='Candlestick'), row=1, col=1)
-                if show_ema20: fig.add_trace(go.Scatter(x=history.index, y=history['EMA_20'], mode='lines', name='EMA 20', line=dict(color='orange', width=1)), row=1, col=1)
-                if show_sma10: fig.add_trace(go.Scatter(x=history.index, y=history['SMA_10'], mode='lines', name='SMA 10', line=dict(color='blue', width=1)), row=1, col=1)
-                if show_sma20: fig.add_trace(go.Scatter(x=history.index, y=history['SMA_20'], mode='lines', name='SMA 20', line=dict(color='red', width=1)), row=1, col=1)
-                if show_sma50: fig.add_trace(go.Scatter(x=history.index, y=history['SMA_50'], mode='lines', name='SMA 50', line=dict(color='green', width=1)), row=1, col=1)
-                if show_ema200: fig.add_trace(go.Scatter(x=history.index, y=history['EMA_200'], mode='lines', name='EMA 200', line=dict(color='purple', width=1.5)), row=1, col=1)
-                fig.add_trace(go.Bar(x=history.index, y=history['Volume'], name='Volume', marker_color='purple'), row=2, col=1)
-                fig.update_layout(title=f'{st.session_state.main_ticker} Interactive Chart', xaxis_rangeslider_visible=False, xaxis_title="Date", yaxis_title="Price", height=600, hovermode="x unified", legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
-                fig.update_yaxes(title_text="Price ($)", row=1, col=1)
-                fig.update_yaxes(title_text="Volume", row=2, col=1)
-                chart_placeholder.plotly_chart(fig, use_container_width=True)
+                ticker = st.session_state.main_ticker
+                overlays = [spec for spec, shown in ((('ema', 20), show_ema20), (('sma', 10), show_sma10), (('sma', 20), show_sma20), (('sma', 50), show_sma50), (('ema', 200), show_ema200)) if shown]
+                refresh = get_refresh_interval()
+                tick = subscribe_live(ticker, refresh) if refresh else None
+                changed, st.session_state.chart_feed_version = price_feed.changes_since(st.session_state.get('chart_feed_version', 0))
+                inputs, cached = (ticker, c_period, c_interval, tuple(overlays)), st.session_state.get('chart_cache')
+                if refresh and cached and cached['inputs'] == inputs and ticker not in changed:
+                    history = cached['history']
+                    tracer.count("chart.reused")
+                else:
+                    with tracer.span("chart.bars", ticker=ticker, interval=c_interval): history = bar_store.bars(ticker, c_interval, period=c_period)
+                    if history.empty:
+                        chart_placeholder.warning("No data found for the selected period/interval.")
+                        return
+                    with tracer.span("chart.indicators", overlays=len(overlays)):
+                        full_history = bar_store.stored(ticker, c_interval)
+                        for name, values in indicator_engine.for_frame((ticker, c_interval), full_history, history, overlays).items():
+                            history[name] = values
+                    cached = st.session_state.chart_cache = {'inputs': inputs, 'history': history, 'figure': None}
+
+                # Zooming re-aggregates just the selected window, switching to a finer
+                # interval when the selected one has too few bars to show detail.
+                zoom = None
+                if len(history) > 1:
+                    wall_times = history.index.tz_localize(None) if history.index.tz is not None else history.index
+                    zoom = st.slider("Zoom", min_value=wall_times[0].to_pydatetime(), max_value=wall_times[-1].to_pydatetime(), value=(wall_times[0].to_pydatetime(), wall_times[-1].to_pydatetime()), key=f"zoom_{ticker}_{c_period}_{c_interval}", format="YYYY-MM-DD HH:mm")
+                figure_key = (zoom, tick.version if tick else None)
+                if cached['figure'] is None or cached['figure'][0] != figure_key:
+                    notes = []
+                    window, window_interval = history, c_interval
+                    if zoom is not None:
+                        lo, hi = wall_times.searchsorted(zoom[0]), wall_times.searchsorted(zoom[1], side='right')
+                        window = history.iloc[lo:max(hi, lo + 1)]
+                        finer = finer_interval(c_interval, window.index[0], window.index[-1]) if len(window) < CANDLE_BUDGET // 4 and hi - lo < len(history) else None
+                        if finer:
+                            fine = bar_store.bars(ticker, finer, start=window.index[0], end=window.index[-1] + pd.Timedelta(days=1))
+                            if not fine.empty:
+                                for name, values in indicator_engine.for_frame((ticker, finer), bar_store.stored(ticker, finer), fine, overlays).items():
+                                    fine[name] = values
+                                window, window_interval = fine, finer
+                                notes.append(f"Showing {finer} bars for the zoomed range.")
+
+                    with tracer.span("chart.prepare", bars=len(window)):
+                        candles, lines = chart_pipeline.prepare(window, [indicator_name(kind, length) for kind, length in overlays])
+                    with tracer.span("chart.figure", candles=len(candles)):
+                        import plotly.graph_objects as go; from plotly.subplots import make_subplots  # deferred until a chart is drawn
+                        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.1, row_heights=[0.7, 0.3])
+                        fig.add_trace(go.Candlestick(x=candles.index, open=candles['Open'], high=candles['High'], low=candles['Low'], close=candles['Close'], name='Candlestick'), row=1, col=1)
+                        for name, (color, width) in OVERLAY_STYLES.items():
+                            if name in lines:
+                                x, y = lines[name]
+                                fig.add_trace(line_trace(len(x))(x=x, y=y, mode='lines', name=name.replace('_', ' '), line=dict(color=color, width=width)), row=1, col=1)
+                        fig.add_trace(go.Bar(x=candles.index, y=candles['Volume'], name='Volume', marker_color='purple'), row=2, col=1)
+                        fig.update_layout(title=f'{ticker} Interactive Chart', xaxis_rangeslider_visible=False, xaxis_title="Date", yaxis_title="Price", height=600, hovermode="x unified", legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+                        fig.update_yaxes(title_text="Price ($)", row=1, col=1)
+                        fig.update_yaxes(title_text="Volume", row=2, col=1)
+                        if tick: fig.add_hline(y=tick.price, line_dash="dot", line_color="gray", annotation_text=f"Live ${tick.price:,.2f}", row=1, col=1)
+                    if len(candles) < len(window): notes.append(f"{len(window):,} {window_interval} bars aggregated into {len(candles):,} candles.")
+                    cached['figure'] = (figure_key, fig, notes)
+                _, fig, notes = cached['figure']
+                for note in notes: st.caption(note)
+                with tracer.span("chart.render"): chart_placeholder.plotly_chart(fig, use_container_width=True)
             except Exception as e:
                 chart_placeholder.error(f"Could not load interactive chart: {e}")
-        
-        draw_interactive_chart()
+
+        st.fragment(traced_fragment("section.chart", draw_interactive_chart), run_every=get_refresh_interval())()
 
     # --- TABS FOR ALL OTHER FEATURES ---
-    portfolio_tab, history_tab, stats_tab, analysis_tab, news_tab, practice_tab, learn_tab = st.tabs(["💼 Portfolio", "📜 History", "🔍 Stats", "🔬 Analysis", "📰 News", "🎓 Practice", "📚 Learn"])
+    # Tabs track the selected one and rerun on change, so only the open tab's body runs.
+    portfolio_tab, history_tab, stats_tab, screener_tab, analysis_tab, news_tab, practice_tab, learn_tab = st.tabs(["💼 Portfolio", "📜 History", "🔍 Stats", "📡 Screener", "🔬 Analysis", "📰 News", "🎓 Practice", "📚 Learn"], key="main_tabs", on_change="rerun")
     
-    with portfolio_tab:
-        st.subheader("Your Holdings")
-        if not st.session_state.portfolio: st.info("Your portfolio is empty.")
-        else:
-            items = []; total_value = 0
-            for ticker, data in st.session_state.portfolio.items():
-                price = get_current_price(ticker) or data['avg_price']; market_value = price * data['shares']; total_value += market_value
-                items.append({"Ticker": ticker, "Shares": data['shares'], "Avg Price": f"${data['avg_price']:,.2f}", "Current Price": f"${price:,.2f}", "Market Value": f"${market_value:,.2f}", "Stop-Loss": f"${data.get('stop_loss'):,.2f}" if data.get('stop_loss') else "N/A", "Take-Profit": f"${data.get('take_profit'):,.2f}" if data.get('take_profit') else "N/A"})
-            st.metric("Total Holdings Value", f"${total_value:,.2f}")
-            st.dataframe(pd.DataFrame(items).set_index("Ticker"), use_container_width=True)
-
-    with history_tab:
-        st.subheader("Your Trade History")
-        if not st.session_state.trade_history: st.info("No trades recorded yet.")
-        else:
-            history_df = pd.DataFrame(st.session_state.trade_history)
-            history_df['timestamp'] = pd.to_datetime(history_df['timestamp']).dt.strftime('%Y-%m-%d %H:%M:%S')
-            st.dataframe(history_df[['timestamp', 'type', 'ticker', 'shares', 'price', 'profit_loss']].sort_index(ascending=False), use_container_width=True)
-
-    with stats_tab:
-        st.subheader("Daily Stock Stats"); s_ticker = st.session_state.main_ticker
-        st.write(f"Showing stats for **{s_ticker}**.")
-        try:
-            info = yf.Ticker(s_ticker).info
-            price = info.get('regularMarketPrice'); prev_close = info.get('previousClose'); change = price - prev_close; percent_change = (change / prev_close) * 100
-            st.metric("Current Price", f"${price:,.2f}", f"{percent_change:,.2f}%"); st.text(f"Day's Range: ${info.get('dayLow'):,.2f} - ${info.get('dayHigh'):,.2f}"); st.text(f"Volume: {info.get('volume'):,}")
-        except Exception: st.error("Could not retrieve stats for this ticker.")
-
-    with analysis_tab:
-        st.subheader("Analyze a Completed Trade")
-        sell_trades = [t for t in st.session_state.trade_history if t['type'] == 'SELL']
-        if not sell_trades: st.info("You must complete a trade to perform an analysis.")
-        else:
-            trade_options = [f"{t['ticker']} ({t['shares']} shares on {datetime.fromisoformat(t['timestamp']).strftime('%Y-%m-%d')})" for t in sell_trades]
-            selected_trade_str = st.selectbox("Select a sell trade to analyze:", trade_options)
-            if st.button("Analyze Trade"):
-                selected_sell = sell_trades[trade_options.index(selected_trade_str)]; ticker = selected_sell['ticker']
-                buy_trade = None
-                for trade in reversed(st.session_state.trade_history):
-                    if trade['type'] == 'BUY' and trade['ticker'] == ticker and datetime.fromisoformat(trade['timestamp']) < datetime.fromisoformat(selected_sell['timestamp']): buy_trade = trade; break
-                if not buy_trade: st.error("Could not find a matching buy trade for this sale.")
+    with portfolio_tab, tracer.span("tab.portfolio"):
+        if portfolio_tab.open:
+            st.subheader("Your Holdings")
+            if not account.positions: st.info("Your portfolio is empty.")
+            else:
+                prices, price_errors = get_current_prices(account.positions)
+                holdings = pd.DataFrame.from_dict(account.positions, orient='index')
+                holdings['Current Price'] = [prices.get(t) or avg for t, avg in zip(holdings.index, holdings['avg_price'])]
+                holdings['Market Value'] = holdings['Current Price'] * holdings['shares']; holdings['Unrealized P/L'] = (holdings['Current Price'] - holdings['avg_price']) * holdings['shares']
+                for col in ('stop_loss', 'take_profit', 'trailing_stop'):
+                    if col not in holdings: holdings[col] = None
+                holdings = holdings.rename(columns={'shares': 'Shares', 'avg_price': 'Avg Price', 'stop_loss': 'Stop-Loss', 'take_profit': 'Take-Profit', 'trailing_stop': 'Trailing Stop'})[['Shares', 'Avg Price', 'Current Price', 'Market Value', 'Unrealized P/L', 'Stop-Loss', 'Take-Profit', 'Trailing Stop']].rename_axis("Ticker")
+                st.metric("Total Holdings Value", f"${holdings['Market Value'].sum():,.2f}")
+                if price_errors: st.caption(f"No live quote for {', '.join(sorted(price_errors))}; valued at average price.")
+                money = st.column_config.NumberColumn(format="$%.2f")
+                st.dataframe(holdings, use_container_width=True, column_config={col: money for col in holdings.columns if col != 'Shares'})
+            if account.trades:
+                st.subheader("📈 Performance")
+                analytics = get_portfolio_analytics(); start_cash = analytics.start_cash(account.cash)
+                curve = analytics.curve(start_cash); perf = analytics.stats(start_cash)
+                if not perf: st.info("Performance analytics need at least two days of price history.")
                 else:
-                    buy_date = datetime.fromisoformat(buy_trade['timestamp']); sell_date = datetime.fromisoformat(selected_sell['timestamp'])
-                    start_date = buy_date - timedelta(days=365); end_date = sell_date + timedelta(days=1)
-                    with st.spinner("Fetching data and running analysis..."):
-                        hist_data = yf.Ticker(ticker).history(start=start_date.strftime('%Y-%m-%d'), end=end_date.strftime('%Y-%m-%d'))
-                        hist_data.ta.rsi(append=True); hist_data.ta.sma(length=50, append=True)
-                        buy_day_data = hist_data.loc[buy_date.strftime('%Y-%m-%d')]; buy_rsi = buy_day_data['RSI_14'].iloc[0]
-                        st.write(f"**Analysis for {ticker} Trade:**")
-                        if buy_rsi < 35: st.success(f"✅ GOOD ENTRY: RSI was {buy_rsi:.2f} (possibly oversold).")
-                        elif buy_rsi > 65: st.warning(f"❌ POOR ENTRY: RSI was {buy_rsi:.2f} (possibly overbought).")
-                        else: st.info(f"UTRAL ENTRY: RSI was {buy_rsi:.2f} (neutral).")
-                        holding_data = hist_data.loc[buy_date.strftime('%Y-%m-%d'):sell_date.strftime('%Y-%m-%d')]
-                        highest_price = holding_data['High'].max(); potential_profit = (highest_price - buy_trade['price']) * selected_sell['shares']
-                        st.write(f"Your actual P/L on this trade: **${selected_sell['profit_loss']:,.2f}**"); st.write(f"💡 POTENTIAL: Max profit could have been **${potential_profit:,.2f}**.")
-
-    with news_tab:
-        st.subheader(f"Latest News for {st.session_state.main_ticker}")
-        try:
-            news = yf.Ticker(st.session_state.main_ticker).news
-            if not news: st.info("No recent news found for this ticker.")
+                    p1, p2, p3, p4, p5 = st.columns(5)
+                    p1.metric("Total Return", f"{perf['total_return']:.2%}"); p2.metric("Max Drawdown", f"{perf['max_drawdown']:.2%}"); p3.metric("Volatility (ann.)", f"{perf['volatility']:.2%}"); p4.metric("Sharpe Ratio", f"{perf['sharpe']:.2f}"); p5.metric("Avg. Exposure", f"{perf['exposure']:.0%}")
+                    st.line_chart(curve['equity'], height=250); st.area_chart(curve['drawdown'], height=150, color="#d62728")
+                    pnl = analytics.positions_frame(prices if account.positions else None)[['shares', 'cost_basis', 'market_value', 'realized_pl', 'unrealized_pl']]
+                    pnl.columns = ['Shares', 'Cost Basis', 'Market Value', 'Realized P/L', 'Unrealized P/L']
+                    st.dataframe(pnl.rename_axis("Ticker"), use_container_width=True, column_config={col: st.column_config.NumberColumn(format="$%.2f") for col in pnl.columns if col != 'Shares'})
+
+    with history_tab, tracer.span("tab.history"):
+        if history_tab.open:
+            st.subheader("Your Trade History")
+            if not account.trades: st.info("No trades recorded yet.")
             else:
-                for item in news:
-                    title = item.get('title'); link = item.get('link'); publisher = item.get('publisher'); publish_time = item.get('providerPublishTime')
-                    if title and link:
-                        st.write(f"**[{title}]({link})**")
-                        if publisher and publish_time: st.caption(f"{publisher} - {datetime.fromtimestamp(publish_time).strftime('%Y-%m-%d %H:%M')}")
+                history_df = pd.DataFrame(account.trades, columns=Trade._fields)
+                history_df['time'] = pd.to_datetime(history_df['time']).dt.strftime('%Y-%m-%d %H:%M:%S')
+                st.dataframe(history_df.rename(columns={'time': 'timestamp', 'side': 'type'})[['timestamp', 'type', 'ticker', 'shares', 'price', 'profit_loss']].sort_index(ascending=False), use_container_width=True)
+
+    with stats_tab, tracer.span("tab.stats"):
+        if stats_tab.open:
+            st.subheader("Daily Stock Stats"); s_ticker = st.session_state.main_ticker
+            st.write(f"Showing stats for **{s_ticker}**.")
+            try:
+                info = quote_cache.get_info(s_ticker)
+                price = info.get('regularMarketPrice'); prev_close = info.get('previousClose'); change = price - prev_close; percent_change = (change / prev_close) * 100
+                st.metric("Current Price", f"${price:,.2f}", f"{percent_change:,.2f}%"); st.text(f"Day's Range: ${info.get('dayLow'):,.2f} - ${info.get('dayHigh'):,.2f}"); st.text(f"Volume: {info.get('volume'):,}")
+            except Exception: st.error("Could not retrieve stats for this ticker.")
+
+    with screener_tab, tracer.span("tab.screener"):
+        if screener_tab.open:
+            st.subheader("Watchlist Screener")
+            with tracer.span("screener.screen", tickers=len(st.session_state.watchlist)): screen_table, screen_errors = screen(st.session_state.watchlist)
+            if screen_errors: st.caption(f"No daily bars for {', '.join(sorted(screen_errors))}.")
+            if screen_table.empty: st.info("Add tickers to your watchlist to screen them.")
+            else:
+                f_col1, f_col2, f_col3 = st.columns(3)
+                screen_search = f_col1.text_input("Ticker contains", key="screen_search").upper()
+                rsi_low, rsi_high = f_col2.slider("RSI (14)", 0, 100, (0, 100), key="screen_rsi")
+                cross_within = f_col3.number_input("Crossed within (bars)", min_value=0, value=0, step=1, key="screen_cross", help="Keep tickers with an EMA 20 / SMA 50 or SMA 50 / SMA 200 cross this recent; 0 keeps all.")
+                sort_col, order_col = st.columns([2, 1], vertical_alignment="bottom")
+                sort_by = sort_col.selectbox("Sort by", list(SCREEN_LABELS), index=list(SCREEN_LABELS).index('change_pct'), format_func=SCREEN_LABELS.get, key="screen_sort")
+                descending = order_col.checkbox("Descending", value=True, key="screen_descending")
+
+                keep = pd.Series(True, index=screen_table.index)
+                if screen_search: keep &= screen_table.index.str.contains(screen_search, regex=False)
+                if (rsi_low, rsi_high) != (0, 100): keep &= screen_table['RSI_14'].between(rsi_low, rsi_high)
+                if cross_within: keep &= (screen_table[[f"{fast}x{slow}" for fast, slow in CROSSES]] <= cross_within).any(axis=1)
+                shown = screen_table[keep].sort_values(sort_by, ascending=not descending)
+                st.caption(f"{len(shown)} of {len(screen_table)} tickers. Select a row to chart it.")
+
+                def chart_selected():
+                    rows = st.session_state.screen_table.selection.rows
+                    if rows: st.session_state.main_ticker = shown.index[rows[0]]
+                money, number = st.column_config.NumberColumn(format="$%.2f"), st.column_config.NumberColumn(format="%.1f")
+                st.dataframe(shown.rename(columns=SCREEN_LABELS), use_container_width=True, key="screen_table", on_select=chart_selected, selection_mode="single-row",
+                             column_config={SCREEN_LABELS['as_of']: st.column_config.DateColumn(), SCREEN_LABELS['price']: money, SCREEN_LABELS['change_pct']: st.column_config.NumberColumn(format="%+.2f%%"),
+                                            SCREEN_LABELS['volume']: st.column_config.NumberColumn(format="localized"), SCREEN_LABELS['volume_ratio']: st.column_config.NumberColumn(format="%.2fx"), SCREEN_LABELS['RSI_14']: number,
+                                            **{SCREEN_LABELS[name]: money for name in ('EMA_20', 'SMA_50', 'SMA_200')}, **{SCREEN_LABELS[f"{fast}x{slow}"]: st.column_config.NumberColumn(format="%d") for fast, slow in CROSSES}})
+
+    with analysis_tab, tracer.span("tab.analysis"):
+        if analysis_tab.open:
+            st.subheader("Analyze a Completed Trade")
+            sells = [t for t in account.trades if t.side == 'SELL']
+            if not sells: st.info("You must complete a trade to perform an analysis.")
+            else:
+                ledger = get_ledger()
+                trade_options = [f"{t.ticker} ({t.shares} shares on {pd.Timestamp(t.time):%Y-%m-%d})" for t in sells]
+                selected_trade_str = st.selectbox("Select a sell trade to analyze:", trade_options)
+                col_one, col_all = st.columns(2)
+                if col_one.button("Analyze Trade"):
+                    selected = sells[trade_options.index(selected_trade_str)]; ticker = selected.ticker
+                    matches = ledger.matches_frame(selected.id)
+                    if matches.empty: st.error("Could not find a matching buy trade for this sale.")
+                    else:
+                        with st.spinner("Fetching data and running analysis..."):
+                            result = analyze_matches(matches)
+                        st.write(f"**Analysis for {ticker} Trade:**")
+                        for lot in result.itertuples():
+                            if pd.isna(lot.entry_rsi): st.warning(f"No price history found for the {lot.shares}-share lot bought {lot.buy_time:%Y-%m-%d}."); continue
+                            if len(result) > 1: st.caption(f"Lot bought {lot.buy_time:%Y-%m-%d}: {lot.shares} shares @ ${lot.buy_price:,.2f}")
+                            if lot.entry_rsi < 35: st.success(f"✅ GOOD ENTRY: RSI was {lot.entry_rsi:.2f} (possibly oversold).")
+                            elif lot.entry_rsi > 65: st.warning(f"❌ POOR ENTRY: RSI was {lot.entry_rsi:.2f} (possibly overbought).")
+                            else: st.info(f"UTRAL ENTRY: RSI was {lot.entry_rsi:.2f} (neutral).")
+                        st.write(f"Your actual P/L on this trade (FIFO lots): **${result['realized_pl'].sum():,.2f}**"); st.write(f"💡 POTENTIAL: Max profit could have been **${result['max_potential'].sum():,.2f}**.")
+                if col_all.button("Analyze All Trades"):
+                    with st.spinner(f"Analyzing {len(ledger.matches)} matched lots..."):
+                        result = analyze_matches(ledger.matches_frame())
+                    m1, m2, m3 = st.columns(3)
+                    m1.metric("Realized P/L", f"${result['realized_pl'].sum():,.2f}"); m2.metric("Max Potential", f"${result['max_potential'].sum():,.2f}"); m3.metric("Missed Profit", f"${result['missed_profit'].sum():,.2f}")
+                    view = result[['ticker', 'buy_time', 'sell_time', 'shares', 'buy_price', 'sell_price', 'realized_pl', 'entry_rsi', 'max_high', 'missed_profit']]
+                    st.dataframe(view.rename(columns={'ticker': 'Ticker', 'buy_time': 'Bought', 'sell_time': 'Sold', 'shares': 'Shares', 'buy_price': 'Buy Price', 'sell_price': 'Sell Price', 'realized_pl': 'P/L', 'entry_rsi': 'Entry RSI', 'max_high': 'Max High', 'missed_profit': 'Missed Profit'}), use_container_width=True, hide_index=True)
+
+    with news_tab, tracer.span("tab.news"):
+        if news_tab.open:
+            news_scope = st.radio("Show news for", ["ticker", "watched"], format_func={'ticker': st.session_state.main_ticker, 'watched': "Portfolio & Watchlist"}.get, horizontal=True, key="news_scope")
+            news_tickers = [st.session_state.main_ticker] if news_scope == "ticker" else sorted(watched_symbols())
+            st.subheader(f"Latest News for {st.session_state.main_ticker}" if news_scope == "ticker" else "Latest News for Your Portfolio & Watchlist")
+            try:
+                news_store.ensure(news_tickers)     # only symbols never fetched; the prefetcher keeps the rest fresh
+                news = news_store.articles(news_tickers)
+                fetched_at, news_error = news_store.status(st.session_state.main_ticker)
+                if news_scope == "ticker" and news_error: st.error(f"Could not fetch news: {news_error}")
+                if not news: st.info("No recent news found for this ticker." if news_scope == "ticker" else "No recent news found for these tickers.")
+                else:
+                    if fetched_at: st.caption(f"Updated {datetime.fromtimestamp(fetched_at).strftime('%H:%M')}; refreshed in the background every {news_store.ttl / 60:.0f} minutes.")
+                    for item in news:
+                        st.write(f"**[{item['title']}]({item['link']})**")
+                        st.caption(" - ".join(part for part in (item['publisher'], datetime.fromtimestamp(item['published_at']).strftime('%Y-%m-%d %H:%M'), ', '.join(item['tickers'])) if part))
                         st.divider()
-        except Exception as e: st.error(f"Could not fetch news: {e}")
-
-    with practice_tab:
-        st.subheader("Historical Trading Practice")
-        if 'practice_data' not in st.session_state:
-            with st.form("practice_setup"):
-                st.write("Set up a practice session to trade on historical data.")
-                practice_ticker = st.text_input("Ticker to practice with", "SPY").upper()
-                start_date = st.date_input("Start Date for Data", datetime(2022, 1, 1))
-                submitted = st.form_submit_button("Start Practice Session")
-                if submitted:
-                    with st.spinner("Downloading historical data..."):
-                        end_date = datetime.now()
-                        data = yf.Ticker(practice_ticker).history(start=start_date, end=end_date, interval="1d")
-                        if not data.empty:
-                            st.session_state.practice_data = data
-                            st.session_state.practice_ticker = practice_ticker
-                            st.session_state.practice_step = 50
-                            st.session_state.practice_cash = 100000.0
-                            st.session_state.practice_portfolio = {}
-                            st.session_state.practice_trade_history = []
-                            st.rerun()
-                        else: st.error("Could not fetch data for this ticker/date range.")
-        else:
-            current_step = st.session_state.practice_step
-            visible_data = st.session_state.practice_data.iloc[:current_step+1]
-            current_date = visible_data.index[-1].strftime('%Y-%m-%d')
-            current_price = visible_data['Close'].iloc[-1]
-            st.write(f"Simulating Day: **{current_date}** | Current Price: **${current_price:,.2f}**")
-            practice_chart = st.empty()
-            fig = go.Figure(data=[go.Candlestick(x=visible_data.index, open=visible_data['Open'], high=visible_data['High'], low=visible_data['Low'], close=visible_data['Close'])])
-            fig.update_layout(title=f"Practice Chart for {st.session_state.practice_ticker}", xaxis_rangeslider_visible=False)
-            practice_chart.plotly_chart(fig, use_container_width=True)
-            p_col1, p_col2 = st.columns(2)
-            with p_col1: st.metric("Practice Cash", f"${st.session_state.practice_cash:,.2f}")
-            with p_col2:
-                if st.session_state.practice_portfolio:
-                    st.write("Practice Holdings:"); st.json(st.session_state.practice_portfolio)
-            ctl_col1, ctl_col2, ctl_col3, ctl_col4 = st.columns(4)
-            practice_shares = ctl_col1.number_input("Shares", min_value=1, step=1, key="practice_shares")
-            if ctl_col2.button("Buy (Practice)"):
-                cost = current_price * practice_shares
-                if st.session_state.practice_cash >= cost:
-                    st.session_state.practice_cash -= cost
-                    st.success(f"Bought {practice_shares} of {st.session_state.practice_ticker} in practice mode.")
-                else: st.warning("Not enough practice cash.")
-            if ctl_col3.button("Sell (Practice)"):
-                st.success(f"Sold {practice_shares} of {st.session_state.practice_ticker} in practice mode.")
-            if ctl_col4.button("Next Day >>"):
-                if st.session_state.practice_step < len(st.session_state.practice_data) - 1:
-                    st.session_state.practice_step += 1; st.rerun()
-                else: st.success("You have reached the end of the historical data!")
-            if st.button("End Practice Session"):
-                del st.session_state.practice_data; st.rerun()
-            st.subheader("Practice Trade History")
-            if 'practice_trade_history' in st.session_state and st.session_state.practice_trade_history:
-                practice_hist_df = pd.DataFrame(st.session_state.practice_trade_history)
-                st.dataframe(practice_hist_df, use_container_width=True)
+            except Exception as e: st.error(f"Could not fetch news: {e}")
+
+    with practice_tab, tracer.span("tab.practice"):
+        if practice_tab.open:
+            st.subheader("Historical Trading Practice")
+            if 'practice_data' not in st.session_state:
+                with st.form("practice_setup"):
+                    st.write("Set up a practice session to trade on historical data.")
+                    practice_ticker = st.text_input("Ticker to practice with", "SPY").upper()
+                    start_date = st.date_input("Start Date for Data", datetime(2022, 1, 1))
+                    submitted = st.form_submit_button("Start Practice Session")
+                    if submitted:
+                        with st.spinner("Downloading historical data..."):
+                            data = bar_store.bars(practice_ticker, "1d", start=start_date)
+                            if not data.empty:
+                                st.session_state.practice_data = data
+                                st.session_state.practice_ticker = practice_ticker
+                                st.session_state.practice_step = 50
+                                st.session_state.practice_cash = 100000.0
+                                st.session_state.practice_portfolio = {}
+                                st.session_state.practice_trade_history = []
+                                st.rerun()
+                            else: st.error("Could not fetch data for this ticker/date range.")
             else:
-                st.info("No practice trades yet.")
-
-    with learn_tab:
-        st.subheader("📚 Day Trading Education")
-        st.write("Here are some recommended videos from TJR's YouTube channel to help you learn the basics:")
-        vid_col1, vid_col2 = st.columns(2)
-        with vid_col1:
-            st.video("https://www.youtube.com/watch?v=xgaep2fI6-Q")
-        with vid_col2:
-            st.video("https://www.youtube.com/watch?v=YGv6St0gy_I")
-        st.divider()
-
-        st.subheader("🧠 Test Your Knowledge")
-        QUIZ_BANK = [
-            {"question": "What does a green candlestick typically represent?", "options": ["The price went down", "The price went up", "The price stayed the same", "The market is closed"], "answer": "The price went up"},
-            {"question": "What is the primary purpose of a 'Stop-Loss' order?", "options": ["To guarantee a profit", "To enter a trade at a specific price", "To limit potential losses on a trade", "To buy more shares automatically"], "answer": "To limit potential losses on a trade"},
-            {"question": "The 'EMA (200)' on a chart is most often used to identify what?", "options": ["Short-term momentum", "The day's trading volume", "The long-term trend", "Immediate price reversals"], "answer": "The long-term trend"},
-            {"question": "High trading 'Volume' during a price increase is often a sign of what?", "options": ["A weak trend", "A strong trend", "An impending price drop", "Low interest in the stock"], "answer": "A strong trend"},
-            {"question": "What does 'RSI' stand for?", "options": ["Real-time Stock Index", "Relative Strength Index", "Return on Stock Investment", "Resistant Stock Indicator"], "answer": "Relative Strength Index"},
-            {"question": "An RSI value above 70 often suggests a stock is...", "options": ["Oversold", "Fairly valued", "Overbought", "About to split"], "answer": "Overbought"},
-            {"question": "A 'Take-Profit' order is used to...", "options": ["Automatically sell a stock to lock in profits at a target price", "Buy a stock when it hits a low price", "Cancel another order", "Calculate your total profit"], "answer": "Automatically sell a stock to lock in profits at a target price"},
-            {"question": "The 'spread' in trading is the difference between...", "options": ["The high and low price of the day", "The bid and ask price", "The opening and closing price", "Your entry and exit price"], "answer": "The bid and ask price"}
-        ]
+                current_step = st.session_state.practice_step
+                visible_data = st.session_state.practice_data.iloc[:current_step+1]
+                current_date = visible_data.index[-1].strftime('%Y-%m-%d')
+                current_price = visible_data['Close'].iloc[-1]
+                st.write(f"Simulating Day: **{current_date}** | Current Price: **${current_price:,.2f}**")
+                practice_chart = st.empty()
+                import plotly.graph_objects as go
+                fig = go.Figure(data=[go.Candlestick(x=visible_data.index, open=visible_data['Open'], high=visible_data['High'], low=visible_data['Low'], close=visible_data['Close'])])
+                fig.update_layout(title=f"Practice Chart for {st.session_state.practice_ticker}", xaxis_rangeslider_visible=False)
+                practice_chart.plotly_chart(fig, use_container_width=True)
+                p_col1, p_col2 = st.columns(2)
+                with p_col1: st.metric("Practice Cash", f"${st.session_state.practice_cash:,.2f}")
+                with p_col2:
+                    if st.session_state.practice_portfolio:
+                        st.write("Practice Holdings:"); st.json(st.session_state.practice_portfolio)
+                ctl_col1, ctl_col2, ctl_col3, ctl_col4 = st.columns(4)
+                practice_shares = ctl_col1.number_input("Shares", min_value=1, step=1, key="practice_shares")
+                if ctl_col2.button("Buy (Practice)"):
+                    cost = current_price * practice_shares
+                    if st.session_state.practice_cash >= cost:
+                        st.session_state.practice_cash -= cost
+                        st.success(f"Bought {practice_shares} of {st.session_state.practice_ticker} in practice mode.")
+                    else: st.warning("Not enough practice cash.")
+                if ctl_col3.button("Sell (Practice)"):
+                    st.success(f"Sold {practice_shares} of {st.session_state.practice_ticker} in practice mode.")
+                if ctl_col4.button("Next Day >>"):
+                    if st.session_state.practice_step < len(st.session_state.practice_data) - 1:
+                        st.session_state.practice_step += 1; st.rerun()
+                    else: st.success("You have reached the end of the historical data!")
+                if st.button("End Practice Session"):
+                    del st.session_state.practice_data; st.rerun()
+                st.subheader("Practice Trade History")
+                if 'practice_trade_history' in st.session_state and st.session_state.practice_trade_history:
+                    practice_hist_df = pd.DataFrame(st.session_state.practice_trade_history)
+                    st.dataframe(practice_hist_df, use_container_width=True)
+                else:
+                    st.info("No practice trades yet.")
+
+                with st.expander("🧪 Backtest a Strategy"):
+                    st.write(f"Replay a strategy over all {len(st.session_state.practice_data)} days of {st.session_state.practice_ticker} data.")
+                    bt_strategy = st.selectbox("Strategy", list(STRATEGIES), format_func=STRATEGY_LABELS.get)
+                    bt_col1, bt_col2 = st.columns(2)
+                    bt_sl = bt_col1.number_input("Stop-loss (%)", min_value=0.0, value=5.0, step=0.5)
+                    bt_tp = bt_col2.number_input("Take-profit (%)", min_value=0.0, value=10.0, step=0.5)
+                    if st.button("Run Backtest"):
+                        result = backtest(st.session_state.practice_data, bt_strategy, stop_loss=bt_sl / 100 or None, take_profit=bt_tp / 100 or None)
+                        stats = result['stats']
+                        m_col1, m_col2, m_col3, m_col4 = st.columns(4)
+                        m_col1.metric("Total Return", f"{stats['total_return']:.2%}"); m_col2.metric("Max Drawdown", f"{stats['max_drawdown']:.2%}")
+                        m_col3.metric("Sharpe", f"{stats['sharpe']:.2f}"); m_col4.metric("Win Rate", f"{stats['win_rate']:.0%} of {stats['trades']}")
+                        st.line_chart(pd.Series(result['equity'], index=st.session_state.practice_data.index, name="Equity"))
+                        trades = pd.DataFrame(result['trades'])
+                        if not trades.empty:
+                            dates = st.session_state.practice_data.index.strftime('%Y-%m-%d')
+                            trades['entry_date'] = dates[trades['entry_idx']]; trades['exit_date'] = dates[trades['exit_idx']]
+                            trades['reason'] = trades['reason'].map(EXIT_REASONS)
+                            st.dataframe(trades[['entry_date', 'exit_date', 'shares', 'entry_price', 'exit_price', 'pnl', 'reason']], use_container_width=True)
+
+    with learn_tab, tracer.span("tab.learn"):
+        if learn_tab.open:
+            st.subheader("📚 Day Trading Education")
+            st.write("Here are some recommended videos from TJR's YouTube channel to help you learn the basics:")
+            for vid_col, video in zip(st.columns(len(LEARN_VIDEOS)), LEARN_VIDEOS):
+                with vid_col: st.video(video)
+            st.divider()
+
+            st.subheader("🧠 Test Your Knowledge")
         
-        if 'current_quiz_questions' not in st.session_state:
-            st.session_state.current_quiz_questions = random.sample(QUIZ_BANK, 3)
+            if 'current_quiz_questions' not in st.session_state:
+                st.session_state.current_quiz_questions = random.sample(QUIZ_BANK, 3)
 
-        if 'quiz_submitted' not in st.session_state:
-            st.session_state.quiz_submitted = False
+            if 'quiz_submitted' not in st.session_state:
+                st.session_state.quiz_submitted = False
             
-        if not st.session_state.quiz_submitted:
-            with st.form("quiz_form"):
-                user_answers = {}
-                for i, q in enumerate(st.session_state.current_quiz_questions):
-                    user_answers[i] = st.radio(q["question"], q["options"], key=f"q{i}")
+            if not st.session_state.quiz_submitted:
+                with st.form("quiz_form"):
+                    user_answers = {}
+                    for i, q in enumerate(st.session_state.current_quiz_questions):
+                        user_answers[i] = st.radio(q["question"], q["options"], key=f"q{i}")
                 
-                submitted = st.form_submit_button("Submit Quiz")
-                if submitted:
-                    st.session_state.user_answers = user_answers
-                    st.session_state.quiz_submitted = True
-                    st.rerun()
-        else:
-            score = 0
-            for i, q in enumerate(st.session_state.current_quiz_questions):
-                if st.session_state.user_answers[i] == q["answer"]:
-                    score += 1
+                    submitted = st.form_submit_button("Submit Quiz")
+                    if submitted:
+                        st.session_state.user_answers = user_answers
+                        st.session_state.quiz_submitted = True
+                        st.rerun()
+            else:
+                score = 0
+                for i, q in enumerate(st.session_state.current_quiz_questions):
+                    if st.session_state.user_answers[i] == q["answer"]:
+                        score += 1
             
-            total_questions = len(st.session_state.current_quiz_questions)
-            score_percent = (score / total_questions) * 100
+                total_questions = len(st.session_state.current_quiz_questions)
+                score_percent = (score / total_questions) * 100
             
-            st.write(f"### Your Score: {score}/{total_questions} ({score_percent:.0f}%)")
-            if score_percent == 100: st.success("Excellent! You got all the answers right! 🎉")
-            elif score_percent >= 60: st.warning("Good job! Review the incorrect answers to improve.")
-            else: st.error("Keep studying! Review the videos and try again.")
+                st.write(f"### Your Score: {score}/{total_questions} ({score_percent:.0f}%)")
+                if score_percent == 100: st.success("Excellent! You got all the answers right! 🎉")
+                elif score_percent >= 60: st.warning("Good job! Review the incorrect answers to improve.")
+                else: st.error("Keep studying! Review the videos and try again.")
             
-            for i, q in enumerate(st.session_state.current_quiz_questions):
-                if st.session_state.user_answers[i] != q["answer"]:
-                    st.write(f"**Question:** {q['question']}")
-                    st.write(f"**Your answer:** {st.session_state.user_answers[i]} (Incorrect)")
-                    st.write(f"**Correct answer:** {q['answer']}")
-                    st.divider()
-
-            if st.button("Start New Quiz"):
-                st.session_state.current_quiz_questions = random.sample(QUIZ_BANK, 3)
-                st.session_state.quiz_submitted = False
-                st.rerun()
+                for i, q in enumerate(st.session_state.current_quiz_questions):
+                    if st.session_state.user_answers[i] != q["answer"]:
+                        st.write(f"**Question:** {q['question']}")
+                        st.write(f"**Your answer:** {st.session_state.user_answers[i]} (Incorrect)")
+                        st.write(f"**Correct answer:** {q['answer']}")
+                        st.divider()
 
-if auto_refresh:
-    time.sleep(30)
-    st.rerun()
\ No newline at end of file
+                if st.button("Start New Quiz"):
+                    st.session_state.current_quiz_questions = random.sample(QUIZ_BANK, 3)
+                    st.session_state.quiz_submitted = False
+                    st.rerun()
+
+# --- Debug Panel ---
+# Shown with ?debug=1 or ODYSSEY_DEBUG set; lists this session's finished traces (the current one ends below).
+if os.environ.get("ODYSSEY_DEBUG") or st.query_params.get("debug"):
+    with st.expander("🛠️ Debug: Rerun Traces"):
+        tracer.profiling = st.checkbox("Profile the slowest reruns (applies to every session)", value=tracer.profiling)
+        mine = [t for t in reversed(tracer.traces) if t.key in (None, st.session_state.feed_owner)]
+        if not mine: st.info("No finished reruns yet; interact with the app to record one.")
+        else:
+            d1, d2, d3 = st.columns(3)
+            d1.metric("Last Rerun", f"{mine[0].duration * 1000:,.0f} ms"); d2.metric("Median (recent)", f"{pd.Series([t.duration for t in mine]).median() * 1000:,.0f} ms"); d3.metric("Reruns Recorded", len(mine))
+            labels = [f"{datetime.fromtimestamp(t.wall).strftime('%H:%M:%S')} {t.name} ({t.duration * 1000:,.0f} ms, {t.status})" for t in mine]
+            trace = mine[labels.index(st.selectbox("Trace", labels))]
+            spans = pd.DataFrame([{'Span': '\u2003' * span.depth + span.name, 'ms': span.duration * 1000 if span.duration is not None else None, 'Details': ', '.join(f"{k}={v}" for k, v in span.attrs.items())} for span in trace.spans])
+            span_col, counter_col = st.columns([2, 1])
+            span_col.dataframe(spans, use_container_width=True, hide_index=True, column_config={'ms': st.column_config.NumberColumn(format="%.1f")})
+            counter_col.dataframe(pd.DataFrame(sorted(trace.counters.items()), columns=['Counter', 'Value']), use_container_width=True, hide_index=True)
+        if tracer.slowest:
+            st.write("**Slowest profiled reruns**")
+            for slow in tracer.slowest:
+                top = pd.DataFrame(slow.profile.most_common(10), columns=['Stack (innermost last)', 'Samples'])
+                top['Stack (innermost last)'] = top['Stack (innermost last)'].str.split(';').str[-4:].str.join(' → ')
+                st.caption(f"{slow.name} at {datetime.fromtimestamp(slow.wall).strftime('%H:%M:%S')}: {slow.duration * 1000:,.0f} ms, {sum(slow.profile.values())} samples")
+                st.dataframe(top, use_container_width=True, hide_index=True)
+        e1, e2 = st.columns(2)
+        e1.download_button("Traces (JSON lines)", tracer.jsonl(), file_name="odyssey-traces.jsonl", use_container_width=True)
+        e2.download_button("Metrics (Prometheus)", tracer.prometheus(), file_name="odyssey-metrics.prom", use_container_width=True)
+
+tracer.end()
@@ -0,0 +1,178 @@
+"""Headless, vectorized backtester over the practice-mode OHLCV frames.
+
+A strategy turns OHLCV arrays into boolean entry/exit signal arrays using
+the same indicators as the chart.  ``backtest`` then simulates one long
+position at a time with the app's order semantics:
+
+* entries fill at the close of the signal bar (as practice-mode buys do);
+* a stop-loss fills when a later bar's low reaches it, at the stop price
+  or the open if the bar gapped through, and a take-profit likewise on
+  the high; if both are reachable in one bar the stop is assumed first;
+* an exit signal closes the position at that bar's close.
+
+Simulation work is per trade, not per bar: each trade's exit is found with
+array searches, and the equity curve is built from the trade list with
+cumulative sums.  ``run_grid`` fans tickers x parameter grids out across a
+process pool.
+"""
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from indicators import ema, rsi, sma
+
+TRADE_DTYPE = np.dtype([('entry_idx', np.int64), ('exit_idx', np.int64), ('entry_price', np.float64), ('exit_price', np.float64), ('shares', np.int64), ('pnl', np.float64), ('reason', np.int8)])
+EXIT_SIGNAL, EXIT_STOP, EXIT_TARGET, EXIT_END = 0, 1, 2, 3
+EXIT_REASONS = {EXIT_SIGNAL: "Signal", EXIT_STOP: "Stop-Loss", EXIT_TARGET: "Take-Profit", EXIT_END: "End of Data"}
+TRADING_DAYS = 252
+
+
+# --- Strategies ---
+def _crossed_above(a, b):
+    """True where ``a`` moves above ``b``; bars where either is still warming up (NaN) never count."""
+    above, ok = a > b, np.isfinite(a) & np.isfinite(b)
+    return np.r_[False, above[1:] & ~above[:-1] & ok[1:] & ok[:-1]]
+
+
+def sma_cross(bars, fast=20, slow=50):
+    """Enter when the fast SMA crosses above the slow SMA; exit on the cross back below."""
+    f, s = sma(bars['Close'], fast), sma(bars['Close'], slow)
+    return _crossed_above(f, s), _crossed_above(s, f)
+
+
+def ema_cross(bars, fast=20, slow=200):
+    """Enter when the fast EMA crosses above the slow EMA; exit on the cross back below."""
+    f, s = ema(bars['Close'], fast), ema(bars['Close'], slow)
+    return _crossed_above(f, s), _crossed_above(s, f)
+
+
+def rsi_reversion(bars, length=14, oversold=35, overbought=65):
+    """Enter when RSI drops below ``oversold``; exit when it rises above ``overbought``."""
+    r = rsi(bars['Close'], length)
+    return r < oversold, r > overbought
+
+
+STRATEGIES = {'sma_cross': sma_cross, 'ema_cross': ema_cross, 'rsi_reversion': rsi_reversion}
+STRATEGY_LABELS = {'sma_cross': "SMA (20/50) Crossover", 'ema_cross': "EMA (20/200) Crossover", 'rsi_reversion': "RSI (14) Mean Reversion"}
+
+
+# --- Simulation ---
+def _next_true(mask):
+    """For each bar, the index of the first True at or after it (len(mask) if none)."""
+    n = len(mask)
+    idx = np.where(mask, np.arange(n), n)
+    return np.minimum.accumulate(idx[::-1])[::-1]
+
+
+def _as_arrays(frame):
+    if isinstance(frame, dict): return {k: np.asarray(v, dtype=np.float64) for k, v in frame.items()}
+    return {col: frame[col].to_numpy(dtype=np.float64) for col in ('Open', 'High', 'Low', 'Close')}
+
+
+def backtest(frame, strategy='sma_cross', params=None, stop_loss=None, take_profit=None, cash=100000.0, shares=None):
+    """Runs one strategy over one OHLCV frame (DataFrame or dict of arrays).
+
+    ``stop_loss``/``take_profit`` are fractions of the entry price (0.05 is
+    5%).  Each entry buys ``shares`` shares, or as many as cash allows.
+    Returns a dict with the ``equity`` curve, a structured ``trades`` array
+    and ``stats``.
+    """
+    bars = _as_arrays(frame)
+    strategy = STRATEGIES[strategy] if isinstance(strategy, str) else strategy
+    entries, exits = strategy(bars, **(params or {}))
+    o, h, l, c = bars['Open'], bars['High'], bars['Low'], bars['Close']
+    n = len(c)
+    next_entry, next_exit = _next_true(entries), _next_true(exits)
+
+    trades = []
+    balance = cash
+    i = next_entry[0] if n else 0
+    while i < n - 1:
+        entry_price = c[i]
+        qty = shares if shares is not None else int(balance // entry_price)
+        if qty <= 0 or balance < qty * entry_price: break
+        # Candidate exits, each the first bar after entry where it applies.
+        exit_idx, exit_price, reason = n - 1, c[n - 1], EXIT_END
+        sig = next_exit[i + 1]
+        if sig < n: exit_idx, exit_price, reason = sig, c[sig], EXIT_SIGNAL
+        window = slice(i + 1, exit_idx + 1)
+        if stop_loss:
+            stop = entry_price * (1 - stop_loss)
+            hit = np.flatnonzero(l[window] <= stop)
+            if hit.size and i + 1 + hit[0] <= exit_idx:
+                j = i + 1 + hit[0]
+                exit_idx, exit_price, reason = j, min(o[j], stop), EXIT_STOP
+                window = slice(i + 1, j + 1)
+        if take_profit:
+            target = entry_price * (1 + take_profit)
+            hit = np.flatnonzero(h[window] >= target)
+            if hit.size and (i + 1 + hit[0] < exit_idx or (i + 1 + hit[0] == exit_idx and reason != EXIT_STOP)):
+                j = i + 1 + hit[0]
+                exit_idx, exit_price, reason = j, max(o[j], target), EXIT_TARGET
+        pnl = (exit_price - entry_price) * qty
+        balance += pnl
+        trades.append((i, exit_idx, entry_price, exit_price, qty, pnl, reason))
+        i = next_entry[exit_idx + 1] if exit_idx + 1 < n else n
+    trades = np.array(trades, dtype=TRADE_DTYPE)
+    equity = _equity_curve(c, trades, cash)
+    return {'equity': equity, 'trades': trades, 'stats': _stats(equity, trades, n)}
+
+
+def _equity_curve(close, trades, cash):
+    """Marks cash + position to each bar's close, built from the trade list."""
+    n = len(close)
+    position = np.zeros(n + 1)
+    flows = np.zeros(n + 1)
+    np.add.at(position, trades['entry_idx'], trades['shares'])
+    np.add.at(position, trades['exit_idx'], -trades['shares'])
+    np.add.at(flows, trades['entry_idx'], -trades['entry_price'] * trades['shares'])
+    np.add.at(flows, trades['exit_idx'], trades['exit_price'] * trades['shares'])
+    return cash + np.cumsum(flows)[:n] + np.cumsum(position)[:n] * close
+
+
+def _stats(equity, trades, n):
+    if not n: return {}
+    returns = np.diff(equity) / equity[:-1] if n > 1 else np.empty(0)
+    peak = np.maximum.accumulate(equity)
+    std = returns.std()
+    held = (trades['exit_idx'] - trades['entry_idx']).sum()
+    return {
+        'total_return': float(equity[-1] / equity[0] - 1),
+        'max_drawdown': float(((equity - peak) / peak).min()),
+        'sharpe': float(returns.mean() / std * np.sqrt(TRADING_DAYS)) if std > 0 else 0.0,
+        'trades': len(trades),
+        'win_rate': float((trades['pnl'] > 0).mean()) if len(trades) else 0.0,
+        'exposure': float(held / n),
+    }
+
+
+# --- Fan-out ---
+def _run_ticker(ticker, bars, strategy, combos, stop_loss, take_profit, cash):
+    return [(ticker, params, backtest(bars, strategy, params, stop_loss, take_profit, cash)['stats']) for params in combos]
+
+
+def param_grid(grid):
+    """Expands {'fast': [10, 20], 'slow': [50, 100]} into a list of param dicts."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def run_grid(frames, strategy='sma_cross', grid=None, stop_loss=None, take_profit=None, cash=100000.0, max_workers=None):
+    """Backtests every ticker in ``frames`` against every combination in ``grid``.
+
+    ``frames`` maps ticker -> OHLCV frame.  Work is split per ticker so each
+    frame is shipped to a worker process once.  Returns a list of
+    (ticker, params, stats) tuples.
+    """
+    combos = param_grid(grid) if grid else [{}]
+    jobs = [(ticker, _as_arrays(frame)) for ticker, frame in frames.items()]
+    if max_workers == 1 or len(jobs) == 1:
+        return [row for ticker, bars in jobs for row in _run_ticker(ticker, bars, strategy, combos, stop_loss, take_profit, cash)]
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        futures = [pool.submit(_run_ticker, ticker, bars, strategy, combos, stop_loss, take_profit, cash) for ticker, bars in jobs]
+        for future in futures:
+            results.extend(future.result())
+    return results
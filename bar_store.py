@@ -0,0 +1,325 @@
+"""On-disk OHLCV bar store shared by the chart, analysis and practice views.
+
+Bars for each (ticker, interval) live in two raw column files under
+``CACHE_DIR/bars/<TICKER>/<interval>/``:
+
+    ts.bin      int64 nanoseconds since the epoch (UTC), ascending
+    ohlcv.bin   float64 rows of Open, High, Low, Close, Volume
+
+Both files are read through ``np.memmap`` and grown by appending, so a
+refresh writes only the bars that arrived since the previous one.
+``meta.json`` records the exchange timezone, how far back history has been
+fetched and when the tail was last refreshed.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from market_data import MAX_WORKERS, as_timestamp, period_offset, quote_cache
+from tracing import payload_bytes, tracer
+
+CACHE_DIR = os.environ.get("ODYSSEY_CACHE_DIR", ".odyssey_cache")
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+ROW_BYTES = 8 * len(COLUMNS)
+EARLIEST = np.iinfo(np.int64).min   # covered_from once "max" history is stored
+INTERVAL_SECONDS = {'1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 1800, '60m': 3600, '90m': 5400, '1h': 3600, '1d': 86400, '5d': 432000, '1wk': 604800, '1mo': 2592000, '3mo': 7776000}
+MIN_REFRESH, MAX_REFRESH = 15, 300  # bounds (seconds) on how often a tail is re-fetched
+
+
+def refresh_seconds(interval):
+    """How long a stored tail is trusted before asking upstream for newer bars."""
+    return min(max(INTERVAL_SECONDS.get(interval, 86400) / 2, MIN_REFRESH), MAX_REFRESH)
+
+
+def _to_ns(value, tz):
+    return as_timestamp(value, tz).as_unit('ns').value
+
+
+def _to_columns(frame):
+    """Splits a provider DataFrame into (int64 UTC ns, float64 OHLCV rows)."""
+    index = frame.index if isinstance(frame.index, pd.DatetimeIndex) else pd.DatetimeIndex(frame.index)
+    if index.tz is not None: index = index.tz_convert('UTC')
+    ts = index.as_unit('ns').asi8
+    values = frame.reindex(columns=COLUMNS).to_numpy(dtype=np.float64)
+    order = np.argsort(ts, kind='stable')
+    return np.ascontiguousarray(ts[order]), np.ascontiguousarray(values[order])
+
+
+# --- Column Files ---
+class _Series:
+    """The two memory-mapped column files and metadata for one (ticker, interval)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.ts_path = os.path.join(path, 'ts.bin')
+        self.ohlcv_path = os.path.join(path, 'ohlcv.bin')
+        self.meta_path = os.path.join(path, 'meta.json')
+        self.meta = {'tz': None, 'covered_from': None, 'refreshed_at': 0}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r') as f: self.meta.update(json.load(f))
+        self._open()
+
+    def _open(self):
+        """Maps the column files, trimming a half-written trailing row after a crash."""
+        sizes = [os.path.getsize(p) if os.path.exists(p) else 0 for p in (self.ts_path, self.ohlcv_path)]
+        n = min(sizes[0] // 8, sizes[1] // ROW_BYTES)
+        for path, size, row in ((self.ts_path, sizes[0], 8), (self.ohlcv_path, sizes[1], ROW_BYTES)):
+            if size != n * row:
+                with open(path, 'r+b') as f: f.truncate(n * row)
+        if n:
+            self.ts = np.memmap(self.ts_path, dtype=np.int64, mode='r', shape=(n,))
+            self.ohlcv = np.memmap(self.ohlcv_path, dtype=np.float64, mode='r', shape=(n, len(COLUMNS)))
+        else:
+            self.ts = np.empty(0, dtype=np.int64)
+            self.ohlcv = np.empty((0, len(COLUMNS)), dtype=np.float64)
+
+    def __len__(self):
+        return len(self.ts)
+
+    def append(self, ts, values):
+        if not len(ts): return
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.ts_path, 'ab') as f: f.write(ts.tobytes())
+        with open(self.ohlcv_path, 'ab') as f: f.write(values.tobytes())
+        self._open()
+
+    def replace_last(self, values):
+        with open(self.ohlcv_path, 'r+b') as f:
+            f.seek((len(self) - 1) * ROW_BYTES)
+            f.write(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+        self._open()
+
+    def rewrite(self, ts, values):
+        os.makedirs(self.path, exist_ok=True)
+        for path, arr in ((self.ts_path, ts), (self.ohlcv_path, values)):
+            with open(path + '.tmp', 'wb') as f: f.write(np.ascontiguousarray(arr).tobytes())
+            os.replace(path + '.tmp', path)
+        self._open()
+
+    def save_meta(self):
+        with open(self.meta_path + '.tmp', 'w') as f: json.dump(self.meta, f)
+        os.replace(self.meta_path + '.tmp', self.meta_path)
+
+
+# --- Bar Store ---
+class BarStore:
+    """Incrementally refreshed, process-wide cache of OHLCV bars.
+
+    ``source`` is anything with a ``provider`` attribute; by default the quote
+    cache, so swapping its provider (e.g. to a fixture) swaps bars too.
+    """
+
+    def __init__(self, root=CACHE_DIR, source=quote_cache):
+        self.root = os.path.join(root, 'bars')
+        self.source = source
+        self.fetches = 0
+        self._series = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._batch_lock = threading.Lock()
+
+    def _get_series(self, key):
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+            if key not in self._series:
+                ticker, interval = key
+                self._series[key] = _Series(os.path.join(self.root, ticker.replace('/', '_'), interval))
+            return self._series[key], lock
+
+    def _fetch(self, ticker, interval, **kwargs):
+        self.fetches += 1
+        tracer.count("bars.fetch")
+        with tracer.span("bars.fetch", ticker=ticker, interval=interval):
+            frame = self.source.provider.history(ticker, interval, **kwargs)
+        tracer.count("bars.bytes", payload_bytes(frame))
+        return frame
+
+    def _fetch_many(self, tickers, interval, **kwargs):
+        self.fetches += 1
+        tracer.count("bars.fetch")
+        with tracer.span("bars.fetch_many", tickers=len(tickers), interval=interval):
+            frames, errors = self.source.provider.history_many(tickers, interval, **kwargs)
+        tracer.count("bars.bytes", sum(payload_bytes(f) for f in frames.values()))
+        return frames, errors
+
+    def _merge(self, series, frame):
+        """Merges fetched bars into the series; a pure tail update only appends."""
+        if frame is None or frame.empty: return
+        if series.meta['tz'] is None and isinstance(frame.index, pd.DatetimeIndex) and frame.index.tz is not None:
+            series.meta['tz'] = str(frame.index.tz)
+        ts, values = _to_columns(frame)
+        if len(series) and ts[0] >= series.ts[-1]:
+            if ts[0] == series.ts[-1]:
+                # The last stored bar may have been partial; take the fresh copy.
+                series.replace_last(values[0]); ts, values = ts[1:], values[1:]
+            series.append(ts, values)
+        elif not len(series):
+            series.append(ts, values)
+        else:
+            all_ts = np.concatenate([series.ts, ts])
+            all_values = np.concatenate([series.ohlcv, values])
+            order = np.argsort(all_ts, kind='stable')
+            all_ts, all_values = all_ts[order], all_values[order]
+            keep = np.r_[all_ts[1:] != all_ts[:-1], True]   # newest copy of duplicate bars wins
+            series.rewrite(all_ts[keep], all_values[keep])
+
+    def _frame(self, series, lo, hi):
+        """Wraps a slice of the mapped columns as a DataFrame without copying the values."""
+        index = pd.DatetimeIndex(np.asarray(series.ts[lo:hi]).view('M8[ns]')).tz_localize('UTC')
+        index = index.tz_convert(series.meta['tz']) if series.meta['tz'] else index.tz_localize(None)
+        return pd.DataFrame(np.asarray(series.ohlcv[lo:hi]), index=index, columns=COLUMNS, copy=False)
+
+    def _period_start(self, series, period):
+        """Index of the first bar in the trailing ``period`` window, anchored at the last bar."""
+        if period == 'max' or not len(series): return 0
+        tz = series.meta['tz']
+        last = pd.Timestamp(int(series.ts[-1]), tz='UTC')
+        if tz: last = last.tz_convert(tz)
+        if period.endswith('d') and not period.endswith('wk'):
+            # "5d" means the last five sessions, not five calendar days.
+            days = pd.to_datetime(np.asarray(series.ts), utc=True)
+            sessions = (days.tz_convert(tz) if tz else days.tz_localize(None)).normalize().unique()
+            first_day = sessions[max(len(sessions) - int(period[:-1]), 0)]
+            return int(np.searchsorted(series.ts, _to_ns(first_day, 'UTC')))
+        return int(np.searchsorted(series.ts, (last - period_offset(period)).as_unit('ns').value))
+
+    def bars(self, ticker, interval, period=None, start=None, end=None):
+        """Returns OHLCV bars for ``ticker``, fetching only what the store is missing.
+
+        Pass either a yfinance-style ``period`` or a ``start``/``end`` date
+        range (end exclusive); with neither, the full stored history is used.
+        """
+        ticker = ticker.upper()
+        tracer.count("bars.request")
+        series, lock = self._get_series((ticker, interval))
+        with lock:
+            now = time.time()
+            covered = series.meta['covered_from']
+            if period is None and start is None: period = 'max'
+            if period is not None:
+                wanted = EARLIEST if period == 'max' else _to_ns(pd.Timestamp(now, unit='s', tz='UTC') - period_offset(period), 'UTC')
+                if covered is None or covered > wanted:
+                    self._merge(series, self._fetch(ticker, interval, period=period))
+                    if len(series):
+                        series.meta['covered_from'] = min(wanted, int(series.ts[0]))
+                        series.meta['refreshed_at'] = now
+            else:
+                wanted = _to_ns(start, series.meta['tz'] or 'US/Eastern')
+                if covered is None or covered > wanted:
+                    head_end = None
+                    if len(series):
+                        head_end = pd.Timestamp(int(series.ts[0]), tz='UTC') + pd.Timedelta(days=1)
+                    self._merge(series, self._fetch(ticker, interval, start=start, end=head_end))
+                    if len(series):
+                        series.meta['covered_from'] = wanted if covered is None else min(covered, wanted)
+                        if head_end is None: series.meta['refreshed_at'] = now
+
+            if len(series) and now - series.meta['refreshed_at'] > refresh_seconds(interval):
+                last = pd.Timestamp(int(series.ts[-1]), tz='UTC')
+                if series.meta['tz']: last = last.tz_convert(series.meta['tz'])
+                try:
+                    self._merge(series, self._fetch(ticker, interval, start=last))
+                except Exception:
+                    pass    # keep serving the stored bars; the next call retries
+                series.meta['refreshed_at'] = now
+            if len(series): series.save_meta()
+
+            if period is not None:
+                lo, hi = self._period_start(series, period), len(series)
+            else:
+                lo = int(np.searchsorted(series.ts, _to_ns(start, series.meta['tz'] or 'US/Eastern')))
+                hi = int(np.searchsorted(series.ts, _to_ns(end, series.meta['tz'] or 'US/Eastern'))) if end is not None else len(series)
+            return self._frame(series, lo, hi)
+
+    def bars_many(self, tickers, interval, period=None, start=None):
+        """Bulk ``bars`` over a trailing ``period`` or from ``start`` on; returns ``({ticker: frame}, {ticker: error})``.
+
+        Symbols whose stored history falls short of the window are fetched in
+        one provider ``history_many`` call and stale tails in a second, so a
+        refresh costs at most two upstream requests however long the list
+        is.  Providers without ``history_many`` fall back to concurrent
+        ``bars`` calls.
+        """
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        frames, errors = {}, {}
+        if period is None and start is None: period = 'max'
+        if getattr(self.source.provider, 'history_many', None) is None:
+            def fetch(ticker):
+                try:
+                    return ticker, self.bars(ticker, interval, period=period, start=start), None
+                except Exception as e:
+                    return ticker, None, e
+            for ticker, frame, error in _executor.map(fetch, tickers):
+                if error is not None: errors[ticker] = error
+                else: frames[ticker] = frame
+            return frames, errors
+
+        tracer.count("bars.request", len(tickers))
+        with self._batch_lock:
+            now = time.time()
+            if period is not None:
+                trailing = EARLIEST if period == 'max' else _to_ns(pd.Timestamp(now, unit='s', tz='UTC') - period_offset(period), 'UTC')
+                wanted = lambda series: trailing
+            else:
+                wanted = lambda series: _to_ns(start, series.meta['tz'] or 'US/Eastern')
+            short, stale = [], {}
+            for ticker in tickers:
+                series, lock = self._get_series((ticker, interval))
+                with lock:
+                    covered = series.meta['covered_from']
+                    if covered is None or covered > wanted(series): short.append(ticker)
+                    elif len(series) and now - series.meta['refreshed_at'] > refresh_seconds(interval): stale[ticker] = int(series.ts[-1])
+
+            if short:
+                try:
+                    fetched, failed = self._fetch_many(short, interval, **({'period': period} if period is not None else {'start': start}))
+                except Exception as e:
+                    fetched, failed = {}, {t: e for t in short}
+                for ticker in short:
+                    series, lock = self._get_series((ticker, interval))
+                    with lock:
+                        self._merge(series, fetched.get(ticker))
+                        if len(series):
+                            series.meta['covered_from'] = min(wanted(series), int(series.ts[0]))
+                            series.meta['refreshed_at'] = now; series.save_meta()
+                        else:
+                            errors[ticker] = failed.get(ticker) or KeyError(f"No bars for {ticker}")
+            if stale:
+                try:
+                    fetched, _ = self._fetch_many(list(stale), interval, start=pd.Timestamp(min(stale.values()), tz='UTC'))
+                except Exception:
+                    fetched = {}    # keep serving the stored bars; the next call retries
+                for ticker, last in stale.items():
+                    series, lock = self._get_series((ticker, interval))
+                    with lock:
+                        frame = fetched.get(ticker)
+                        if frame is not None and not frame.empty:
+                            # the batch starts at the stalest tail; drop what this series already has
+                            index = frame.index.tz_convert('UTC') if frame.index.tz is not None else frame.index
+                            self._merge(series, frame[index.as_unit('ns').asi8 >= last])
+                        series.meta['refreshed_at'] = now; series.save_meta()
+
+            for ticker in tickers:
+                if ticker in errors: continue
+                series, lock = self._get_series((ticker, interval))
+                with lock:
+                    lo = self._period_start(series, period) if period is not None else int(np.searchsorted(series.ts, wanted(series)))
+                    frames[ticker] = self._frame(series, lo, len(series))
+        return frames, errors
+
+    def stored(self, ticker, interval):
+        """Returns every stored bar for (ticker, interval) without touching the network."""
+        series, lock = self._get_series((ticker.upper(), interval))
+        with lock:
+            return self._frame(series, 0, len(series))
+
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="bars")
+
+
+bar_store = BarStore()
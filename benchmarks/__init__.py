@@ -0,0 +1,6 @@
+"""Offline benchmark suite for the trading app's hot paths.
+
+Run ``python -m benchmarks.run --help`` from the repository root.  Every
+benchmark reads market data from a seeded ``SyntheticProvider``, so runs
+are repeatable and never touch the network.
+"""
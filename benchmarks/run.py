@@ -0,0 +1,326 @@
+"""Benchmark harness: times hot paths across sizes and writes a JSON report.
+
+    python -m benchmarks.run                      # full sweep
+    python -m benchmarks.run --quick              # smallest sizes only
+    python -m benchmarks.run --only indicators    # names containing "indicators"
+    python -m benchmarks.run --compare old.json   # exit 1 on regressions
+
+Every benchmark runs in a throwaway working directory with its own bar
+cache and account database, against a ``SyntheticProvider`` seeded with
+``--seed``.  A benchmark is a setup function that takes one size and
+returns the callable to time; it is repeated until ``--min-time`` seconds
+or ``--repeats`` runs, whichever comes last.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CALLER_CWD = os.getcwd()
+WORKDIR = tempfile.mkdtemp(prefix="odyssey-bench-")
+# Modules read these at import time, so they must be set before the app's modules load.
+os.environ["ODYSSEY_CACHE_DIR"] = os.path.join(WORKDIR, "cache")
+os.environ["ODYSSEY_DB"] = os.path.join(WORKDIR, "odyssey.db")
+os.environ.setdefault("ODYSSEY_SYNTHETIC_SEED", "0")
+sys.path.insert(0, ROOT)
+os.chdir(WORKDIR)
+
+import numpy as np
+
+from market_data import SyntheticProvider, quote_cache
+
+BENCHMARKS = {}     # name -> (setup, sizes, quick sizes, unit)
+MAX_RUNS = 1000     # timed runs per size, at most
+
+
+def benchmark(sizes, quick, unit):
+    """Registers a setup function; ``unit`` names what the size counts."""
+    def register(setup):
+        BENCHMARKS[setup.__name__] = (setup, sizes, quick, unit)
+        return setup
+    return register
+
+
+def tickers(n):
+    return [f"SYN{i:04d}" for i in range(n)]
+
+
+# --- Benchmarks ---
+@benchmark(sizes=[10, 100, 1000, 5000], quick=[10, 100], unit="positions")
+def check_orders(n):
+    """One check_orders pass: quote every symbol with resting orders, then match."""
+    from order_engine import MatchingEngine
+    engine = MatchingEngine()
+    for ticker in tickers(n):
+        price = quote_cache.get_price(ticker)
+        engine.place_bracket(ticker, 10, price * 0.9, price * 1.1, price * 0.05, ref_price=price)
+
+    def run():
+        prices, _ = quote_cache.get_prices(engine.symbols(), max_age=0)
+        return engine.on_prices(prices)
+    return run
+
+
+@benchmark(sizes=[1_000, 10_000, 100_000, 1_000_000], quick=[1_000, 10_000], unit="bars")
+def indicators_cold(n):
+    """All chart overlays plus RSI over a series the engine has never seen."""
+    from indicators import IndicatorEngine
+    closes = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, n)))
+    ts = np.arange(n, dtype=np.int64)
+    specs = [('ema', 20), ('sma', 10), ('sma', 20), ('sma', 50), ('ema', 200), ('rsi', 14)]
+    return lambda: IndicatorEngine().compute(('SYN', '1d'), ts, closes, specs)
+
+
+@benchmark(sizes=[1_000, 10_000, 100_000, 1_000_000], quick=[1_000, 10_000], unit="bars")
+def indicators_warm(n):
+    """The same overlays after one new bar, resumed from cached state; each run appends a fresh bar."""
+    from indicators import IndicatorEngine
+    closes = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, n + MAX_RUNS)))
+    ts = np.arange(n + MAX_RUNS, dtype=np.int64)
+    specs = [('ema', 20), ('sma', 10), ('sma', 20), ('sma', 50), ('ema', 200), ('rsi', 14)]
+    engine = IndicatorEngine()
+    engine.compute(('SYN', '1d'), ts[:n], closes[:n], specs)     # primed outside the timer
+    ends = itertools.count(n + 1)
+
+    def run():
+        end = next(ends)
+        return engine.compute(('SYN', '1d'), ts[:end], closes[:end], specs)
+    return run
+
+
+@benchmark(sizes=[250, 2_500, 25_000, 250_000], quick=[250, 2_500], unit="bars")
+def chart_figure(n):
+    """Downsampling plus the interactive chart's figure, serialized as Streamlit would."""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    import chart_pipeline
+    from chart_pipeline import line_trace
+    from indicators import ema, sma
+    frame = SyntheticProvider(bars=n).series("SYN", "1d")
+    frame['EMA_20'], frame['SMA_50'], frame['EMA_200'] = ema(frame['Close'], 20), sma(frame['Close'], 50), ema(frame['Close'], 200)
+
+    def run():
+        # Mirrors draw_interactive_chart in TradingApp.py.
+        candles, lines = chart_pipeline.prepare(frame, ['EMA_20', 'SMA_50', 'EMA_200'])
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.1, row_heights=[0.7, 0.3])
+        fig.add_trace(go.Candlestick(x=candles.index, open=candles['Open'], high=candles['High'], low=candles['Low'], close=candles['Close'], name='Candlestick'), row=1, col=1)
+        for name, (x, y) in lines.items():
+            fig.add_trace(line_trace(len(x))(x=x, y=y, mode='lines', name=name), row=1, col=1)
+        fig.add_trace(go.Bar(x=candles.index, y=candles['Volume'], name='Volume'), row=2, col=1)
+        return fig.to_json()
+    return run
+
+
+def _history(k, n_tickers=50, seed=0):
+    """A plausible trade history of ``k`` trades: buys, then partial sells of held lots."""
+    rng = np.random.default_rng(seed)
+    names, held, history = tickers(n_tickers), {}, []
+    stamps = np.datetime64('2016-01-04T10:00') + np.sort(rng.integers(0, 10 * 365 * 24 * 60, k)).astype('timedelta64[m]')
+    for stamp in stamps:
+        ticker = names[rng.integers(n_tickers)]
+        shares = int(rng.integers(1, 20))
+        sell = held.get(ticker, 0) >= shares and rng.random() < 0.4
+        held[ticker] = held.get(ticker, 0) + (-shares if sell else shares)
+        history.append({'timestamp': str(stamp), 'type': 'SELL' if sell else 'BUY', 'ticker': ticker, 'shares': shares, 'price': float(rng.uniform(20, 500)), 'profit_loss': 0.0})
+    portfolio = {t: {'shares': s, 'avg_price': 100.0} for t, s in held.items() if s}
+    return history, portfolio
+
+
+def _account(store, name, k):
+    account_id, _ = store.open_account(name)
+    history, portfolio = _history(k)
+    store.import_state(account_id, {'cash_balance': 1e9, 'portfolio': portfolio, 'trade_history': history})
+    return account_id
+
+
+def _preferences(n, i=0):
+    """The preference keys TradingApp's Save Session writes, with an ``n``-ticker watchlist."""
+    return {'watchlist': tickers(n), 'main_ticker': f"SYN{i % 100:04d}", 'chart_period': '1mo', 'chart_interval': '1d', 'show_ema20': True,
+            'show_sma10': False, 'show_sma20': False, 'show_sma50': bool(i % 2), 'show_ema200': False, 'auto_refresh': False, 'refresh_seconds': 30}
+
+
+@benchmark(sizes=[10, 100, 1_000], quick=[10, 100], unit="watchlist tickers")
+def save_state(n):
+    """One Save Session click: the changed preferences appended to the account's journal, compactions included."""
+    from journal import journal_for
+    journal, saves = journal_for(f"account_save_{n}"), itertools.count()
+    journal.save(_preferences(n))
+    return lambda: journal.save(_preferences(n, next(saves)))
+
+
+@benchmark(sizes=[10, 100, 400], quick=[10, 100], unit="saves")
+def load_state(n):
+    """One Load Session click: preferences rebuilt from the snapshot plus the journal tail of ``n`` saves."""
+    from journal import journal_for
+    journal = journal_for(f"account_load_{n}")
+    for i in range(n): journal.save(_preferences(100, i))     # sizes stay under COMPACT_EVERY, so nothing is compacted
+    return journal.load
+
+
+@benchmark(sizes=[100, 1_000, 10_000, 100_000], quick=[100, 1_000], unit="trades")
+def import_state(k):
+    """Carrying a single-user save with ``k`` trades into the account store: one transactional import."""
+    from storage import AccountStore
+    store = AccountStore(os.path.join(WORKDIR, f"import_{k}.db"))
+    history, portfolio = _history(k)
+    state = {'cash_balance': 1e9, 'portfolio': portfolio, 'trade_history': history}
+    names = (f"bench{i}" for i in itertools.count())
+    return lambda: store.import_state(store.open_account(next(names))[0], state)
+
+
+@benchmark(sizes=[100, 1_000, 10_000, 100_000], quick=[100, 1_000], unit="trades")
+def open_account(k):
+    """A session opening an account with ``k`` trades: status, positions and trades read into an Account."""
+    from storage import AccountStore
+    from trading_core import TradingCore
+    store = AccountStore(os.path.join(WORKDIR, f"open_{k}.db"))
+    _account(store, "bench", k)
+    core = TradingCore(store, hours=None)
+    return lambda: core.open("bench")
+
+
+@benchmark(sizes=[100, 10_000, 100_000], quick=[100], unit="trades")
+def trade(k):
+    """One buy transaction against an account that already holds ``k`` trades."""
+    from storage import AccountStore
+    store = AccountStore(os.path.join(WORKDIR, f"trade_{k}.db"))
+    account_id = _account(store, "bench", k)
+    return lambda: store.buy(account_id, "SYN0000", 1, 100.0)
+
+
+@benchmark(sizes=[1, 100, 10_000, 100_000], quick=[1, 10_000], unit="orders")
+def submit_orders(n):
+    """One batch of ``n`` market orders through ``TradingCore.execute``, the path the order form takes."""
+    from storage import AccountStore
+    from trading_core import OrderRequest, TradingCore
+    store = AccountStore(os.path.join(WORKDIR, f"orders_{n}.db"))
+    core = TradingCore(store, hours=None)
+    account_id, _ = store.open_account("bench", cash=1e12)
+    names, rng = tickers(100), np.random.default_rng(0)
+    orders = [OrderRequest('SELL' if i % 3 == 2 else 'BUY', names[i % 100], int(rng.integers(1, 20)), float(rng.uniform(20, 500))) for i in range(n)]
+    return lambda: core.execute(account_id, orders)
+
+
+@benchmark(sizes=[100, 1_000, 10_000], quick=[100], unit="trades")
+def portfolio_analytics(k):
+    """Cold equity-curve replay of ``k`` trades over ten years of daily bars."""
+    from portfolio_analytics import PortfolioAnalytics
+    from storage import Trade
+    history, _ = _history(k)
+    trades = [Trade(i, int(np.datetime64(t['timestamp'], 'ns').astype(np.int64)), t['type'], t['ticker'], t['shares'], t['price'], t['profit_loss']) for i, t in enumerate(history, 1)]
+    return lambda: PortfolioAnalytics().update(trades).stats(1e9)
+
+
+@benchmark(sizes=[10, 100, 500, 2000], quick=[10, 100], unit="tickers")
+def screener(n):
+    """Screening a warm watchlist of ``n`` tickers: bulk daily bars plus the columnar indicator pass."""
+    from screener import screen
+    watchlist = tickers(n)
+    screen(watchlist)   # first call fetches and stores the bars
+    return lambda: screen(watchlist)
+
+
+@benchmark(sizes=[0, 10, 100], quick=[0, 10], unit="positions")
+def app_rerun(n):
+    """A full headless rerun of TradingApp.py with ``n`` open positions."""
+    from streamlit.testing.v1 import AppTest
+    from storage import account_store
+    account_id, _ = account_store.open_account("default")
+    portfolio = {t: {'shares': 10, 'avg_price': 100.0, 'stop_loss': 50.0} for t in tickers(n)}
+    account_store.import_state(account_id, {'cash_balance': 1e6, 'portfolio': portfolio, 'trade_history': []})
+    app = AppTest.from_file(os.path.join(ROOT, "TradingApp.py"), default_timeout=120)
+    app.run()   # first run pays imports and cold caches
+
+    def run():
+        app.run()
+        if app.exception: raise RuntimeError(app.exception[0].value)
+    return run
+
+
+# --- Harness ---
+def measure(fn, repeats, min_time):
+    times, started = [], time.perf_counter()
+    while len(times) < repeats or time.perf_counter() - started < min_time:
+        t0 = time.perf_counter(); fn(); times.append(time.perf_counter() - t0)
+        if len(times) >= MAX_RUNS: break
+    return times
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names, quick, repeats, min_time, seed):
+    quote_cache.set_provider(SyntheticProvider(seed))
+    results = []
+    for name in names:
+        setup, sizes, quick_sizes, unit = BENCHMARKS[name]
+        for size in (quick_sizes if quick else sizes):
+            fn = setup(size)
+            times = measure(fn, repeats, min_time)
+            row = {'name': name, 'size': size, 'unit': unit, 'runs': len(times), 'min': min(times), 'median': statistics.median(times), 'mean': statistics.fmean(times), 'max': max(times)}
+            results.append(row)
+            print(f"{name:<22} {size:>10,} {unit:<10} median {row['median'] * 1e3:10.3f} ms  (min {row['min'] * 1e3:.3f}, {len(times)} runs)", flush=True)
+    return {
+        'meta': {'timestamp': datetime.now().isoformat(), 'revision': git_revision(), 'python': platform.python_version(), 'platform': platform.platform(),
+                 'cpus': os.cpu_count(), 'seed': seed, 'quick': quick},
+        'results': results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Prints median ratios against ``baseline``; returns the rows slower than ``threshold``."""
+    old = {(r['name'], r['size']): r for r in baseline['results']}
+    regressions = []
+    for row in report['results']:
+        prev = old.get((row['name'], row['size']))
+        if prev is None: continue
+        ratio = row['median'] / prev['median']
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{row['name']:<22} {row['size']:>10,}  {ratio:6.2f}x{flag}")
+        if flag: regressions.append({**row, 'baseline_median': prev['median'], 'ratio': ratio})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument("--only", action="append", help="run benchmarks whose name contains this (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="smallest sizes only")
+    parser.add_argument("--repeats", type=int, default=5, help="minimum runs per size")
+    parser.add_argument("--min-time", type=float, default=0.5, help="minimum seconds spent per size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="report path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="baseline report to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="median slowdown ratio that counts as a regression")
+    parser.add_argument("--list", action="store_true", help="list benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (setup, sizes, _, unit) in BENCHMARKS.items(): print(f"{name:<22} {unit:<10} {sizes}  {setup.__doc__}")
+        return 0
+    names = [n for n in BENCHMARKS if not args.only or any(o in n for o in args.only)]
+    report = run(names, args.quick, args.repeats, args.min_time, args.seed)
+    out = os.path.join(CALLER_CWD, args.out) if args.out else os.path.join(ROOT, "benchmarks", "results", f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    if args.compare:
+        with open(os.path.join(CALLER_CWD, args.compare)) as f:
+            report['regressions'] = compare(report, json.load(f), args.threshold)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {out}")
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
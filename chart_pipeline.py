@@ -0,0 +1,102 @@
+"""Server-side downsampling for the interactive chart.
+
+The browser never needs more points than it has pixels, so before a figure
+is built the visible window is reduced to a fixed budget:
+
+* candles and volume are aggregated into equal-count OHLCV buckets (first
+  open, max high, min low, last close, summed volume);
+* indicator lines are thinned with Largest-Triangle-Three-Buckets, which
+  keeps the visually significant turning points;
+* line traces switch to WebGL (``Scattergl``) above ``WEBGL_THRESHOLD``.
+
+When the user zooms into a window that the selected interval covers with
+only a few bars, ``finer_interval`` picks a finer yfinance interval for that
+window so zooming in reveals real detail instead of stretched candles.
+"""
+import numpy as np
+import pandas as pd
+
+CANDLE_BUDGET = 600         # candles the chart can show legibly
+LINE_BUDGET = 1500          # points per indicator line
+WEBGL_THRESHOLD = 1000
+SESSION_MINUTES = 390       # regular US session, 9:30-16:00
+# interval -> (minutes per bar, how many days back yfinance serves it)
+FINER_INTERVALS = {'1h': (60, 730), '30m': (30, 60), '15m': (15, 60), '5m': (5, 60), '2m': (2, 60), '1m': (1, 30)}
+INTERVAL_MINUTES = {'1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30, '1h': 60, '1d': SESSION_MINUTES, '1wk': 5 * SESSION_MINUTES}
+
+
+def aggregate_ohlcv(frame, max_bars=CANDLE_BUDGET):
+    """Aggregates an OHLCV frame into at most ``max_bars`` equal-count buckets."""
+    n = len(frame)
+    if n <= max_bars: return frame
+    starts = np.linspace(0, n, max_bars + 1).astype(np.int64)[:-1]
+    ends = np.r_[starts[1:], n] - 1
+    return pd.DataFrame({
+        'Open': frame['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(frame['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(frame['Low'].to_numpy(), starts),
+        'Close': frame['Close'].to_numpy()[ends],
+        'Volume': np.add.reduceat(frame['Volume'].to_numpy(), starts),
+    }, index=frame.index[starts])
+
+
+def lttb_indices(x, y, threshold):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps out of (x, y)."""
+    n = len(y)
+    if threshold >= n or threshold < 3: return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample_line(index, values, threshold=LINE_BUDGET):
+    """Thins one indicator line to ``threshold`` points; leading NaNs are dropped."""
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(values))
+    if not valid.size: return index[:0], values[:0]
+    x = index.asi8[valid].astype(np.float64)
+    keep = valid[lttb_indices(x, values[valid], threshold)]
+    return index[keep], values[keep]
+
+
+def line_trace(n_points):
+    """The Plotly line trace class to use for ``n_points`` points."""
+    import plotly.graph_objects as go   # deferred: only chart drawing needs plotly
+    return go.Scattergl if n_points > WEBGL_THRESHOLD else go.Scatter
+
+
+def finer_interval(interval, start, end, now=None):
+    """A finer interval that covers [start, end] within the bar budget, or None.
+
+    Picks the finest interval whose estimated bar count fits ``CANDLE_BUDGET``
+    and that yfinance still serves that far back.
+    """
+    now = now or pd.Timestamp.now(tz=start.tz)
+    current = INTERVAL_MINUTES.get(interval)
+    if current is None: return None
+    sessions = max(np.busday_count(start.date(), end.date()) + 1, 1)
+    age_days = (now - start).days
+    best = None
+    for candidate, (minutes, max_age) in FINER_INTERVALS.items():
+        if minutes >= current or age_days > max_age: continue
+        if sessions * SESSION_MINUTES / minutes <= CANDLE_BUDGET: best = candidate
+    return best
+
+
+def prepare(frame, line_names):
+    """Reduces a chart window to its drawable budget.
+
+    Returns (candles, lines) where ``candles`` is the aggregated OHLCV frame
+    and ``lines`` maps each indicator column name to its thinned (x, y).
+    """
+    lines = {name: downsample_line(frame.index, frame[name].to_numpy()) for name in line_names if name in frame}
+    return aggregate_ohlcv(frame), lines
@@ -0,0 +1,252 @@
+"""Cached, incremental technical indicators (SMA, EMA, RSI).
+
+Indicators are computed over the full stored bar series for a
+(ticker, interval) and kept per (ticker, interval, kind, length):
+
+* cold: every requested indicator is computed in one vectorized pass;
+* warm: when the series only grew (or its last, still-forming bar changed),
+  the engine resumes from the state it saved before the last bar, so each
+  new bar costs O(1) regardless of history length;
+* unchanged: results are memoized on the last bar's timestamp and close.
+
+Values match pandas_ta's ``sma``/``ema`` (SMA-seeded) and ``rsi`` defaults.
+``columnar`` computes the same indicators for many series at once, one
+column per symbol, for screens that only need the latest values.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from tracing import tracer
+
+NAN = float('nan')
+
+
+def indicator_name(kind, length):
+    return f"{kind.upper()}_{length}"
+
+
+# --- Cold (vectorized) computation ---
+# Each returns (values, state), where state describes the series through the
+# second-to-last bar, ready for ``_step`` to recompute the last one.
+def _sma_cold(closes, length):
+    n = len(closes)
+    csum = np.concatenate([[0.0], np.cumsum(closes)])
+    values = np.full(n, NAN)
+    if n >= length: values[length - 1:] = (csum[length:] - csum[:-length]) / length
+    k = n - 1   # bars committed to state
+    total = csum[k] - csum[max(k - length, 0)]
+    return values, (total, k)
+
+
+def _ema_cold(closes, length):
+    n = len(closes)
+    values = np.full(n, NAN)
+    if n >= length:
+        seeded = closes.astype(np.float64, copy=True)
+        seeded[length - 1] = closes[:length].mean()
+        values[length - 1:] = pd.Series(seeded[length - 1:]).ewm(span=length, adjust=False).mean().to_numpy()
+    k = n - 1
+    acc = values[k - 1] if k >= length else closes[:k].sum()
+    return values, (acc, k)
+
+
+def _rsi_cold(closes, length):
+    n = len(closes)
+    values = np.full(n, NAN)
+    if n < 2: return values, (0.0, 0.0, 0.0, 0)
+    diff = np.diff(closes)
+    up, down = np.clip(diff, 0, None), np.clip(diff, None, 0)
+    alpha = 1.0 / length
+    avg_up = pd.Series(up).ewm(alpha=alpha, adjust=True).mean().to_numpy()
+    avg_down = pd.Series(down).ewm(alpha=alpha, adjust=True).mean().to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsi = 100 * avg_up / (avg_up + np.abs(avg_down))
+    rsi[:length - 1] = NAN      # pandas_ta's min_periods=length
+    values[1:] = rsi
+    # ewm(adjust=True) is num/den with den = sum of decay weights; keep both.
+    k = n - 2   # diffs committed to state
+    den = (1 - (1 - alpha) ** k) / alpha
+    return values, ((avg_up[k - 1] * den) if k else 0.0, (avg_down[k - 1] * den) if k else 0.0, den, k)
+
+
+_COLD = {'sma': _sma_cold, 'ema': _ema_cold, 'rsi': _rsi_cold}
+
+
+def sma(closes, length):
+    """Simple moving average of a close array (uncached)."""
+    return _sma_cold(np.asarray(closes, dtype=np.float64), length)[0]
+
+
+def ema(closes, length):
+    """SMA-seeded exponential moving average of a close array (uncached)."""
+    return _ema_cold(np.asarray(closes, dtype=np.float64), length)[0]
+
+
+def rsi(closes, length=14):
+    """Wilder-style relative strength index of a close array (uncached)."""
+    return _rsi_cold(np.asarray(closes, dtype=np.float64), length)[0]
+
+
+# --- Columnar (many series) computation ---
+def columnar(closes, specs):
+    """Computes ``specs`` over a (bars x series) close matrix, one vector step per bar.
+
+    Each column holds one series, right-aligned and NaN-padded at the top
+    where its history is shorter.  Returns {name: matrix} of the same shape,
+    with every column equal to the single-series function over its own bars.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    rows, cols = closes.shape
+    valid = ~np.isnan(closes)
+    csum = np.vstack([np.zeros((1, cols)), np.cumsum(np.where(valid, closes, 0.0), axis=0)])
+    count = np.vstack([np.zeros((1, cols)), np.cumsum(valid, axis=0)])
+
+    def rolling_mean(length):
+        values = np.full(closes.shape, NAN)
+        if rows >= length:
+            full = count[length:] - count[:-length] == length
+            values[length - 1:] = np.where(full, (csum[length:] - csum[:-length]) / length, NAN)
+        return values
+
+    out = {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for kind, length in specs:
+            if kind == 'sma':
+                values = rolling_mean(length)
+            elif kind == 'ema':
+                # each column starts from the SMA of its first ``length`` closes
+                seeds, alpha = rolling_mean(length), 2.0 / (length + 1)
+                values, prev = np.full(closes.shape, NAN), np.full(cols, NAN)
+                for r in range(rows):
+                    prev = values[r] = np.where(np.isnan(prev), seeds[r], prev + alpha * (closes[r] - prev))
+            else:
+                # ewm(adjust=True) numerators; the shared denominator cancels out of the ratio
+                decay = 1 - 1.0 / length
+                values, up, down, seen = np.full(closes.shape, NAN), np.zeros(cols), np.zeros(cols), np.zeros(cols)
+                for r in range(1, rows):
+                    d = closes[r] - closes[r - 1]
+                    ok = ~np.isnan(d); d = np.where(ok, d, 0.0)
+                    up = np.where(ok, up * decay + np.maximum(d, 0.0), up)
+                    down = np.where(ok, down * decay + np.maximum(-d, 0.0), down)
+                    seen += ok
+                    values[r] = np.where(seen >= length, 100 * up / (up + down), NAN)
+            out[indicator_name(kind, length)] = values
+    return out
+
+
+# --- Streaming (one bar) updates ---
+def _step(kind, length, state, closes, i):
+    """Folds bar ``i`` into ``state``; returns (new_state, value at i)."""
+    x = closes[i]
+    if kind == 'sma':
+        total, k = state
+        total += x - (closes[i - length] if k >= length else 0.0)
+        return (total, k + 1), (total / length if k + 1 >= length else NAN)
+    if kind == 'ema':
+        acc, k = state
+        if k + 1 < length: return (acc + x, k + 1), NAN
+        if k + 1 == length:
+            ema = (acc + x) / length
+        else:
+            ema = acc + 2.0 / (length + 1) * (x - acc)
+        return (ema, k + 1), ema
+    # rsi: state holds the ewm(adjust=True) numerators/denominator over diffs
+    num_up, num_down, den, k = state
+    if i == 0: return state, NAN
+    d = x - closes[i - 1]
+    decay = 1 - 1.0 / length
+    num_up = num_up * decay + max(d, 0.0)
+    num_down = num_down * decay + min(d, 0.0)
+    den = den * decay + 1
+    total = num_up + abs(num_down)
+    value = 100 * num_up / total if k + 1 >= length and total else NAN
+    return (num_up, num_down, den, k + 1), value
+
+
+class _Entry:
+    """Cached output buffer plus resume state for one indicator on one series."""
+    __slots__ = ('first_ts', 'last_ts', 'last_close', 'n', 'values', 'state')
+
+
+class IndicatorEngine:
+    """Process-wide memo of indicator series keyed by (ticker, interval, kind, length)."""
+
+    def __init__(self):
+        self.cold = 0
+        self.warm = 0
+        self.hits = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def compute(self, key, ts, closes, specs):
+        """Returns {name: values} for ``specs`` over the series (``ts``, ``closes``).
+
+        ``key`` identifies the series, usually (ticker, interval); ``ts`` holds
+        int64 bar timestamps and ``specs`` is an iterable of (kind, length).
+        The returned arrays are aligned with ``ts`` and must not be modified.
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        n = len(closes)
+        out = {}
+        with self._lock:
+            cold = []
+            for kind, length in specs:
+                entry = self._entries.get((*key, kind, length))
+                name = indicator_name(kind, length)
+                if n == 0:
+                    out[name] = np.empty(0)
+                elif entry is None or entry.first_ts != ts[0] or entry.n > n or entry.n < 2 or ts[entry.n - 1] != entry.last_ts:
+                    cold.append((kind, length))
+                elif entry.n == n and closes[-1] == entry.last_close:
+                    self.hits += 1; tracer.count("indicators.hit")
+                    out[name] = entry.values[:n]
+                else:
+                    self.warm += 1; tracer.count("indicators.warm")
+                    out[name] = self._resume(entry, kind, length, ts, closes)
+            for kind, length in cold:
+                self.cold += 1; tracer.count("indicators.cold")
+                values, state = _COLD[kind](closes, length)
+                entry = _Entry()
+                entry.values, entry.state = values, state
+                self._finish(entry, ts, closes)
+                self._entries[(*key, kind, length)] = entry
+                out[indicator_name(kind, length)] = values[:n]
+        return out
+
+    def _resume(self, entry, kind, length, ts, closes):
+        """Recomputes from the second-to-last cached bar to the new end of the series."""
+        n = len(closes)
+        if len(entry.values) < n:
+            grown = np.full(max(n, 2 * len(entry.values)), NAN)
+            grown[:entry.n] = entry.values[:entry.n]
+            entry.values = grown
+        state = entry.state
+        for i in range(entry.n - 1, n - 1):
+            state, entry.values[i] = _step(kind, length, state, closes, i)
+        entry.state = state
+        _, entry.values[n - 1] = _step(kind, length, state, closes, n - 1)
+        self._finish(entry, ts, closes)
+        return entry.values[:n]
+
+    @staticmethod
+    def _finish(entry, ts, closes):
+        entry.first_ts, entry.last_ts = ts[0], ts[-1]
+        entry.last_close, entry.n = closes[-1], len(closes)
+
+    def for_frame(self, key, full, frame, specs):
+        """Computes ``specs`` over the full series ``full`` and aligns them to ``frame``.
+
+        ``frame`` must be a contiguous slice of ``full`` (as served by the bar
+        store).  Returns {name: values} with one value per row of ``frame``.
+        """
+        if full.empty or frame.empty:
+            return {indicator_name(kind, length): np.full(len(frame), NAN) for kind, length in specs}
+        ts = full.index.as_unit('ns').asi8
+        values = self.compute(key, ts, full['Close'].to_numpy(), specs)
+        lo = int(np.searchsorted(ts, frame.index[:1].as_unit('ns').asi8[0]))
+        return {name: v[lo:lo + len(frame)] for name, v in values.items()}
+
+
+indicator_engine = IndicatorEngine()
@@ -0,0 +1,133 @@
+"""Append-only journal with compacted snapshots for saved sessions.
+
+A saved session lives in two files:
+
+    <name>.snapshot.json   the compacted state and the last sequence it covers
+    <name>.journal         one JSON event per line, appended by every save
+
+A legacy ``portfolio.json`` full dump is used as the base state until the
+first snapshot is written.
+
+Each save appends only what changed since the previous one: new trades as
+``trade`` events and changed keys (cash balance, portfolio, ...) as ``set``
+events, then fsyncs.  Every ``compact_every`` events the state is rewritten
+as a new snapshot via write-to-temp + ``os.replace`` and the journal is
+truncated, so a crash at any point leaves a loadable copy: journal lines
+already covered by the snapshot are skipped, and a torn last line is ignored.
+"""
+import copy
+import json
+import os
+import threading
+
+COMPACT_EVERY = 500
+LEGACY_PATH = "portfolio.json"
+
+
+class SessionJournal:
+    """Saves and loads session state through a write-ahead journal."""
+
+    def __init__(self, name="portfolio", compact_every=COMPACT_EVERY):
+        self.snapshot_path = f"{name}.snapshot.json"
+        self.journal_path = f"{name}.journal"
+        self.compact_every = compact_every
+        self._state = None      # what is on disk, as of our last load or save
+        self._seq = 0           # sequence number of the last event on disk
+        self._pending = 0       # events in the journal since the last snapshot
+        self._lock = threading.Lock()
+
+    def exists(self):
+        return any(os.path.exists(p) for p in (self.snapshot_path, self.journal_path, LEGACY_PATH))
+
+    def _read(self):
+        """Rebuilds the persisted state from the snapshot plus the journal tail."""
+        state, seq, pending = {}, 0, 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r') as f:
+                snapshot = json.load(f)
+            state, seq = snapshot['state'], snapshot['seq']
+        elif os.path.exists(LEGACY_PATH):
+            with open(LEGACY_PATH, 'r') as f:
+                state = json.load(f)
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r+b') as f:
+                good = 0
+                for line in f:
+                    try:
+                        if not line.endswith(b'\n'): raise ValueError("unterminated line")
+                        event = json.loads(line)
+                    except ValueError:
+                        # Torn write at the tail, even one that still parses: its save never
+                        # finished, and dropping it keeps later appends on their own lines.
+                        f.truncate(good)
+                        break
+                    good += len(line)
+                    if event['seq'] <= seq: continue
+                    if event['op'] == 'trade': state.setdefault('trade_history', []).append(event['val'])
+                    else: state[event['key']] = event['val']
+                    seq = event['seq']; pending += 1
+        self._state, self._seq, self._pending = state, seq, pending
+        return state
+
+    def load(self):
+        """Returns the saved state, or None if nothing has been saved."""
+        with self._lock:
+            if not self.exists(): return None
+            return copy.deepcopy(self._read())
+
+    def _diff(self, state):
+        """Events that bring the persisted state up to ``state``."""
+        events = []
+        for key, val in state.items():
+            old = self._state.get(key)
+            if key == 'trade_history' and isinstance(val, list) and isinstance(old, list) \
+                    and len(val) >= len(old) and (not old or val[len(old) - 1] == old[-1]):
+                # Trade history only grows: journal just the new entries.
+                events.extend({'op': 'trade', 'val': trade} for trade in val[len(old):])
+            elif key not in self._state or old != val:
+                events.append({'op': 'set', 'key': key, 'val': val})
+        return events
+
+    def save(self, state):
+        """Appends the changes since the last save; returns how many events were written."""
+        with self._lock:
+            if self._state is None: self._read()
+            events = self._diff(state)
+            if not events: return 0
+            lines = []
+            for event in events:
+                self._seq += 1
+                event['seq'] = self._seq
+                lines.append(json.dumps(event))
+            with open(self.journal_path, 'a') as f:
+                f.write('\n'.join(lines) + '\n')
+                f.flush(); os.fsync(f.fileno())
+            for event in events:
+                if event['op'] == 'trade': self._state.setdefault('trade_history', []).append(copy.deepcopy(event['val']))
+                else: self._state[event['key']] = copy.deepcopy(event['val'])
+            self._pending += len(events)
+            if self._pending >= self.compact_every: self._compact()
+            return len(events)
+
+    def _compact(self):
+        """Writes a fresh snapshot atomically, then truncates the journal."""
+        tmp = self.snapshot_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'seq': self._seq, 'state': self._state}, f)
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        # A crash before this truncate is harmless: covered events are skipped on load.
+        with open(self.journal_path, 'w'): pass
+        self._pending = 0
+
+
+session_journal = SessionJournal()
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def journal_for(name):
+    """Returns the process-wide journal for ``name``, so saves to one file stay serialized."""
+    with _journals_lock:
+        if name not in _journals: _journals[name] = SessionJournal(name=name)
+        return _journals[name]
@@ -0,0 +1,14 @@
+"""Static content for the Learn tab: recommended videos and the quiz question bank."""
+
+LEARN_VIDEOS = ["https://www.youtube.com/watch?v=xgaep2fI6-Q", "https://www.youtube.com/watch?v=YGv6St0gy_I"]
+
+QUIZ_BANK = [
+    {"question": "What does a green candlestick typically represent?", "options": ["The price went down", "The price went up", "The price stayed the same", "The market is closed"], "answer": "The price went up"},
+    {"question": "What is the primary purpose of a 'Stop-Loss' order?", "options": ["To guarantee a profit", "To enter a trade at a specific price", "To limit potential losses on a trade", "To buy more shares automatically"], "answer": "To limit potential losses on a trade"},
+    {"question": "The 'EMA (200)' on a chart is most often used to identify what?", "options": ["Short-term momentum", "The day's trading volume", "The long-term trend", "Immediate price reversals"], "answer": "The long-term trend"},
+    {"question": "High trading 'Volume' during a price increase is often a sign of what?", "options": ["A weak trend", "A strong trend", "An impending price drop", "Low interest in the stock"], "answer": "A strong trend"},
+    {"question": "What does 'RSI' stand for?", "options": ["Real-time Stock Index", "Relative Strength Index", "Return on Stock Investment", "Resistant Stock Indicator"], "answer": "Relative Strength Index"},
+    {"question": "An RSI value above 70 often suggests a stock is...", "options": ["Oversold", "Fairly valued", "Overbought", "About to split"], "answer": "Overbought"},
+    {"question": "A 'Take-Profit' order is used to...", "options": ["Automatically sell a stock to lock in profits at a target price", "Buy a stock when it hits a low price", "Cancel another order", "Calculate your total profit"], "answer": "Automatically sell a stock to lock in profits at a target price"},
+    {"question": "The 'spread' in trading is the difference between...", "options": ["The high and low price of the day", "The bid and ask price", "The opening and closing price", "Your entry and exit price"], "answer": "The bid and ask price"}
+]
@@ -0,0 +1,135 @@
+"""FIFO lot ledger and batch trade analysis.
+
+The ledger replays the account's ``Trade`` records once, converting their
+int64 times in a single vectorized call, and keeps open lots per ticker in
+FIFO order. Each sell is matched against lots FIFO (or against one
+specific lot by id), which handles partial fills and positions built from
+several buys. New trades are folded in incrementally with ``extend``.
+
+``analyze_matches`` then scores every matched lot at once: trades are
+grouped by ticker, each ticker's daily bars are loaded from the bar store
+once, and entry RSI, max favorable excursion and missed profit are
+computed with array operations over all of that ticker's trades.
+"""
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from bar_store import bar_store
+from indicators import indicator_engine
+
+RSI_WARMUP = pd.Timedelta(days=365)
+MATCH_COLUMNS = ['sell_id', 'buy_id', 'ticker', 'shares', 'buy_price', 'sell_price', 'buy_time', 'sell_time']
+
+
+class Lot:
+    __slots__ = ('id', 'ticker', 'shares', 'price', 'opened')
+
+    def __init__(self, id, ticker, shares, price, opened):
+        self.id, self.ticker, self.shares, self.price, self.opened = id, ticker, shares, price, opened
+
+
+class LotLedger:
+    """Open lots per ticker plus the history of sell-to-lot matches.
+
+    Lot ids are the ``Trade.id`` of the opening BUY, as assigned by the
+    account store, and matches name each sell by its ``Trade.id`` too.
+    """
+
+    def __init__(self):
+        self.open = {}          # ticker -> deque of Lots, oldest first
+        self.lots = {}          # lot id -> Lot, for specific-lot sells
+        self.matches = []       # tuples in MATCH_COLUMNS order
+        self.n = 0              # trade_history entries consumed
+
+    @classmethod
+    def from_history(cls, trade_history):
+        ledger = cls()
+        ledger.extend(trade_history)
+        return ledger
+
+    def extend(self, trade_history):
+        """Folds in the trades appended since the last call."""
+        new = trade_history[self.n:]
+        if not new: return
+        times = pd.DatetimeIndex(np.array([t.time for t in new], dtype='M8[ns]'))
+        for trade, opened in zip(new, times):
+            if trade.side == 'BUY': self.buy(trade.ticker, trade.shares, trade.price, opened, trade.id)
+            else: self.sell(trade.ticker, trade.shares, trade.price, opened, trade.id)
+        self.n = len(trade_history)
+
+    def buy(self, ticker, shares, price, opened, lot_id):
+        lot = Lot(lot_id, ticker, shares, price, opened)
+        self.open.setdefault(ticker, deque()).append(lot)
+        self.lots[lot_id] = lot
+        return lot
+
+    def _take(self, lot, shares, price, closed, sell_id):
+        self.matches.append((sell_id, lot.id, lot.ticker, shares, lot.price, price, lot.opened, closed))
+        lot.shares -= shares
+        if not lot.shares: self.lots.pop(lot.id, None)
+
+    def sell(self, ticker, shares, price, closed, sell_id, lot_id=None):
+        """Matches ``shares`` against open lots; returns the shares left unmatched."""
+        if lot_id is not None:
+            lot = self.lots.get(lot_id)
+            if lot is None or lot.ticker != ticker: return shares
+            take = min(shares, lot.shares)
+            self._take(lot, take, price, closed, sell_id)
+            shares -= take      # emptied lots are skipped when they reach the FIFO head
+        lots = self.open.get(ticker, ())
+        while shares and lots:
+            lot = lots[0]
+            if not lot.shares: lots.popleft(); continue
+            take = min(shares, lot.shares)
+            self._take(lot, take, price, closed, sell_id)
+            shares -= take
+            if not lot.shares: lots.popleft()
+        return shares
+
+    def matches_frame(self, sell_id=None):
+        """Matches as a DataFrame, optionally only those closing one sell."""
+        rows = self.matches if sell_id is None else [m for m in self.matches if m[0] == sell_id]
+        frame = pd.DataFrame(rows, columns=MATCH_COLUMNS)
+        frame['realized_pl'] = (frame['sell_price'] - frame['buy_price']) * frame['shares']
+        return frame
+
+
+def _bar_positions(bar_ts, times, tz):
+    """Index of the bar in effect at each timestamp, -1 before the first bar (naive times are exchange-local)."""
+    times = pd.DatetimeIndex(times)
+    if tz is not None: times = times.tz_localize(tz) if times.tz is None else times.tz_convert(tz)
+    return np.searchsorted(bar_ts, times.as_unit('ns').asi8, side='right') - 1
+
+
+def analyze_matches(matches):
+    """Adds entry RSI, max favorable excursion and missed profit to each match row.
+
+    Bars are fetched once per ticker, covering all of its trades plus a
+    year of RSI warm-up. Rows whose ticker has no bars get NaN scores.
+    """
+    out = matches.copy()
+    for col in ('entry_rsi', 'max_high', 'max_potential', 'missed_profit'): out[col] = np.nan
+    for ticker, group in matches.groupby('ticker'):
+        start = (group['buy_time'].min() - RSI_WARMUP).strftime('%Y-%m-%d')
+        end = (group['sell_time'].max() + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+        try:
+            bars = bar_store.bars(ticker, "1d", start=start, end=end)
+        except Exception:
+            continue
+        if bars.empty: continue
+        rsi = indicator_engine.for_frame((ticker, "1d"), bar_store.stored(ticker, "1d"), bars, [('rsi', 14)])['RSI_14']
+        bar_ts = bars.index.as_unit('ns').asi8
+        lo = _bar_positions(bar_ts, group['buy_time'], bars.index.tz)
+        hi = _bar_positions(bar_ts, group['sell_time'], bars.index.tz)
+        first = np.maximum(lo, 0)                              # a lot bought before the first bar is scored from it on
+        highs = np.r_[bars['High'].to_numpy(), -np.inf]       # sentinel so hi + 1 is a valid index
+        bounds = np.column_stack([first, np.maximum(hi, first) + 1]).ravel()
+        max_high = np.where(hi >= 0, np.maximum.reduceat(highs, bounds)[::2], np.nan)
+        potential = (max_high - group['buy_price'].to_numpy()) * group['shares'].to_numpy()
+        out.loc[group.index, 'entry_rsi'] = np.where(lo >= 0, rsi[first], np.nan)     # but has no entry RSI
+        out.loc[group.index, 'max_high'] = max_high
+        out.loc[group.index, 'max_potential'] = potential
+        out.loc[group.index, 'missed_profit'] = potential - group['realized_pl'].to_numpy()
+    return out
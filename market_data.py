@@ -0,0 +1,391 @@
+"""Market data providers and the process-wide quote cache.
+
+Every quote the app shows goes through ``quote_cache``.  The cache lives at
+module level, so it is shared by every Streamlit session served by this
+process: one rerun (or ten open browser tabs) costs at most one upstream
+fetch per symbol per TTL window.
+"""
+import json
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from tracing import payload_bytes, tracer
+
+DEFAULT_TTL = 15.0          # seconds a quote stays fresh
+ERROR_TTL = 5.0             # failed lookups are retried after this long
+MAX_ENTRIES = 512           # symbols kept before LRU eviction kicks in
+MAX_WORKERS = 16            # concurrent upstream fetches for bulk lookups
+
+
+# --- Providers ---
+class YFinanceProvider:
+    """Live quotes from Yahoo Finance.
+
+    Providers may also implement ``info_many(tickers) -> (infos, errors)`` to
+    resolve several symbols in one upstream request; ``QuoteCache.get_many``
+    uses it when present and falls back to concurrent ``info`` calls.
+    Likewise ``history_many`` backs ``BarStore.bars_many``.
+    """
+    name = "yfinance"
+
+    @staticmethod
+    def _yf():
+        import yfinance as yf   # deferred: slow to import, and unused with offline providers
+        return yf
+
+    def info(self, ticker):
+        return self._yf().Ticker(ticker).info
+
+    def history(self, ticker, interval, period=None, start=None, end=None):
+        """Returns OHLCV bars; either ``period`` or ``start``/``end`` is given."""
+        yf = self._yf()
+        if period is not None:
+            return yf.Ticker(ticker).history(period=period, interval=interval)
+        return yf.Ticker(ticker).history(start=start, end=end, interval=interval)
+
+    def history_many(self, tickers, interval, period=None, start=None, end=None):
+        """Bars for many tickers from one ``yf.download`` call; returns ``(frames, errors)``."""
+        data = self._yf().download(list(tickers), period=period, start=start, end=end, interval=interval, group_by='ticker',
+                                   auto_adjust=True, ignore_tz=False, threads=True, progress=False)
+        frames, errors = {}, {}
+        present = set(data.columns.get_level_values(0)) if isinstance(data.columns, pd.MultiIndex) else set()
+        for ticker in tickers:
+            frame = data[ticker].dropna(how='all') if ticker in present else None
+            if frame is None or frame.empty: errors[ticker] = KeyError(f"No bars for {ticker}")
+            else: frames[ticker] = frame
+        return frames, errors
+
+    def news(self, ticker):
+        """Raw news items in whichever format the installed yfinance returns."""
+        return self._yf().Ticker(ticker).news
+
+
+class FixtureProvider:
+    """Offline provider that serves recorded quote snapshots.
+
+    ``quotes`` maps a ticker to either one info dict or a list of info dicts.
+    Lists are replayed in order, one snapshot per fetch, and the last one
+    sticks once the list is exhausted.  ``bars`` optionally maps a ticker to
+    an OHLCV DataFrame served by ``history`` regardless of interval, and
+    ``news`` to a list of raw news items.
+    """
+    name = "fixture"
+
+    def __init__(self, quotes=None, bars=None, news=None):
+        self.quotes = {t.upper(): q if isinstance(q, list) else [q] for t, q in (quotes or {}).items()}
+        self.bars = {t.upper(): df for t, df in (bars or {}).items()}
+        self.news_items = {t.upper(): items for t, items in (news or {}).items()}
+        self.cursor = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path, 'r') as f:
+            return cls(json.load(f))
+
+    def info(self, ticker):
+        with self._lock:
+            self.calls += 1
+            snapshots = self.quotes.get(ticker.upper())
+            if not snapshots:
+                raise KeyError(f"No fixture quote for {ticker}")
+            i = self.cursor.get(ticker, 0)
+            self.cursor[ticker] = min(i + 1, len(snapshots) - 1)
+            return dict(snapshots[i])
+
+    def history(self, ticker, interval, period=None, start=None, end=None):
+        with self._lock: self.calls += 1
+        bars = self.bars.get(ticker.upper())
+        if bars is None or bars.empty:
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+        if period is not None:
+            if period == 'max': return bars
+            return bars.loc[bars.index[-1] - period_offset(period):]
+        if start is not None: bars = bars.loc[as_timestamp(start, bars.index.tz):]
+        if end is not None: bars = bars.loc[:as_timestamp(end, bars.index.tz) - pd.Timedelta(1)]
+        return bars
+
+    def news(self, ticker):
+        with self._lock: self.calls += 1
+        return list(self.news_items.get(ticker.upper(), []))
+
+
+class SyntheticProvider:
+    """Seeded, offline market: random-walk bars and quotes for any ticker.
+
+    Each (ticker, interval) series is a geometric random walk of ``bars``
+    bars ending at ``anchor`` (default: today), generated once from a seed
+    derived from ``seed`` and the ticker, so every process sees the same
+    market.  Quotes start at the last daily close and take one random step
+    per ``info`` call.  ``news`` returns a few headlines per ticker for each
+    of the last days, plus one market-wide story per day shared by every
+    ticker.
+    """
+    name = "synthetic"
+    FREQS = {'1m': '1min', '2m': '2min', '5m': '5min', '15m': '15min', '30m': '30min', '60m': '1h', '1h': '1h', '1d': 'B', '1wk': 'W-FRI'}
+
+    def __init__(self, seed=0, bars=2520, volatility=0.02, tick_volatility=0.001, anchor=None):
+        self.seed, self.n_bars, self.volatility, self.tick_volatility = seed, bars, volatility, tick_volatility
+        self.anchor = pd.Timestamp(anchor or pd.Timestamp.now(tz='America/New_York').normalize())
+        self.calls = 0
+        self._series, self._quotes = {}, {}
+        self._lock = threading.Lock()
+
+    def _rng(self, *key):
+        return np.random.default_rng([self.seed, zlib.crc32('/'.join(key).encode())])
+
+    def series(self, ticker, interval='1d'):
+        """The full generated OHLCV frame for ``ticker`` at ``interval``."""
+        key = (ticker.upper(), interval)
+        frame = self._series.get(key)
+        if frame is None:
+            rng, n = self._rng(*key), self.n_bars
+            start_price = 20 + 480 * rng.random()
+            close = start_price * np.exp(np.cumsum(rng.normal(0, self.volatility, n)))
+            open_ = np.r_[start_price, close[:-1]] * (1 + rng.normal(0, self.volatility / 4, n))
+            wick = np.abs(rng.normal(0, self.volatility / 2, (2, n)))
+            index = pd.date_range(end=self.anchor, periods=n, freq=self.FREQS.get(interval, 'B'))
+            frame = pd.DataFrame({'Open': open_, 'High': np.maximum(open_, close) * (1 + wick[0]), 'Low': np.minimum(open_, close) * (1 - wick[1]),
+                                  'Close': close, 'Volume': rng.lognormal(14, 0.5, n).round()}, index=index)
+            with self._lock: frame = self._series.setdefault(key, frame)
+        return frame
+
+    def info(self, ticker):
+        daily = self.series(ticker)
+        with self._lock:
+            self.calls += 1
+            if ticker not in self._quotes: self._quotes[ticker] = (daily['Close'].iloc[-1], self._rng(ticker, 'quotes'))
+            price, rng = self._quotes[ticker]
+            price = round(float(price) * (1 + rng.normal(0, self.tick_volatility)), 2)
+            self._quotes[ticker] = (price, rng)
+        last = daily.iloc[-1]
+        return {'symbol': ticker, 'regularMarketPrice': price, 'previousClose': float(daily['Close'].iloc[-2]),
+                'dayLow': float(min(last['Low'], price)), 'dayHigh': float(max(last['High'], price)), 'volume': int(last['Volume'])}
+
+    def history(self, ticker, interval, period=None, start=None, end=None):
+        with self._lock: self.calls += 1
+        bars = self.series(ticker, interval)
+        if period is not None:
+            if period == 'max': return bars.copy()
+            return bars.loc[bars.index[-1] - period_offset(period):].copy()
+        if start is not None: bars = bars.loc[as_timestamp(start, bars.index.tz):]
+        if end is not None: bars = bars.loc[:as_timestamp(end, bars.index.tz) - pd.Timedelta(1)]
+        return bars.copy()
+
+    def history_many(self, tickers, interval, **kwargs):
+        """Every ticker's bars in one call, standing in for a batched download."""
+        return {ticker: self.history(ticker, interval, **kwargs) for ticker in tickers}, {}
+
+    def news(self, ticker, days=3, per_day=2):
+        with self._lock: self.calls += 1
+        ticker = ticker.upper()
+        items = []
+        for d in range(days):
+            day = self.anchor - pd.Timedelta(days=d)
+            stories = [(f"market-{day:%Y%m%d}", f"Markets close {day:%B %d}", None)]
+            stories += [(f"{ticker}-{day:%Y%m%d}-{k}", f"{ticker} story {k + 1} for {day:%B %d}", ticker) for k in range(per_day)]
+            for k, (uuid, title, related) in enumerate(stories):
+                items.append({'uuid': uuid, 'title': title, 'publisher': "Synthetic Wire", 'link': f"https://example.com/news/{uuid}",
+                              'providerPublishTime': int((day + pd.Timedelta(hours=16, minutes=k)).timestamp()), 'relatedTickers': [related] if related else []})
+        return items
+
+
+def provider_from_env():
+    """Returns the provider selected by ODYSSEY_QUOTE_FIXTURE or ODYSSEY_SYNTHETIC_SEED, or live yfinance."""
+    fixture = os.environ.get("ODYSSEY_QUOTE_FIXTURE")
+    if fixture: return FixtureProvider.from_json(fixture)
+    seed = os.environ.get("ODYSSEY_SYNTHETIC_SEED")
+    return SyntheticProvider(int(seed)) if seed else YFinanceProvider()
+
+
+def period_offset(period):
+    """Converts a yfinance period string ("5d", "6mo", "2y", ...) to a DateOffset."""
+    if period == 'ytd':
+        now = pd.Timestamp.now()
+        return now - now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    n, unit = int(period.rstrip('dmoyk')), period.lstrip('0123456789')
+    return {'d': pd.DateOffset(days=n), 'wk': pd.DateOffset(weeks=n), 'mo': pd.DateOffset(months=n), 'y': pd.DateOffset(years=n)}[unit]
+
+
+def as_timestamp(value, tz):
+    """Converts a date/datetime/string to a Timestamp in ``tz`` (naive values are localized)."""
+    ts = pd.Timestamp(value)
+    if tz is None: return ts.tz_localize(None) if ts.tz is not None else ts
+    return ts.tz_localize(tz) if ts.tz is None else ts.tz_convert(tz)
+
+
+def quote_price(info):
+    """Extracts the live price from an info dict, falling back to previous close."""
+    if not info: return None
+    return info.get('regularMarketPrice') or info.get('previousClose')
+
+
+# --- Quote Cache ---
+class QuoteCache:
+    """Thread-safe TTL + LRU cache of quote info dicts, keyed by symbol."""
+
+    def __init__(self, provider, ttl=DEFAULT_TTL, max_entries=MAX_ENTRIES):
+        self.provider = provider
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.ttls = {}                  # per-symbol TTL overrides
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # ticker -> (expires_at, info, error, fetched_at)
+        self._lock = threading.Lock()
+        self._fetch_locks = {}
+
+    def set_provider(self, provider):
+        """Swaps the upstream provider and drops everything cached from the old one."""
+        with self._lock:
+            self.provider = provider
+            self._entries.clear()
+
+    def set_ttl(self, ticker, seconds):
+        self.ttls[ticker.upper()] = seconds
+
+    def invalidate(self, ticker=None):
+        with self._lock:
+            if ticker is None: self._entries.clear()
+            else: self._entries.pop(ticker.upper(), None)
+
+    def _lookup(self, ticker, now, max_age=None):
+        entry = self._entries.get(ticker)
+        if entry is None or entry[0] <= now or (max_age is not None and entry[3] < now - max_age):
+            return None
+        self._entries.move_to_end(ticker)
+        return entry
+
+    def _store(self, ticker, info, error, now):
+        ttl = ERROR_TTL if error is not None else self.ttls.get(ticker, self.ttl)
+        self._entries[ticker] = (now + ttl, info, error, now)
+        self._entries.move_to_end(ticker)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_info(self, ticker, max_age=None):
+        """Returns the cached info dict for ``ticker``, fetching it if stale.
+
+        Concurrent callers asking for the same stale symbol wait on a single
+        upstream fetch instead of each issuing their own.  Fetch errors are
+        cached briefly and re-raised to every caller.  ``max_age`` (seconds)
+        tightens the TTL for callers that need fresher quotes.
+        """
+        ticker = ticker.upper()
+        with self._lock:
+            entry = self._lookup(ticker, time.monotonic(), max_age)
+            if entry is None:
+                fetch_lock = self._fetch_locks.setdefault(ticker, threading.Lock())
+        if entry is None:
+            with fetch_lock:
+                with self._lock:
+                    entry = self._lookup(ticker, time.monotonic(), max_age)
+                if entry is None:
+                    info, error = None, None
+                    try:
+                        with tracer.span("quote.fetch", ticker=ticker):
+                            info = self.provider.info(ticker)
+                        tracer.count("quote.bytes", payload_bytes(info))
+                    except Exception as e:
+                        error = e
+                    with self._lock:
+                        self.misses += 1
+                        self._store(ticker, info, error, time.monotonic())
+                    entry = (None, info, error, None)
+                    tracer.count("quote.miss")
+                else:
+                    with self._lock: self.hits += 1
+                    tracer.count("quote.hit")
+        else:
+            with self._lock: self.hits += 1
+            tracer.count("quote.hit")
+        if entry[2] is not None:
+            raise entry[2]
+        return entry[1]
+
+    def get_price(self, ticker):
+        """Returns the current price for ``ticker``, or None if unavailable."""
+        try:
+            return quote_price(self.get_info(ticker))
+        except Exception:
+            return None
+
+    def get_many(self, tickers, max_age=None):
+        """Resolves info dicts for a set of tickers in one batch.
+
+        Fresh symbols come straight from the cache; the stale ones are fetched
+        together, either through the provider's ``info_many`` or with bounded
+        thread-pool concurrency.  Returns ``(infos, errors)`` dicts keyed by
+        upper-cased ticker, so one bad symbol never fails the whole batch.
+        ``max_age`` is passed through as in ``get_info``.
+        """
+        infos, errors, stale = {}, {}, []
+        with self._lock:
+            now = time.monotonic()
+            for ticker in dict.fromkeys(t.upper() for t in tickers):
+                entry = self._lookup(ticker, now, max_age)
+                if entry is None:
+                    stale.append(ticker)
+                    continue
+                self.hits += 1
+                if entry[2] is not None: errors[ticker] = entry[2]
+                else: infos[ticker] = entry[1]
+        tracer.count("quote.hit", len(infos) + len(errors))
+        if not stale:
+            return infos, errors
+
+        info_many = getattr(self.provider, 'info_many', None)
+        if info_many is not None:
+            try:
+                with tracer.span("quote.fetch_many", tickers=len(stale)):
+                    fetched, failed = info_many(stale)
+                tracer.count("quote.bytes", payload_bytes(fetched))
+            except Exception as e:
+                fetched, failed = {}, {t: e for t in stale}
+            tracer.count("quote.miss", len(stale))
+            with self._lock:
+                now = time.monotonic()
+                for ticker in stale:
+                    self.misses += 1
+                    if ticker in fetched:
+                        infos[ticker] = fetched[ticker]
+                        self._store(ticker, fetched[ticker], None, now)
+                    else:
+                        errors[ticker] = failed.get(ticker) or KeyError(f"No quote for {ticker}")
+                        self._store(ticker, None, errors[ticker], now)
+            return infos, errors
+
+        def fetch(ticker):
+            try:
+                return ticker, self.get_info(ticker, max_age), None
+            except Exception as e:
+                return ticker, None, e
+        with tracer.span("quote.fetch_many", tickers=len(stale)):
+            for ticker, info, error in _executor.map(fetch, stale):
+                if error is not None: errors[ticker] = error
+                else: infos[ticker] = info
+        return infos, errors
+
+    def get_prices(self, tickers, max_age=None):
+        """Bulk version of ``get_price``: returns ``(prices, errors)`` dicts."""
+        infos, errors = self.get_many(tickers, max_age)
+        prices = {}
+        for ticker, info in infos.items():
+            price = quote_price(info)
+            if price: prices[ticker] = price
+            else: errors[ticker] = ValueError(f"No price for {ticker}")
+        return prices, errors
+
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="quotes")
+
+
+quote_cache = QuoteCache(provider_from_env())
@@ -0,0 +1,213 @@
+"""Local news store with TTL refresh and a background prefetcher.
+
+Articles live in the shared SQLite database next to the accounts, keyed by
+article ID, and link to every ticker they were fetched for, so a story
+covering several holdings is stored and shown once.  ``news_fetches``
+records when each ticker was last asked upstream; a ticker is refreshed
+only after ``ttl`` seconds (``ERROR_TTL`` after a failed request), and
+concurrent refreshes of one ticker collapse into a single request.
+
+Sessions hand their portfolio and watchlist symbols to ``news_prefetcher``
+with a lease they renew on every rerun.  Its daemon thread refreshes the
+stale ones, so the news tab reads from the store and upstream traffic
+scales with the number of watched symbols over the TTL, not with reruns.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from market_data import quote_cache
+from storage import DB_PATH, ConnectionPool
+from tracing import payload_bytes, tracer
+
+NEWS_TTL = 900.0            # seconds before a ticker's news is fetched again
+ERROR_TTL = 120.0           # failed fetches are retried after this long
+RETENTION_DAYS = 30         # articles published earlier are pruned
+NEWS_LIMIT = 50             # articles returned per read
+POOL_SIZE = 4
+LEASE_SECONDS = 600.0       # a session's watched symbols lapse this long after its last rerun
+PREFETCH_POLL = 30.0        # seconds between prefetcher passes
+PREFETCH_WORKERS = 4        # concurrent upstream news requests
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS news_articles (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    link TEXT NOT NULL,
+    publisher TEXT,
+    published_at INTEGER NOT NULL,
+    summary TEXT
+);
+CREATE INDEX IF NOT EXISTS news_by_time ON news_articles (published_at);
+CREATE TABLE IF NOT EXISTS news_tickers (
+    ticker TEXT NOT NULL,
+    article_id TEXT NOT NULL REFERENCES news_articles(id) ON DELETE CASCADE,
+    PRIMARY KEY (ticker, article_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS news_by_article ON news_tickers (article_id);
+CREATE TABLE IF NOT EXISTS news_fetches (
+    ticker TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    error TEXT
+);
+"""
+
+
+def normalize_article(item):
+    """Maps a raw yfinance news item, old flat or newer ``content`` format, to one dict.
+
+    Returns {'id', 'title', 'link', 'publisher', 'published_at' (unix
+    seconds, None if unknown), 'summary'}, or None when the item lacks a
+    title or link.
+    """
+    content = item.get('content')
+    if isinstance(content, dict):
+        link = (content.get('canonicalUrl') or {}).get('url') or (content.get('clickThroughUrl') or {}).get('url')
+        published = content.get('pubDate') or content.get('displayTime')
+        article = {'id': item.get('id') or content.get('id'), 'title': content.get('title'), 'link': link,
+                   'publisher': (content.get('provider') or {}).get('displayName'), 'summary': content.get('summary'),
+                   'published_at': int(datetime.fromisoformat(published.replace('Z', '+00:00')).timestamp()) if published else None}
+    else:
+        article = {'id': item.get('uuid') or item.get('id'), 'title': item.get('title'), 'link': item.get('link'),
+                   'publisher': item.get('publisher'), 'summary': item.get('summary'), 'published_at': item.get('providerPublishTime')}
+    if not article['title'] or not article['link']: return None
+    article['id'] = article['id'] or article['link']
+    return article
+
+
+class NewsStore:
+    """News articles per ticker, refreshed from ``source.provider.news`` at most once per TTL."""
+
+    def __init__(self, path=DB_PATH, source=quote_cache, ttl=NEWS_TTL):
+        self.path = path
+        self.source = source
+        self.ttl = ttl
+        self.fetches = 0
+        self._pool = None
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        """Opens the database and creates the news tables on first use."""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    pool = ConnectionPool(self.path, POOL_SIZE)
+                    with pool.connection() as conn: conn.executescript(SCHEMA)
+                    self._pool = pool
+        return self._pool
+
+    # --- Refresh ---
+    def stale(self, tickers, missing_only=False):
+        """The ``tickers`` due a refresh: never fetched, or past their TTL unless ``missing_only``."""
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        if not tickers: return []
+        with self.pool.connection() as conn:
+            rows = {row['ticker']: row for row in conn.execute(f"SELECT * FROM news_fetches WHERE ticker IN ({','.join('?' * len(tickers))})", tickers)}
+        if missing_only: return [t for t in tickers if t not in rows]
+        now = time.time()
+        return [t for t in tickers if t not in rows or rows[t]['fetched_at'] + (ERROR_TTL if rows[t]['error'] else self.ttl) <= now]
+
+    def refresh(self, tickers, missing_only=False):
+        """Fetches news for the stale ``tickers`` (see ``stale``); returns how many were fetched."""
+        return sum(self._refresh_one(t, missing_only) for t in self.stale(tickers, missing_only))
+
+    def ensure(self, tickers):
+        """Fetches tickers that have never been fetched; keeping the rest fresh is the prefetcher's job."""
+        return self.refresh(tickers, missing_only=True)
+
+    def _refresh_one(self, ticker, missing_only=False):
+        with self._lock: lock = self._locks.setdefault(ticker, threading.Lock())
+        with lock:
+            if not self.stale([ticker], missing_only): return False     # refreshed while we waited
+            items, error = None, None
+            try:
+                with tracer.span("news.fetch", ticker=ticker):
+                    items = self.source.provider.news(ticker)
+                tracer.count("news.bytes", payload_bytes(items))
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            self.fetches += 1
+            tracer.count("news.fetch")
+            now = time.time()
+            articles = [a for a in map(normalize_article, items or []) if a is not None]
+            for article in articles: article['published_at'] = int(article['published_at'] or now)   # undated stories count as new
+            with self.pool.transaction() as conn:
+                added = conn.executemany("INSERT INTO news_articles (id, title, link, publisher, published_at, summary) VALUES (:id, :title, :link, :publisher, :published_at, :summary) ON CONFLICT (id) DO NOTHING", articles).rowcount
+                conn.executemany("INSERT OR IGNORE INTO news_tickers (ticker, article_id) VALUES (?, ?)", [(ticker, a['id']) for a in articles])
+                conn.execute("INSERT INTO news_fetches (ticker, fetched_at, error) VALUES (?, ?, ?) ON CONFLICT (ticker) DO UPDATE SET fetched_at = excluded.fetched_at, error = excluded.error",
+                             (ticker, now, error))
+                conn.execute("DELETE FROM news_articles WHERE published_at < ?", (now - RETENTION_DAYS * 86400,))
+            tracer.count("news.new", max(added, 0))
+            return True
+
+    # --- Reads ---
+    def articles(self, tickers, limit=NEWS_LIMIT):
+        """The newest stored articles for any of ``tickers``, each once, with every ticker it covers."""
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        if not tickers: return []
+        with tracer.span("news.read", tickers=len(tickers)), self.pool.connection() as conn:
+            rows = conn.execute(f"""SELECT a.*, (SELECT group_concat(ticker) FROM news_tickers WHERE article_id = a.id) AS tickers FROM news_articles a
+                                    WHERE a.id IN (SELECT article_id FROM news_tickers WHERE ticker IN ({','.join('?' * len(tickers))}))
+                                    ORDER BY a.published_at DESC LIMIT ?""", (*tickers, limit)).fetchall()
+        return [{**dict(row), 'tickers': sorted(row['tickers'].split(','))} for row in rows]
+
+    def status(self, ticker):
+        """Returns (fetched_at, error) for ``ticker``'s last upstream request, or (None, None)."""
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT fetched_at, error FROM news_fetches WHERE ticker = ?", (ticker.upper(),)).fetchone()
+        return (row['fetched_at'], row['error']) if row else (None, None)
+
+
+class NewsPrefetcher:
+    """Daemon thread that keeps news fresh for the union of every live session's symbols."""
+
+    def __init__(self, store, lease=LEASE_SECONDS, poll=PREFETCH_POLL):
+        self.store = store
+        self.lease, self.poll = lease, poll
+        self.passes = 0
+        self._leases = {}           # owner -> (expires_at, symbols)
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def watch(self, owner, symbols):
+        """Sets (and renews) ``owner``'s watched symbols; starts the thread if it is idle."""
+        symbols = frozenset(s.upper() for s in symbols if s)
+        with self._lock:
+            changed = self._leases.get(owner, (0, None))[1] != symbols
+            self._leases[owner] = (time.monotonic() + self.lease, symbols)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="news-prefetch", daemon=True)
+                self._thread.start()
+        if changed: self._wake.set()     # fetch newly watched symbols without waiting out the poll
+
+    def symbols(self):
+        """The watched symbols of every unexpired lease."""
+        now = time.monotonic()
+        with self._lock:
+            self._leases = {o: lease for o, lease in self._leases.items() if lease[0] > now}
+            return set().union(*(lease[1] for lease in self._leases.values()))
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="news") as pool:
+            while True:
+                self._wake.clear()
+                symbols = self.symbols()
+                if not symbols:
+                    with self._lock:
+                        if not self._leases:
+                            self._thread = None
+                            return      # idle; the next watch restarts the thread
+                try:
+                    list(pool.map(self.store._refresh_one, self.store.stale(symbols)))
+                except Exception:
+                    pass    # the store records per-ticker errors; anything else is retried next pass
+                self.passes += 1
+                self._wake.wait(self.poll)
+
+
+news_store = NewsStore()
+news_prefetcher = NewsPrefetcher(news_store)
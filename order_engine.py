@@ -0,0 +1,214 @@
+"""Event-driven matching engine for resting trigger orders.
+
+Resting orders live in price-sorted indexes per symbol, so a price update
+only touches the orders it actually triggers:
+
+* ``falling`` - max-heap of triggers that fire when price <= trigger
+  (sell stops, buy limits);
+* ``rising``  - min-heap of triggers that fire when price >= trigger
+  (sell limits / take-profits, buy stops);
+* trailing sell stops, grouped by shared high-water mark (see ``_TrailBook``).
+
+Cancelled and OCO-cancelled orders are dropped lazily when they surface at
+the top of a heap.  Matching a tick costs O((k + 1) log n) for k fills
+among n resting orders.
+"""
+import heapq
+import itertools
+import threading
+
+BUY, SELL = 'BUY', 'SELL'
+LIMIT, STOP, TRAILING = 'limit', 'stop', 'trailing'
+
+
+class Order:
+    """A resting trigger order. ``trigger`` is a price, or the offset for trailing stops."""
+    __slots__ = ('id', 'ticker', 'side', 'kind', 'shares', 'trigger', 'oco', 'active')
+
+    def __init__(self, id, ticker, side, kind, shares, trigger, oco=None):
+        self.id, self.ticker, self.side, self.kind = id, ticker, side, kind
+        self.shares, self.trigger, self.oco = shares, trigger, oco
+        self.active = True
+
+    def __repr__(self):
+        return f"Order({self.id}, {self.ticker}, {self.side} {self.kind} {self.shares} @ {self.trigger})"
+
+
+class _TrailBook:
+    """Trailing sell stops for one symbol.
+
+    An order fires when price <= peak - offset, where peak is the highest
+    price seen since it was placed.  Orders placed at different times have
+    different peaks, but once price makes a new high above a peak, every
+    order at or below it shares that new peak.  So orders are kept in
+    groups on a stack (oldest group, highest peak at the bottom), each group
+    a min-heap on offset, and new highs merge the groups they overtake.  A
+    lazy heap over groups keyed on ``min_offset - peak`` finds the next
+    order to fire.
+    """
+
+    def __init__(self):
+        self.stack = []     # [group_id, peak, heap of (offset, seq, order)]
+        self.groups = {}    # group_id -> group, for groups that still hold orders
+        self.index = []     # (min_offset - peak, group_id, heap_size)
+        self.group_ids = itertools.count()
+
+    def _reindex(self, group):
+        gid, peak, heap = group
+        while heap and not heap[0][2].active: heapq.heappop(heap)
+        if heap: heapq.heappush(self.index, (heap[0][0] - peak, gid, len(heap)))
+
+    def _raise_peak(self, price, items=()):
+        """Merges every group with peak <= price into one group at ``price``."""
+        merged = list(items)
+        heapq.heapify(merged)
+        while self.stack and self.stack[-1][1] <= price:
+            gid, _, heap = self.stack.pop()
+            self.groups.pop(gid, None)
+            if len(heap) > len(merged): heap, merged = merged, heap   # small-to-large
+            for item in heap: heapq.heappush(merged, item)
+        if merged:
+            group = [next(self.group_ids), price, merged]
+            self.stack.append(group)
+            self.groups[group[0]] = group
+            self._reindex(group)
+
+    def add(self, item, price):
+        self._raise_peak(price, [item])
+
+    def match(self, price):
+        if self.stack and self.stack[-1][1] < price:
+            self._raise_peak(price)
+        fired = []
+        while self.index and self.index[0][0] <= -price:
+            _, gid, size = heapq.heappop(self.index)
+            group = self.groups.get(gid)
+            # Heaps only shrink within a group, so a size mismatch marks a stale entry.
+            if group is None or len(group[2]) != size: continue
+            heap = group[2]
+            # Same float expression as the index key, so the two never disagree.
+            while heap and (not heap[0][2].active or heap[0][0] - group[1] <= -price):
+                order = heapq.heappop(heap)[2]
+                if order.active: fired.append(order)
+            if heap: self._reindex(group)
+            else: self.groups.pop(gid)  # the empty group leaves the stack on the next merge
+        return fired
+
+
+class _Book:
+    """All resting orders for one symbol."""
+
+    def __init__(self):
+        self.falling = []   # (-trigger, seq, order)
+        self.rising = []    # (trigger, seq, order)
+        self.trailing = _TrailBook()
+        self.live = 0
+
+
+class MatchingEngine:
+    """Price-indexed book of resting stop, limit, trailing-stop and OCO orders."""
+
+    def __init__(self):
+        self.books = {}
+        self.orders = {}
+        self.oco_groups = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def place(self, ticker, side, kind, shares, trigger, oco=None, ref_price=None):
+        """Adds a resting order and returns it.
+
+        ``trigger`` is the limit/stop price, or the trailing offset in dollars
+        for ``TRAILING`` (sell side only), whose peak starts at ``ref_price``.
+        Orders sharing an ``oco`` key cancel each other when one fills.
+        """
+        if kind == TRAILING and side != SELL:
+            raise ValueError("Trailing stops are only supported on the sell side.")
+        with self._lock:
+            seq = next(self._seq)
+            order = Order(seq, ticker, side, kind, shares, trigger, oco)
+            book = self.books.setdefault(ticker, _Book())
+            if kind == TRAILING:
+                book.trailing.add((trigger, seq, order), ref_price if ref_price is not None else trigger)
+            elif (side, kind) in ((SELL, STOP), (BUY, LIMIT)):
+                heapq.heappush(book.falling, (-trigger, seq, order))
+            else:
+                heapq.heappush(book.rising, (trigger, seq, order))
+            book.live += 1
+            self.orders[seq] = order
+            if oco is not None: self.oco_groups.setdefault(oco, []).append(order)
+            return order
+
+    def place_bracket(self, ticker, shares, stop_loss=None, take_profit=None, trailing_offset=None, ref_price=None):
+        """Places the exit orders protecting a long position as one OCO group."""
+        oco = ('bracket', ticker, next(self._seq))
+        orders = []
+        if stop_loss: orders.append(self.place(ticker, SELL, STOP, shares, stop_loss, oco))
+        if take_profit: orders.append(self.place(ticker, SELL, LIMIT, shares, take_profit, oco))
+        if trailing_offset: orders.append(self.place(ticker, SELL, TRAILING, shares, trailing_offset, oco, ref_price))
+        return orders
+
+    def _deactivate(self, order):
+        if not order.active: return
+        order.active = False
+        self.orders.pop(order.id, None)
+        self.books[order.ticker].live -= 1
+
+    def _fill(self, order):
+        """Deactivates a filled order and the rest of its OCO group."""
+        self._deactivate(order)
+        if order.oco is not None:
+            for sibling in self.oco_groups.pop(order.oco, []): self._deactivate(sibling)
+
+    def cancel(self, order_id):
+        """Cancels one resting order; the rest of its OCO group stays live."""
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None: return
+            self._deactivate(order)
+            group = self.oco_groups.get(order.oco)
+            if group is not None:
+                group.remove(order)
+                if not group: del self.oco_groups[order.oco]
+
+    def cancel_ticker(self, ticker):
+        with self._lock:
+            self.books.pop(ticker, None)
+            for order in [o for o in self.orders.values() if o.ticker == ticker]:
+                order.active = False
+                self.orders.pop(order.id, None)
+                if order.oco is not None: self.oco_groups.pop(order.oco, None)
+
+    def symbols(self):
+        """Tickers that currently have resting orders."""
+        return [t for t, book in self.books.items() if book.live > 0]
+
+    def resting(self, ticker=None):
+        return [o for o in self.orders.values() if ticker is None or o.ticker == ticker]
+
+    def on_price(self, ticker, price):
+        """Matches one price update; returns [(order, fill_price)] for every fill."""
+        with self._lock:
+            book = self.books.get(ticker)
+            if book is None or not book.live: return []
+            fired = []
+            while book.falling and (not book.falling[0][2].active or -book.falling[0][0] >= price):
+                order = heapq.heappop(book.falling)[2]
+                if order.active: fired.append(order)
+            while book.rising and (not book.rising[0][2].active or book.rising[0][0] <= price):
+                order = heapq.heappop(book.rising)[2]
+                if order.active: fired.append(order)
+            fired.extend(book.trailing.match(price))
+            fills = []
+            for order in fired:
+                if not order.active: continue   # its OCO sibling filled earlier in this pass
+                self._fill(order)
+                fills.append((order, price))
+            return fills
+
+    def on_prices(self, prices):
+        """Matches a batch of {ticker: price} updates in one pass."""
+        fills = []
+        for ticker, price in prices.items():
+            fills.extend(self.on_price(ticker, price))
+        return fills
@@ -0,0 +1,187 @@
+"""Mark-to-market equity curve and risk analytics for the live portfolio.
+
+``trade_history`` (the account's ``Trade`` records) is replayed against
+daily bars from the bar store on a shared day calendar.  State is kept as
+dense (day x ticker) arrays:
+
+* ``positions`` holds the shares held at each day's close, and ``cash``
+  the cash balance, both cumulative, so a new trade adds its delta to the
+  rows from its day onward instead of replaying history;
+* ``closes`` holds each ticker's forward-filled daily close, and a
+  ticker's column is rewritten only when its bars change.
+
+Equity, drawdown and the summary statistics are then a handful of array
+expressions over those matrices.  Realized P&L uses the ``profit_loss``
+the app records on each sell (average-cost basis), so it matches the
+history tab.
+"""
+import numpy as np
+import pandas as pd
+
+from bar_store import bar_store
+
+TRADING_DAYS = 252
+PRIOR_DAYS = pd.Timedelta(days=10)      # bars read before the first trade, so it is marked at the close before it
+
+
+def _day(times):
+    """Midnight (tz-naive, int64 ns) of each timestamp's local calendar day."""
+    times = pd.DatetimeIndex(times)
+    if times.tz is not None: times = times.tz_localize(None)
+    return times.normalize().as_unit('ns').asi8
+
+
+class PortfolioAnalytics:
+    """Incrementally maintained equity curve for one session's trade history."""
+
+    def __init__(self, bars=bar_store):
+        self.bars = bars
+        self.reset()
+
+    def reset(self):
+        self.n = 0                              # trade_history entries consumed
+        self.days = np.empty(0, dtype=np.int64)
+        self.tickers, self._col = [], {}
+        self.positions = np.zeros((0, 0))
+        self.cash_flow = np.zeros(0)            # cumulative trade cash flow at each close
+        self.closes = np.zeros((0, 0))
+        self._marks = {}                        # ticker -> (last bar ts, last close, bar count)
+        self._trades = []                       # (day, col, shares, flow) for calendar rebuilds
+        self._calendared = 0                    # _trades whose days the calendar already covers
+        self._first_day = None                  # earliest trade day
+        self.flow_total = 0.0
+        self.last_price = {}
+        self.bought, self.sold, self.realized = {}, {}, {}
+
+    # --- Updates ---
+    def update(self, trade_history, start=None):
+        """Folds in new trades and bars; ``start`` bounds how far back bars are read."""
+        if self.n > len(trade_history): self.reset()
+        new = trade_history[self.n:]
+        if new:
+            days = _day(pd.DatetimeIndex(np.array([t.time for t in new], dtype='M8[ns]')))
+            for trade, day in zip(new, days):
+                self._record(trade, day)
+            self.n = len(trade_history)
+        if not self._trades: return self
+        first = start or (pd.Timestamp(self.days[0] if len(self.days) else self._first_day) - PRIOR_DAYS).strftime('%Y-%m-%d')
+        fetched, _ = self.bars.bars_many(self.tickers, "1d", start=first)       # one batched refresh for every holding
+        frames = {ticker: fetched.get(ticker.upper()) for ticker in self.tickers}
+        changed = {t: _day(f.index) for t, f in frames.items() if f is not None and not f.empty and self._marks.get(t) != self._key(f)}
+        self._extend_calendar(changed.values())
+        for ticker, frame in frames.items():
+            if frame is None or frame.empty: self._unmark(ticker)
+            elif self._marks.get(ticker) != self._key(frame): self._mark(ticker, frame, changed.get(ticker))
+        return self
+
+    @staticmethod
+    def _key(frame):
+        return (frame.index[-1], frame['Close'].iloc[-1], len(frame))
+
+    def _record(self, trade, day):
+        ticker, shares, price = trade.ticker, trade.shares, trade.price
+        if ticker not in self._col:
+            self._col[ticker] = len(self.tickers); self.tickers.append(ticker)
+            self.positions = np.hstack([self.positions, np.zeros((len(self.days), 1))])
+            self.closes = np.hstack([self.closes, np.full((len(self.days), 1), price)])
+        sign = 1 if trade.side == 'BUY' else -1
+        flow = -sign * shares * price
+        book = self.bought if sign > 0 else self.sold
+        book[ticker] = book.get(ticker, 0.0) + shares * price
+        if sign < 0: self.realized[ticker] = self.realized.get(ticker, 0.0) + trade.profit_loss
+        self.last_price[ticker] = price; self.flow_total += flow
+        self._first_day = day if self._first_day is None else min(self._first_day, day)
+        self._trades.append((day, self._col[ticker], sign * shares, flow))
+        if len(self.days) and day <= self.days[-1]: self._apply(self._trades[-1])
+        # trades after the calendar's end are applied when the calendar grows to reach them
+
+    def _apply(self, trade):
+        day, col, shares, flow = trade
+        row = int(np.searchsorted(self.days, day))
+        self.positions[row:, col] += shares
+        self.cash_flow[row:] += flow
+
+    def _extend_calendar(self, bar_days):
+        """Grows the day calendar to cover new bars and trades; rebuilds if days were inserted."""
+        new = self._trades[self._calendared:]
+        self._calendared = len(self._trades)
+        needed = [np.array([t[0] for t in new], dtype=np.int64)]
+        needed += list(bar_days)
+        days = np.unique(np.concatenate(needed + [self.days]))
+        days = days[days >= self._first_day]
+        if len(days) == len(self.days): return
+        old = len(self.days)
+        if days[:old].tolist() != self.days.tolist():
+            self.days = days            # bars were backfilled inside the calendar; replay everything
+            self.positions = np.zeros((len(days), len(self.tickers))); self.cash_flow = np.zeros(len(days))
+            self.closes = np.full((len(days), len(self.tickers)), np.nan); self._marks.clear()
+            for col, ticker in enumerate(self.tickers): self.closes[:, col] = self.last_price[ticker]
+            for trade in self._trades: self._apply(trade)
+            return
+        grow, end = len(days) - old, (self.days[-1] if old else -1)
+        self.days = days
+        self.positions = np.vstack([self.positions, np.repeat(self.positions[-1:] if old else np.zeros((1, len(self.tickers))), grow, axis=0)])
+        self.cash_flow = np.r_[self.cash_flow, np.repeat(self.cash_flow[-1] if old else 0.0, grow)]
+        self.closes = np.vstack([self.closes, np.repeat(self.closes[-1:] if old else np.array([[self.last_price[t] for t in self.tickers]]), grow, axis=0)])
+        for trade in new:
+            if trade[0] > end: self._apply(trade)      # trades past the old end were waiting for these rows
+
+    def _unmark(self, ticker):
+        """Marks a ticker without bars at its last traded price."""
+        self.closes[:, self._col[ticker]] = self.last_price[ticker]; self._marks.pop(ticker, None)
+
+    def _mark(self, ticker, frame, days=None):
+        """Rewrites a ticker's close column: each calendar day takes the last close at or before it."""
+        bars = np.searchsorted(_day(frame.index) if days is None else days, self.days, side='right') - 1
+        self.closes[:, self._col[ticker]] = frame['Close'].to_numpy()[np.maximum(bars, 0)]     # before the first bar, mark at the first close
+        self._marks[ticker] = self._key(frame)
+
+    # --- Results ---
+    def curve(self, start_cash):
+        """Daily DataFrame of cash, market value, equity, drawdown and exposure."""
+        index = pd.DatetimeIndex(self.days)
+        if not len(self.days): return pd.DataFrame(columns=['cash', 'market_value', 'equity', 'drawdown', 'exposure'], index=index)
+        value = (self.positions * self.closes).sum(axis=1)
+        cash = start_cash + self.cash_flow
+        equity = cash + value
+        peak = np.maximum.accumulate(equity)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            exposure = np.abs(self.positions * self.closes).sum(axis=1) / equity
+        return pd.DataFrame({'cash': cash, 'market_value': value, 'equity': equity, 'drawdown': equity / peak - 1, 'exposure': exposure}, index=index)
+
+    def positions_frame(self, prices=None):
+        """Per-ticker shares, cost basis, market value and realized/unrealized P&L.
+
+        ``prices`` optionally maps tickers to live quotes, which take
+        precedence over the last daily close.
+        """
+        if not self.tickers: return pd.DataFrame(columns=['shares', 'cost_basis', 'price', 'market_value', 'realized_pl', 'unrealized_pl'])
+        prices = prices or {}
+        shares = self.positions[-1] if len(self.days) else np.zeros(len(self.tickers))
+        last = self.closes[-1] if len(self.days) else np.array([self.last_price[t] for t in self.tickers])
+        price = np.array([prices.get(t) or p for t, p in zip(self.tickers, last)])
+        realized = np.array([self.realized.get(t, 0.0) for t in self.tickers])
+        # remaining average-cost basis = buys - (sell proceeds - realized gain)
+        cost = np.array([self.bought.get(t, 0.0) - self.sold.get(t, 0.0) for t in self.tickers]) + realized
+        cost = np.where(shares != 0, cost, 0.0)
+        value = shares * price
+        return pd.DataFrame({'shares': shares, 'cost_basis': cost, 'price': price, 'market_value': value, 'realized_pl': realized, 'unrealized_pl': value - cost}, index=pd.Index(self.tickers, name='ticker'))
+
+    def stats(self, start_cash):
+        """Total return, max drawdown, annualized volatility and Sharpe, average exposure."""
+        curve = self.curve(start_cash)
+        if len(curve) < 2: return {}
+        equity = curve['equity'].to_numpy()
+        returns = np.diff(equity) / equity[:-1]
+        std = returns.std()
+        return {
+            'total_return': float(equity[-1] / equity[0] - 1),
+            'max_drawdown': float(curve['drawdown'].min()),
+            'volatility': float(std * np.sqrt(TRADING_DAYS)),
+            'sharpe': float(returns.mean() / std * np.sqrt(TRADING_DAYS)) if std > 0 else 0.0,
+            'exposure': float(np.nanmean(curve['exposure'].to_numpy())),
+        }
+
+    def start_cash(self, cash_balance):
+        """The cash the history started from, given today's balance."""
+        return cash_balance - self.flow_total
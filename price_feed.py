@@ -0,0 +1,164 @@
+"""Background streaming price feed shared by every session.
+
+One asyncio loop, running on a daemon thread, polls a tick source for all
+subscribed symbols.  Sessions subscribe with a lease that they renew each
+time their fragment runs; a symbol is polled once for all of its
+subscribers, at the shortest interval any of them asked for, and dropped
+when the last lease lapses.  Each new price bumps a global version, so a
+reader can ask for just the symbols that changed since it last looked.
+"""
+import asyncio
+import itertools
+import os
+import random
+import threading
+import time
+
+from market_data import quote_cache
+
+LEASE_SECONDS = 30.0        # a subscription lapses this long after its last renewal
+MIN_INTERVAL = 1.0
+HISTORY = 300               # ticks kept per symbol for sparklines
+
+
+class Tick:
+    __slots__ = ('price', 'prev', 'version', 'at')
+
+    def __init__(self, price, prev, version, at):
+        self.price, self.prev, self.version, self.at = price, prev, version, at
+
+
+# --- Tick Sources ---
+class QuoteSource:
+    """Polls the shared quote cache, forcing quotes no older than the poll interval."""
+
+    def __init__(self, cache=quote_cache):
+        self.cache = cache
+
+    async def fetch(self, symbols, max_age):
+        prices, _ = await asyncio.to_thread(self.cache.get_prices, symbols, max_age)
+        return prices
+
+
+class SimulatedTickSource:
+    """Seeded random-walk prices, for running the feed without a network."""
+
+    def __init__(self, seed=0, start=100.0, volatility=0.001):
+        self.rng = random.Random(seed)
+        self.start, self.volatility = start, volatility
+        self.prices = {}
+        self.calls = 0
+
+    async def fetch(self, symbols, max_age):
+        self.calls += 1
+        for symbol in symbols:
+            price = self.prices.get(symbol, self.start)
+            self.prices[symbol] = round(price * (1 + self.rng.gauss(0, self.volatility)), 2)
+        return {s: self.prices[s] for s in symbols}
+
+
+def source_from_env():
+    """Picks the simulated source when ODYSSEY_SIMULATED_FEED is set, else live quotes."""
+    return SimulatedTickSource() if os.environ.get("ODYSSEY_SIMULATED_FEED") else QuoteSource()
+
+
+# --- Feed ---
+class PriceFeed:
+    """Shared subscription registry plus the asyncio polling loop."""
+
+    def __init__(self, source=None, lease=LEASE_SECONDS):
+        self.source = source or source_from_env()
+        self.lease = lease
+        self.polls = 0
+        self._leases = {}           # symbol -> {owner: (expires_at, interval)}
+        self._due = {}              # symbol -> next poll time
+        self._ticks = {}            # symbol -> Tick
+        self._history = {}          # symbol -> [(at, price)]
+        self._versions = itertools.count(1)
+        self._version = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+    def subscribe(self, symbol, owner, interval=MIN_INTERVAL):
+        """Registers (or renews) ``owner``'s interest in ``symbol`` at ``interval`` seconds."""
+        symbol = symbol.upper()
+        interval = max(float(interval), MIN_INTERVAL)
+        with self._lock:
+            self._leases.setdefault(symbol, {})[owner] = (time.monotonic() + max(self.lease, 3 * interval), interval)
+            self._due.setdefault(symbol, 0.0)
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=asyncio.run, args=(self._run(),), name="price-feed", daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self, symbol, owner):
+        with self._lock:
+            self._leases.get(symbol.upper(), {}).pop(owner, None)
+
+    def stop(self):
+        self._stopping = True
+
+    def symbols(self):
+        with self._lock:
+            return list(self._leases)
+
+    def latest(self, symbol):
+        """Returns the newest Tick for ``symbol``, or None."""
+        return self._ticks.get(symbol.upper())
+
+    def history(self, symbol):
+        return list(self._history.get(symbol.upper(), ()))
+
+    def changes_since(self, version):
+        """Returns ({symbol: Tick} updated after ``version``, current version)."""
+        with self._lock:
+            return {s: t for s, t in self._ticks.items() if t.version > version}, self._version
+
+    def _due_symbols(self, now):
+        """Expires lapsed leases; returns {symbol: interval} for symbols due a poll."""
+        with self._lock:
+            due = {}
+            for symbol in list(self._leases):
+                owners = {o: lease for o, lease in self._leases[symbol].items() if lease[0] > now}
+                if not owners:
+                    del self._leases[symbol]; self._due.pop(symbol, None)
+                    continue
+                self._leases[symbol] = owners
+                interval = min(lease[1] for lease in owners.values())
+                if self._due[symbol] <= now:
+                    due[symbol] = interval
+                    self._due[symbol] = now + interval
+            return due
+
+    def _publish(self, prices, now):
+        with self._lock:
+            for symbol, price in prices.items():
+                tick = self._ticks.get(symbol)
+                if tick is not None and tick.price == price: continue
+                self._version = next(self._versions)
+                self._ticks[symbol] = Tick(price, tick.price if tick else None, self._version, now)
+                history = self._history.setdefault(symbol, [])
+                history.append((time.time(), price))
+                if len(history) > HISTORY: del history[:len(history) - HISTORY]
+
+    async def _run(self):
+        while not self._stopping:
+            now = time.monotonic()
+            due = self._due_symbols(now)
+            if due:
+                self.polls += 1
+                try:
+                    prices = await self.source.fetch(list(due), min(due.values()))
+                except Exception:
+                    prices = {}     # a failed poll is retried on the symbol's next interval
+                self._publish(prices, now)
+            with self._lock:
+                if not self._leases:
+                    self._thread = None
+                    return          # idle; the next subscribe restarts the loop
+                next_due = min(self._due.values())
+            await asyncio.sleep(min(max(next_due - time.monotonic(), 0.05), MIN_INTERVAL))
+
+
+price_feed = PriceFeed()
@@ -0,0 +1,66 @@
+"""Watchlist screener: price, change, volume and trend signals for many symbols at once.
+
+Daily bars for the whole watchlist come from one ``bar_store.bars_many``
+call and are stacked into (bars x symbols) matrices, right-aligned so every
+symbol's latest bar sits in the last row.  Each indicator is then one
+column-wise pass over the matrix (``indicators.columnar``), and the screen
+reads its last rows; per-symbol Python work is limited to copying bars
+into the matrices.
+"""
+import numpy as np
+import pandas as pd
+
+from bar_store import bar_store
+from indicators import columnar
+
+SCREEN_PERIOD = "2y"        # daily history read per symbol; covers SMA 200 with room to settle
+SCREEN_SPECS = (('rsi', 14), ('ema', 20), ('sma', 50), ('sma', 200))
+CROSSES = (('EMA_20', 'SMA_50'), ('SMA_50', 'SMA_200'))     # (fast, slow) pairs
+VOLUME_WINDOW = 20          # bars averaged for the volume ratio, excluding the latest
+
+
+def stack(frames, column, rows):
+    """Right-aligns ``column`` of each frame into a (rows x len(frames)) matrix, NaN-padded."""
+    matrix = np.full((rows, len(frames)), np.nan)
+    for j, frame in enumerate(frames):
+        values = frame[column].to_numpy()[-rows:]
+        matrix[rows - len(values):, j] = values
+    return matrix
+
+
+def bars_since_cross(fast, slow):
+    """Bars since ``fast`` last crossed ``slow`` in each column; NaN if it never did."""
+    side = np.sign(fast - slow)
+    flips = (side[1:] != side[:-1]) & ~np.isnan(side[1:]) & ~np.isnan(side[:-1])
+    ago = flips[::-1].argmax(axis=0).astype(np.float64)
+    ago[~flips.any(axis=0)] = np.nan
+    return ago
+
+
+def screen(tickers, bars=bar_store, period=SCREEN_PERIOD):
+    """Screens ``tickers`` on their daily bars; returns (DataFrame indexed by ticker, {ticker: error}).
+
+    For each ``(fast, slow)`` in CROSSES the frame has ``fast>slow`` (whether
+    fast is above slow now, NA until both exist) and ``fastxslow`` (bars
+    since they last crossed).
+    """
+    frames, errors = bars.bars_many(tickers, "1d", period)
+    errors.update({t: KeyError(f"No bars for {t}") for t, f in frames.items() if f.empty})
+    frames = {t: f for t, f in frames.items() if not f.empty}
+    index = pd.Index(list(frames), name='ticker')
+    if not frames: return pd.DataFrame(index=index), errors
+    rows = max(len(f) for f in frames.values())
+    closes, volumes = stack(frames.values(), 'Close', rows), stack(frames.values(), 'Volume', rows)
+    values = columnar(closes, SCREEN_SPECS)
+    window = volumes[-VOLUME_WINDOW - 1:-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        average_volume = np.nansum(window, axis=0) / (~np.isnan(window)).sum(axis=0)
+        table = {'as_of': [f.index[-1] for f in frames.values()], 'price': closes[-1], 'change_pct': (closes[-1] / closes[-2] - 1) * 100 if rows > 1 else np.nan,
+                 'volume': volumes[-1], 'volume_ratio': volumes[-1] / average_volume}
+    table.update({name: matrix[-1] for name, matrix in values.items()})
+    for fast, slow in CROSSES:
+        above = pd.array(values[fast][-1] > values[slow][-1], dtype='boolean')
+        above[np.isnan(values[fast][-1] - values[slow][-1])] = pd.NA
+        table[f"{fast}>{slow}"] = above
+        table[f"{fast}x{slow}"] = bars_since_cross(values[fast], values[slow])
+    return pd.DataFrame(table, index=index), errors
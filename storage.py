@@ -0,0 +1,257 @@
+"""SQLite-backed accounts, positions and trades.
+
+Every account lives in one database file shared by all sessions (and all
+app processes on the host).  The database runs in WAL mode, so readers
+never block the writer, and every balance change happens inside a single
+``BEGIN IMMEDIATE`` transaction together with its position update and
+trade row: two sessions trading the same account serialize on the write
+lock instead of overwriting each other, and a crash leaves either the
+whole trade or none of it.
+
+Each account carries a ``version`` that every write bumps.  Sessions poll
+it (one indexed read) and only reload positions and new trades when it
+moved.
+
+``execute`` applies a whole batch of fills in one transaction: it folds
+them over the account's cash and positions in memory and writes the
+result back with a few bulk statements, so its cost per fill is a few
+microseconds rather than a commit.  Trades come back as ``Trade`` records.
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+DB_PATH = os.environ.get("ODYSSEY_DB", "odyssey.db")
+POOL_SIZE = 8
+BUSY_TIMEOUT_MS = 10000
+STARTING_CASH = 100000.0
+ORDER_FIELDS = ('stop_loss', 'take_profit', 'trailing_stop')
+MAX_PARAMS = 900            # batches touching more tickers read every position instead of binding each one
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    cash REAL NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS positions (
+    account_id INTEGER NOT NULL REFERENCES accounts(id),
+    ticker TEXT NOT NULL,
+    shares INTEGER NOT NULL,
+    avg_price REAL NOT NULL,
+    stop_loss REAL,
+    take_profit REAL,
+    trailing_stop REAL,
+    PRIMARY KEY (account_id, ticker)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    account_id INTEGER NOT NULL REFERENCES accounts(id),
+    timestamp TEXT NOT NULL,
+    type TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    shares INTEGER NOT NULL,
+    price REAL NOT NULL,
+    profit_loss REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trades_by_account ON trades (account_id, id);
+CREATE INDEX IF NOT EXISTS trades_by_ticker ON trades (account_id, ticker, id);
+"""
+
+
+class ConnectionPool:
+    """A fixed set of WAL-mode connections handed out one caller at a time."""
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(self._connect())
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")     # durable at checkpoints; WAL keeps commits atomic
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """A write transaction that takes the write lock up front, so it never has to upgrade."""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+
+class Trade(NamedTuple):
+    """One executed trade; ``time`` is local wall-clock time as int64 nanoseconds (datetime64[ns])."""
+    id: int
+    time: int
+    side: str
+    ticker: str
+    shares: int
+    price: float
+    profit_loss: float
+
+
+def _isoformat(times):
+    """int64 ns wall-clock times -> ISO strings to microseconds, as stored in ``trades.timestamp``."""
+    return np.datetime_as_string(np.array(times, dtype=np.int64).view('M8[ns]').astype('M8[us]'))
+
+
+class AccountStore:
+    """Transactional account operations over a ConnectionPool."""
+
+    def __init__(self, path=DB_PATH, pool_size=POOL_SIZE):
+        self.path = path
+        self._pool = None
+        self._pool_size = pool_size
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        """Opens the database and creates the schema on first use."""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    pool = ConnectionPool(self.path, self._pool_size)
+                    with pool.connection() as conn: conn.executescript(SCHEMA)
+                    self._pool = pool
+        return self._pool
+
+    # --- Accounts ---
+    def open_account(self, name, cash=STARTING_CASH):
+        """Returns (account_id, created) for ``name``, creating the account if needed."""
+        with self.pool.transaction() as conn:
+            row = conn.execute("SELECT id FROM accounts WHERE name = ?", (name,)).fetchone()
+            if row: return row['id'], False
+            cur = conn.execute("INSERT INTO accounts (name, cash, created_at) VALUES (?, ?, ?)", (name, cash, datetime.now().isoformat()))
+            return cur.lastrowid, True
+
+    def accounts(self):
+        with self.pool.connection() as conn:
+            return [row['name'] for row in conn.execute("SELECT name FROM accounts ORDER BY name")]
+
+    def status(self, account_id):
+        """Returns (cash, version) for the account."""
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT cash, version FROM accounts WHERE id = ?", (account_id,)).fetchone()
+        return row['cash'], row['version']
+
+    def portfolio(self, account_id):
+        """Open positions as {ticker: {'shares', 'avg_price', 'stop_loss', 'take_profit', 'trailing_stop'}}."""
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT * FROM positions WHERE account_id = ?", (account_id,)).fetchall()
+        return {row['ticker']: {'shares': row['shares'], 'avg_price': row['avg_price'], **{f: row[f] for f in ORDER_FIELDS}} for row in rows}
+
+    def trades(self, account_id, after_id=0):
+        """Returns (Trades after ``after_id`` in execution order, last trade id)."""
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT * FROM trades WHERE account_id = ? AND id > ? ORDER BY id", (account_id, after_id)).fetchall()
+        if not rows: return [], after_id
+        times = pd.to_datetime([row['timestamp'] for row in rows], format='ISO8601').as_unit('ns').asi8
+        return [Trade(row['id'], int(t), row['type'], row['ticker'], row['shares'], row['price'], row['profit_loss']) for row, t in zip(rows, times)], rows[-1]['id']
+
+    # --- Trading ---
+    def execute(self, account_id, fills):
+        """Applies a batch of fills in one transaction; returns a Trade or a ValueError per fill.
+
+        Each fill is ``(side, ticker, shares, price, stop_loss, take_profit,
+        trailing_stop, time)``, with ``time`` in int64 ns (None for now).
+        Fills apply in order against the running balance, so a rejected one
+        (not enough cash or shares) doesn't stop the rest.  A buy adds to the
+        position at a weighted average price and replaces its protective
+        orders; a sell with ``shares=None`` closes the whole position.
+        """
+        now = pd.Timestamp(datetime.now()).value
+        results, trades, touched = [], [], set()
+        with self.pool.transaction() as conn:
+            cash = conn.execute("SELECT cash FROM accounts WHERE id = ?", (account_id,)).fetchone()['cash']
+            query, params = "SELECT ticker, shares, avg_price, stop_loss, take_profit, trailing_stop FROM positions WHERE account_id = ?", [account_id]
+            tickers = list({fill[1] for fill in fills})
+            if len(tickers) <= MAX_PARAMS: query += f" AND ticker IN ({','.join('?' * len(tickers))})"; params += tickers
+            positions = {row[0]: list(row[1:]) for row in conn.execute(query, params)}
+            trade_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM trades").fetchone()[0]    # stable: we hold the write lock
+            for side, ticker, shares, price, stop_loss, take_profit, trailing_stop, time in fills:
+                position = positions.get(ticker)
+                if side == 'BUY':
+                    cost = price * shares
+                    if cash < cost: results.append(ValueError("Not enough cash.")); continue
+                    cash -= cost
+                    if position is None: positions[ticker] = [shares, price, stop_loss, take_profit, trailing_stop]
+                    else: position[:] = shares + position[0], (position[1] * position[0] + price * shares) / (position[0] + shares), stop_loss, take_profit, trailing_stop
+                    profit_loss = 0.0
+                else:
+                    if shares is None and position is not None: shares = position[0]
+                    if position is None or position[0] < shares: results.append(ValueError("Not enough shares to sell.")); continue
+                    position[0] -= shares; cash += price * shares
+                    profit_loss = (price - position[1]) * shares
+                    if not position[0]: del positions[ticker]
+                trade_id += 1; touched.add(ticker)
+                trade = Trade(trade_id, time or now, side, ticker, shares, price, profit_loss)
+                trades.append(trade); results.append(trade)
+            if trades:
+                conn.execute("UPDATE accounts SET cash = ?, version = version + 1 WHERE id = ?", (cash, account_id))
+                conn.executemany("DELETE FROM positions WHERE account_id = ? AND ticker = ?", [(account_id, t) for t in touched if t not in positions])
+                conn.executemany("INSERT OR REPLACE INTO positions (account_id, ticker, shares, avg_price, stop_loss, take_profit, trailing_stop) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 [(account_id, t, *positions[t]) for t in touched if t in positions])
+                conn.executemany("INSERT INTO trades (id, account_id, timestamp, type, ticker, shares, price, profit_loss) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [(t.id, account_id, stamp, t.side, t.ticker, t.shares, t.price, t.profit_loss) for t, stamp in zip(trades, _isoformat([t.time for t in trades]))])
+        return results
+
+    def _execute_one(self, account_id, fill):
+        result = self.execute(account_id, [fill])[0]
+        if isinstance(result, ValueError): raise result
+        return result
+
+    def buy(self, account_id, ticker, shares, price, stop_loss=None, take_profit=None, trailing_stop=None, time=None):
+        """Debits cash and adds to the position (see ``execute``); returns the Trade.
+
+        Raises ValueError if the account cannot afford the purchase.
+        """
+        return self._execute_one(account_id, ('BUY', ticker, shares, price, stop_loss, take_profit, trailing_stop, time))
+
+    def sell(self, account_id, ticker, shares, price, time=None):
+        """Credits cash and reduces the position (see ``execute``); returns the Trade.
+
+        ``shares=None`` sells the whole position.  Raises ValueError if the
+        account holds fewer shares than requested (or none at all).
+        """
+        return self._execute_one(account_id, ('SELL', ticker, shares, price, None, None, None, time))
+
+    def import_state(self, account_id, state):
+        """Loads a legacy session dump (cash, portfolio, trade history) into an account."""
+        with self.pool.transaction() as conn:
+            conn.execute("UPDATE accounts SET cash = ?, version = version + 1 WHERE id = ?", (state.get('cash_balance', STARTING_CASH), account_id))
+            conn.execute("DELETE FROM positions WHERE account_id = ?", (account_id,))
+            conn.executemany("INSERT INTO positions (account_id, ticker, shares, avg_price, stop_loss, take_profit, trailing_stop) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [(account_id, t, p['shares'], p['avg_price'], *(p.get(f) for f in ORDER_FIELDS)) for t, p in state.get('portfolio', {}).items()])
+            conn.executemany("INSERT INTO trades (account_id, timestamp, type, ticker, shares, price, profit_loss) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [(account_id, t['timestamp'], t['type'], t['ticker'], t['shares'], t['price'], t.get('profit_loss', 0)) for t in state.get('trade_history', [])])
+
+
+account_store = AccountStore()
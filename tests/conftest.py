@@ -0,0 +1,24 @@
+"""Runs every test offline, in a throwaway directory with its own bar cache and database."""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix="odyssey-tests-")
+# Modules read these at import time, so they must be set before the app's modules load.
+os.environ["ODYSSEY_CACHE_DIR"] = os.path.join(WORKDIR, "cache")
+os.environ["ODYSSEY_DB"] = os.path.join(WORKDIR, "odyssey.db")
+os.environ["ODYSSEY_SYNTHETIC_SEED"] = "0"
+sys.path.insert(0, ROOT)
+os.chdir(WORKDIR)
+
+import pytest
+
+from market_data import SyntheticProvider, quote_cache
+
+
+@pytest.fixture(autouse=True)
+def synthetic_quotes():
+    """A fresh synthetic provider per test, so cached quotes never leak between tests."""
+    quote_cache.set_provider(SyntheticProvider(0))
+    yield quote_cache
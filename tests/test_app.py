@@ -0,0 +1,119 @@
+import os
+import time
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import journal
+import price_feed
+from conftest import ROOT
+from price_feed import PriceFeed
+from storage import AccountStore
+from tracing import tracer
+from trading_core import trading_core
+
+TABS = ["💼 Portfolio", "📜 History", "🔍 Stats", "📡 Screener", "🔬 Analysis", "📰 News", "🎓 Practice", "📚 Learn"]
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    monkeypatch.setattr(trading_core, 'store', AccountStore(str(tmp_path / "accounts.db")))
+    monkeypatch.setattr(trading_core, 'hours', None)    # trade regardless of the wall clock
+    monkeypatch.setattr(journal, '_journals', {})       # account ids restart with each store: keep saved sessions apart too
+    monkeypatch.chdir(tmp_path)
+    at = AppTest.from_file(os.path.join(ROOT, "TradingApp.py"), default_timeout=120)
+    at.run()
+    next(t for t in at.text_input if t.label == "Stock Ticker").set_value("SYN0001")
+    at.run()
+    assert not at.exception, at.exception[0].value
+    return at
+
+
+def run_tab(at, label):
+    at.session_state['main_tabs'] = label      # AppTest doesn't keep the tab selection across runs
+    at.run()
+    assert not at.exception, (label, at.exception[0].value)
+
+
+def test_first_run_prices_the_ticker(app):
+    assert [m.value for m in app.metric if m.label == "Current Price"][0] != "N/A"
+
+
+@pytest.mark.parametrize("label", TABS)
+def test_every_tab_renders(app, label):
+    run_tab(app, label)
+
+
+def test_stats_tab_shows_the_quote(app):
+    run_tab(app, "🔍 Stats")
+    assert not app.error and [s.value for s in app.success] == ["Market is Open"]
+    assert any(m.label == "Current Price" for m in app.metric)
+
+
+def test_closed_market_banner_follows_the_cores_hours(app, monkeypatch):
+    monkeypatch.setattr(trading_core, 'hours', lambda: False)
+    app.run()
+    assert [e.value for e in app.error] == ["Market is Closed"]
+
+
+def test_order_form_buys_and_sells_through_the_core(app):
+    app.number_input(key="shares").set_value(3)
+    next(b for b in app.button if b.label == "Submit Buy Order").click()
+    app.run()
+    account = app.session_state['account']
+    assert account.positions['SYN0001']['shares'] == 3 and account.trades[-1].side == 'BUY'
+    next(b for b in app.button if b.label == "Submit Sell Order").click()
+    app.run()
+    assert 'SYN0001' not in app.session_state['account'].positions
+    run_tab(app, "📜 History")
+    assert len(app.dataframe[-1].value) >= 2
+
+
+def test_save_then_load_restores_preferences(app):
+    button = lambda label: next(b for b in app.button if b.label == label)
+    app.text_input(key="new_account").set_value("scratch")     # a drawn widget's key must never be saved or loaded
+    app.checkbox(key="show_sma50").check()
+    button("Save Session").click()
+    app.run()
+    app.session_state['watchlist'] = ['AAA']
+    app.checkbox(key="show_sma50").uncheck()
+    next(t for t in app.text_input if t.label == "Stock Ticker").set_value("SYN0002")
+    app.run()
+    button("Load Session").click()
+    app.run()
+    assert not app.exception, app.exception[0].value
+    assert app.session_state['watchlist'] == ['AAPL', 'MSFT', 'GOOGL', 'TSLA'] and app.session_state['main_ticker'] == "SYN0001"
+    assert app.checkbox(key="show_sma50").value and app.text_input(key="new_account").value == "scratch"
+
+
+def test_loading_a_save_keeps_this_sessions_feed_owner(app):
+    owner = app.session_state['feed_owner']
+    next(b for b in app.button if b.label == "Save Session").click()
+    app.run()
+    assert 'feed_owner' not in journal._journals["account_1"].load()
+    app.session_state['feed_owner'] = "another session"
+    next(b for b in app.button if b.label == "Load Session").click()
+    app.run()
+    assert app.session_state['feed_owner'] == "another session" != owner
+
+
+class FlatSource:
+    """One price forever: the feed publishes a single tick per symbol."""
+
+    async def fetch(self, symbols, max_age):
+        return {s: 42.0 for s in symbols}
+
+
+def test_auto_refresh_redraws_the_chart_only_on_new_ticks(app, monkeypatch):
+    feed = PriceFeed(FlatSource())
+    monkeypatch.setattr(price_feed, 'price_feed', feed)
+    app.checkbox(key="auto_refresh").check()
+    app.run()
+    deadline = time.monotonic() + 10
+    while feed.latest("SYN0001") is None and time.monotonic() < deadline: time.sleep(0.05)
+    app.run()       # the tick redraws the chart with its live price line
+    reused = tracer.totals["chart.reused"]
+    app.run()
+    feed.stop()
+    assert not app.exception and tracer.totals["chart.reused"] == reused + 1
+    assert [m.value for m in app.metric if m.label == "Current Price"] == ["$42.00"]
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import EXIT_END, EXIT_SIGNAL, EXIT_STOP, EXIT_TARGET, backtest, run_grid, sma_cross
+
+
+def frame(close, open_=None, high=None, low=None):
+    close = np.asarray(close, dtype=float)
+    return {'Open': close if open_ is None else np.asarray(open_, dtype=float), 'High': close if high is None else np.asarray(high, dtype=float),
+            'Low': close if low is None else np.asarray(low, dtype=float), 'Close': close}
+
+
+def enter_at(*bars, exit_at=()):
+    """A strategy that enters on the given bars and exits on ``exit_at``."""
+    def strategy(arrays):
+        entries, exits = np.zeros(len(arrays['Close']), bool), np.zeros(len(arrays['Close']), bool)
+        entries[list(bars)], exits[list(exit_at)] = True, True
+        return entries, exits
+    return strategy
+
+
+def test_warm_up_is_not_a_cross():
+    # A steady uptrend has the fast SMA above the slow one from the first bar both exist.
+    bars = frame(np.linspace(100, 200, 120))
+    entries, exits = sma_cross(bars)
+    assert not entries.any() and not exits.any()
+    assert len(backtest(bars)['trades']) == 0
+
+
+def test_crosses_match_pandas():
+    close = 100 + np.cumsum(np.random.default_rng(3).normal(0, 1, 500))
+    fast, slow = pd.Series(close).rolling(20).mean(), pd.Series(close).rolling(50).mean()
+    above = fast > slow
+    defined = fast.notna() & slow.notna()
+    expected = above & ~above.shift(1, fill_value=False) & defined & defined.shift(1, fill_value=False)
+    entries, _ = sma_cross(frame(close))
+    assert entries.any() and (entries == expected.to_numpy()).all()
+
+
+def test_stop_fills_at_the_stop_or_a_gapped_open():
+    close = [100, 99, 98, 90, 95]
+    low = [100, 99, 97, 85, 95]
+    result = backtest(frame(close, open_=[100, 100, 99, 92, 90], low=low), enter_at(0), stop_loss=0.05, shares=10)
+    (trade,) = result['trades']
+    assert (trade['exit_idx'], trade['exit_price'], trade['reason']) == (3, 92.0, EXIT_STOP)       # gapped below 95: fills at the open
+    result = backtest(frame(close, low=[100, 99, 94, 85, 95]), enter_at(0), stop_loss=0.05, shares=10)
+    assert (result['trades'][0]['exit_idx'], result['trades'][0]['exit_price']) == (2, 95.0)
+
+
+def test_stop_wins_when_both_are_reachable_in_one_bar():
+    bars = frame([100, 100, 100], high=[100, 120, 100], low=[100, 80, 100])
+    (trade,) = backtest(bars, enter_at(0), stop_loss=0.1, take_profit=0.1, shares=1)['trades']
+    assert trade['reason'] == EXIT_STOP and trade['exit_price'] == pytest.approx(90.0)
+    (trade,) = backtest(bars, enter_at(0), take_profit=0.1, shares=1)['trades']
+    assert trade['reason'] == EXIT_TARGET and trade['exit_price'] == pytest.approx(110.0)
+
+
+def test_signals_re_enter_and_the_last_trade_runs_to_the_end():
+    bars = frame([10, 11, 12, 13, 14, 15, 16])
+    result = backtest(bars, enter_at(1, 2, 4, exit_at=[3]), cash=100.0)
+    trades = result['trades']
+    assert trades[['entry_idx', 'exit_idx', 'reason']].tolist() == [(1, 3, EXIT_SIGNAL), (4, 6, EXIT_END)]
+    assert trades['shares'].tolist() == [9, 8]      # every entry buys as many shares as cash allows
+    equity = result['equity']
+    assert equity[0] == 100.0 and equity[-1] == pytest.approx(100.0 + trades['pnl'].sum())
+    assert equity[5] == pytest.approx(100.0 + trades['pnl'][0] + 8 * (15 - 14))     # open positions are marked at each close
+    assert result['stats']['trades'] == 2 and result['stats']['win_rate'] == 1.0
+
+
+def test_run_grid_matches_single_backtests():
+    rng = np.random.default_rng(5)
+    frames = {t: frame(100 + np.cumsum(rng.normal(0, 1, 400))) for t in ('AAA', 'BBB')}
+    rows = run_grid(frames, grid={'fast': [5, 10], 'slow': [30]}, stop_loss=0.05, max_workers=1)
+    assert [(t, p) for t, p, _ in rows] == [('AAA', {'fast': 5, 'slow': 30}), ('AAA', {'fast': 10, 'slow': 30}), ('BBB', {'fast': 5, 'slow': 30}), ('BBB', {'fast': 10, 'slow': 30})]
+    for ticker, params, stats in rows:
+        assert stats == backtest(frames[ticker], params=params, stop_loss=0.05)['stats']
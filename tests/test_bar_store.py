@@ -0,0 +1,82 @@
+import os
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import bar_store as bar_store_module
+from bar_store import BarStore, refresh_seconds
+from market_data import FixtureProvider
+
+DAYS = pd.bdate_range('2023-01-02', periods=300, tz='America/New_York').as_unit('ns')
+BARS = pd.DataFrame({'Open': np.arange(300.0), 'High': np.arange(300.0) + 2, 'Low': np.arange(300.0) - 2, 'Close': np.arange(300.0) + 1,
+                     'Volume': np.full(300, 1e6)}, index=DAYS)
+
+
+class RecordingProvider(FixtureProvider):
+    """Serves ``BARS[:n]`` for AAA and records every history request."""
+
+    def __init__(self, n):
+        super().__init__(bars={'AAA': BARS.iloc[:n]})
+        self.requests = []
+
+    def history(self, ticker, interval, period=None, start=None, end=None):
+        self.requests.append((period, None if start is None else pd.Timestamp(start), None if end is None else pd.Timestamp(end)))
+        return super().history(ticker, interval, period, start, end)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=pd.Timestamp('2024-01-01', tz='UTC').timestamp())
+    monkeypatch.setattr(bar_store_module, 'time', types.SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def make_store(root, provider):
+    return BarStore(root=str(root), source=types.SimpleNamespace(provider=provider))
+
+
+def test_stored_history_is_served_without_refetching(tmp_path, clock):
+    provider = RecordingProvider(250)
+    store = make_store(tmp_path, provider)
+    pd.testing.assert_frame_equal(store.bars('aaa', '1d'), BARS.iloc[:250], check_freq=False)
+    pd.testing.assert_frame_equal(store.bars('AAA', '1d', period='1mo'), BARS.iloc[:250].loc[DAYS[249] - pd.DateOffset(months=1):], check_freq=False)
+    assert store.fetches == 1 and provider.requests == [('max', None, None)]
+
+
+def test_a_stale_tail_fetches_and_appends_only_new_bars(tmp_path, clock):
+    provider = RecordingProvider(250)
+    store = make_store(tmp_path, provider)
+    store.bars('AAA', '1d')
+    revised = BARS.copy()
+    revised.iloc[249, revised.columns.get_loc('Close')] = -1.0      # the last stored bar was still forming
+    provider.bars['AAA'] = revised.iloc[:260]
+    clock.now += refresh_seconds('1d') - 1
+    assert len(store.bars('AAA', '1d')) == 250 and store.fetches == 1
+    clock.now += 2
+    frame = store.bars('AAA', '1d')
+    assert provider.requests[-1] == (None, DAYS[249], None)
+    pd.testing.assert_frame_equal(frame, revised.iloc[:260], check_freq=False)
+    assert os.path.getsize(os.path.join(tmp_path, 'bars', 'AAA', '1d', 'ts.bin')) == 260 * 8
+
+
+def test_a_missing_head_is_backfilled_up_to_the_stored_bars(tmp_path, clock):
+    provider = RecordingProvider(300)
+    store = make_store(tmp_path, provider)
+    assert store.bars('AAA', '1d', start='2023-06-01', end='2023-07-01').index[0] == pd.Timestamp('2023-06-01', tz='America/New_York')
+    frame = store.bars('AAA', '1d', start='2023-03-01', end='2023-04-01')
+    assert frame.index[0] == pd.Timestamp('2023-03-01', tz='America/New_York') and frame.index[-1] == pd.Timestamp('2023-03-31', tz='America/New_York')
+    assert provider.requests[-1] == (None, pd.Timestamp('2023-03-01'), pd.Timestamp('2023-06-02', tz='America/New_York'))
+    store.bars('AAA', '1d', start='2023-04-03')
+    assert store.fetches == 2
+
+
+def test_a_new_store_maps_the_saved_files_and_trims_a_torn_row(tmp_path, clock):
+    make_store(tmp_path, RecordingProvider(250)).bars('AAA', '1d')
+    with open(os.path.join(tmp_path, 'bars', 'AAA', '1d', 'ohlcv.bin'), 'ab') as f: f.write(b'\0' * 12)    # a crash mid-append
+    provider = RecordingProvider(250)
+    store = make_store(tmp_path, provider)
+    pd.testing.assert_frame_equal(store.stored('AAA', '1d'), BARS.iloc[:250], check_freq=False)
+    store.bars('AAA', '1d')
+    assert provider.requests == []
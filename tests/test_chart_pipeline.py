@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from chart_pipeline import CANDLE_BUDGET, LINE_BUDGET, WEBGL_THRESHOLD, aggregate_ohlcv, downsample_line, finer_interval, line_trace, lttb_indices, prepare
+
+
+def ohlcv(n, seed=0):
+    close = 100 + np.cumsum(np.random.default_rng(seed).normal(0, 1, n))
+    index = pd.date_range('2024-01-02 09:30', periods=n, freq='min', tz='America/New_York')
+    return pd.DataFrame({'Open': close - 0.5, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': np.arange(n, dtype=float)}, index=index)
+
+
+def test_candles_are_aggregated_into_equal_count_buckets():
+    frame = ohlcv(2000)
+    candles = aggregate_ohlcv(frame)
+    assert len(candles) == CANDLE_BUDGET and candles.index[0] == frame.index[0]
+    assert candles['Open'].iloc[0] == frame['Open'].iloc[0] and candles['Close'].iloc[-1] == frame['Close'].iloc[-1]
+    assert candles['High'].max() == frame['High'].max() and candles['Low'].min() == frame['Low'].min()
+    assert candles['Volume'].sum() == frame['Volume'].sum()
+    small = frame.iloc[:CANDLE_BUDGET]
+    assert aggregate_ohlcv(small) is small      # already within budget
+
+
+def test_lttb_keeps_the_endpoints_and_the_extremes():
+    y = np.sin(np.linspace(0, 20, 5000))
+    y[1234], y[4321] = 5.0, -5.0
+    keep = lttb_indices(np.arange(5000.0), y, 200)
+    assert len(keep) == 200 and keep[0] == 0 and keep[-1] == 4999
+    assert (np.diff(keep) > 0).all() and {1234, 4321} <= set(keep)
+    assert (lttb_indices(np.arange(10.0), y[:10], 50) == np.arange(10)).all()
+
+
+def test_lines_drop_their_warm_up_and_fit_the_budget():
+    frame = ohlcv(5000)
+    frame['SMA_50'] = frame['Close'].rolling(50).mean()
+    candles, lines = prepare(frame, ['SMA_50', 'EMA_200'])
+    x, y = lines['SMA_50']
+    assert list(lines) == ['SMA_50'] and len(x) == len(y) == LINE_BUDGET
+    assert x[0] == frame.index[49] and x[-1] == frame.index[-1] and not np.isnan(y).any()
+    x, y = downsample_line(frame.index, np.full(5000, np.nan))
+    assert len(x) == len(y) == 0
+
+
+def test_long_lines_are_drawn_with_webgl():
+    assert line_trace(WEBGL_THRESHOLD) is go.Scatter and line_trace(WEBGL_THRESHOLD + 1) is go.Scattergl
+
+
+def test_zooming_into_a_few_sessions_picks_a_finer_interval():
+    start, end = pd.Timestamp('2024-03-04', tz='America/New_York'), pd.Timestamp('2024-03-06', tz='America/New_York')
+    assert finer_interval('1d', start, end, now=pd.Timestamp('2024-03-20', tz='America/New_York')) == '2m'       # 3 sessions of 2m bars fit
+    assert finer_interval('1d', start, end, now=pd.Timestamp('2024-06-20', tz='America/New_York')) == '1h'       # intraday history stops at 60 days
+    assert finer_interval('1d', start, end, now=pd.Timestamp('2027-01-01', tz='America/New_York')) is None
+    assert finer_interval('1m', start, end) is None and finer_interval('3mo', start, end) is None
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import IndicatorEngine, columnar, ema, rsi, sma
+
+SPECS = [('sma', 10), ('ema', 20), ('rsi', 14)]
+SINGLE = {'SMA_10': lambda c: sma(c, 10), 'EMA_20': lambda c: ema(c, 20), 'RSI_14': lambda c: rsi(c, 14)}
+
+
+def closes(n, seed=0):
+    return 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.01, n)))
+
+
+def test_sma_matches_pandas_rolling():
+    c = closes(300)
+    np.testing.assert_allclose(sma(c, 10), pd.Series(c).rolling(10).mean().to_numpy(), equal_nan=True)
+
+
+def test_ema_is_seeded_with_the_first_sma():
+    c = closes(300)
+    values = ema(c, 20)
+    assert np.isnan(values[:19]).all()
+    assert values[19] == pytest.approx(c[:20].mean())
+    assert values[20] == pytest.approx(values[19] + 2 / 21 * (c[20] - values[19]))
+
+
+def test_growing_series_resumes_warm_and_matches_cold():
+    c, ts = closes(500), np.arange(500, dtype=np.int64)
+    engine = IndicatorEngine()
+    engine.compute(('X', '1d'), ts[:300], c[:300], SPECS)
+    for end in range(301, 500, 37):
+        out = engine.compute(('X', '1d'), ts[:end], c[:end], SPECS)
+        for name, fn in SINGLE.items():
+            np.testing.assert_allclose(out[name], fn(c[:end]), rtol=1e-9, equal_nan=True)
+    assert engine.cold == len(SPECS) and engine.warm > 0
+
+
+def test_changed_last_bar_is_recomputed():
+    c, ts = closes(200), np.arange(200, dtype=np.int64)
+    engine = IndicatorEngine()
+    engine.compute(('X', '1d'), ts, c, SPECS)
+    moved = c.copy(); moved[-1] *= 1.05
+    out = engine.compute(('X', '1d'), ts, moved, SPECS)
+    for name, fn in SINGLE.items():
+        np.testing.assert_allclose(out[name], fn(moved), rtol=1e-9, equal_nan=True)
+    assert engine.cold == len(SPECS)
+
+
+def test_unchanged_series_is_a_hit():
+    c, ts = closes(200), np.arange(200, dtype=np.int64)
+    engine = IndicatorEngine()
+    engine.compute(('X', '1d'), ts, c, SPECS)
+    engine.compute(('X', '1d'), ts, c, SPECS)
+    assert engine.hits == len(SPECS)
+
+
+def test_rewritten_history_is_recomputed_cold():
+    c, ts = closes(200), np.arange(200, dtype=np.int64)
+    engine = IndicatorEngine()
+    engine.compute(('X', '1d'), ts, c, SPECS)
+    out = engine.compute(('X', '1d'), ts[:150], c[:150], SPECS)
+    np.testing.assert_allclose(out['EMA_20'], ema(c[:150], 20), rtol=1e-9, equal_nan=True)
+    assert engine.cold == 2 * len(SPECS)
+
+
+def test_columnar_matches_single_series_on_ragged_columns():
+    lengths = [250, 40, 12, 250, 1]
+    series = [closes(n, seed=i) for i, n in enumerate(lengths)]
+    matrix = np.full((max(lengths), len(series)), np.nan)
+    for j, s in enumerate(series): matrix[len(matrix) - len(s):, j] = s
+    out = columnar(matrix, SPECS)
+    for j, s in enumerate(series):
+        for name, fn in SINGLE.items():
+            np.testing.assert_allclose(out[name][len(matrix) - len(s):, j], fn(s), rtol=1e-9, equal_nan=True)
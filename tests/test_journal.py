@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from journal import SessionJournal
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)     # keeps the legacy portfolio.json lookup inside the test
+    return SessionJournal(name=str(tmp_path / "session"), compact_every=1000)
+
+
+def reopen(journal):
+    return SessionJournal(name=journal.journal_path[:-len(".journal")], compact_every=journal.compact_every)
+
+
+def test_saves_append_only_changes(journal):
+    assert journal.save({'cash_balance': 100.0, 'trade_history': [{'id': 1}]}) == 2
+    assert journal.save({'cash_balance': 100.0, 'trade_history': [{'id': 1}, {'id': 2}]}) == 1
+    assert journal.save({'cash_balance': 100.0, 'trade_history': [{'id': 1}, {'id': 2}]}) == 0
+    assert reopen(journal).load() == {'cash_balance': 100.0, 'trade_history': [{'id': 1}, {'id': 2}]}
+
+
+def test_garbage_tail_is_dropped_and_later_saves_stay_readable(journal):
+    journal.save({'a': 1})
+    with open(journal.journal_path, 'a') as f: f.write('{"op": "set", "key": "a", "va')
+    again = reopen(journal)
+    assert again.load() == {'a': 1}
+    again.save({'a': 2})
+    assert reopen(journal).load() == {'a': 2}
+
+
+def test_tail_that_parses_but_lost_its_newline_is_dropped(journal):
+    journal.save({'a': 1})
+    journal.save({'a': 2})
+    with open(journal.journal_path, 'rb') as f: raw = f.read()
+    with open(journal.journal_path, 'wb') as f: f.write(raw[:-1])
+    again = reopen(journal)
+    assert again.load() == {'a': 1}
+    again.save({'a': 3, 'b': 4})
+    assert reopen(journal).load() == {'a': 3, 'b': 4}
+
+
+def test_compaction_writes_a_snapshot_and_truncates(journal):
+    journal.compact_every = 3
+    for i in range(4): journal.save({'n': i})
+    with open(journal.snapshot_path) as f: assert json.load(f)['state'] == {'n': 2}
+    with open(journal.journal_path) as f: assert len(f.readlines()) == 1
+    assert reopen(journal).load() == {'n': 3}
+
+
+def test_crash_between_snapshot_and_truncate_skips_covered_events(journal):
+    for i in range(3): journal.save({'n': i})
+    with open(journal.journal_path) as f: lines = f.read()
+    journal._compact()
+    with open(journal.journal_path, 'w') as f: f.write(lines)     # as if the truncate never ran
+    again = reopen(journal)
+    assert again.load() == {'n': 2} and again._pending == 0
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from ledger import LotLedger, analyze_matches
+from storage import Trade
+
+
+def trade(i, day, side, ticker, shares, price):
+    return Trade(i, pd.Timestamp(day).value, side, ticker, shares, price, 0.0)
+
+
+HISTORY = [
+    trade(1, '2024-03-01 10:00', 'BUY', 'SYN0001', 10, 100.0),
+    trade(2, '2024-04-01 10:00', 'BUY', 'SYN0001', 5, 90.0),
+    trade(3, '2024-05-01 10:00', 'SELL', 'SYN0001', 12, 110.0),
+    trade(4, '2024-05-02 10:00', 'BUY', 'SYN0002', 3, 50.0),
+    trade(5, '2024-06-03 10:00', 'SELL', 'SYN0001', 3, 95.0),
+]
+
+
+def test_sells_match_lots_fifo_across_partial_fills():
+    ledger = LotLedger.from_history(HISTORY)
+    matches = ledger.matches_frame()
+    assert matches[['sell_id', 'buy_id', 'shares']].values.tolist() == [[3, 1, 10], [3, 2, 2], [5, 2, 3]]     # Trade ids
+    assert matches['realized_pl'].tolist() == [100.0, 40.0, 15.0]
+    assert [lot.shares for lot in ledger.open['SYN0002']] == [3]
+    assert matches['buy_time'].iloc[0] == pd.Timestamp('2024-03-01 10:00')
+
+
+def test_extend_folds_in_new_trades_incrementally():
+    ledger = LotLedger()
+    for end in range(1, len(HISTORY) + 1): ledger.extend(HISTORY[:end])
+    assert ledger.matches == LotLedger.from_history(HISTORY).matches and ledger.n == len(HISTORY)
+
+
+def test_specific_lot_sell_takes_that_lot_first():
+    ledger = LotLedger.from_history(HISTORY[:2])
+    left = ledger.sell('SYN0001', 7, 120.0, pd.Timestamp('2024-05-01'), 9, lot_id=2)
+    assert left == 0
+    assert [(m[1], m[3]) for m in ledger.matches] == [(2, 5), (1, 2)]
+    assert ledger.sell('SYN0001', 100, 120.0, pd.Timestamp('2024-05-02'), 10) == 92
+
+
+def test_analyze_matches_scores_every_lot():
+    result = analyze_matches(LotLedger.from_history(HISTORY).matches_frame())
+    assert result['entry_rsi'].between(0, 100).all()
+    assert (result['max_high'] > 0).all()
+    np.testing.assert_allclose(result['missed_profit'], result['max_potential'] - result['realized_pl'])
+
+
+def test_lots_bought_before_the_first_bar_have_no_entry_rsi():
+    early = [trade(1, '2001-03-01 10:00', 'BUY', 'SYN0003', 4, 10.0), trade(2, '2001-04-02 10:00', 'SELL', 'SYN0003', 1, 12.0),
+             trade(3, '2024-04-01 10:00', 'SELL', 'SYN0003', 3, 12.0)]
+    result = analyze_matches(LotLedger.from_history(early).matches_frame())
+    assert result['entry_rsi'].isna().all()
+    assert np.isnan(result['max_high'].iloc[0]) and result['max_high'].iloc[1] > 0    # sold before the first bar: nothing to score
@@ -0,0 +1,125 @@
+import threading
+import time
+import types
+
+import pytest
+
+import market_data
+from market_data import ERROR_TTL, QuoteCache
+
+
+class Clock:
+    def __init__(self): self.now = 1000.0
+    def monotonic(self): return self.now
+
+
+class CountingProvider:
+    """Quotes priced by symbol; unknown symbols raise. Counts upstream calls."""
+
+    def __init__(self, prices, delay=0.0):
+        self.prices, self.delay = prices, delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def info(self, ticker):
+        with self._lock: self.calls.append(ticker)
+        time.sleep(self.delay)
+        if ticker not in self.prices: raise KeyError(ticker)
+        return {'regularMarketPrice': self.prices[ticker]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(market_data, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def test_quotes_are_served_from_cache_until_the_ttl_lapses(clock):
+    provider = CountingProvider({'AAA': 10.0})
+    cache = QuoteCache(provider, ttl=15)
+    assert cache.get_price('aaa') == 10.0 and cache.get_price('AAA') == 10.0
+    clock.now += 14.9
+    assert cache.get_price('AAA') == 10.0 and provider.calls == ['AAA']
+    clock.now += 0.2
+    provider.prices['AAA'] = 11.0
+    assert cache.get_price('AAA') == 11.0 and provider.calls == ['AAA', 'AAA']
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_max_age_and_per_symbol_ttls_tighten_freshness(clock):
+    provider = CountingProvider({'AAA': 10.0, 'BBB': 20.0})
+    cache = QuoteCache(provider, ttl=15)
+    cache.set_ttl('bbb', 1)
+    cache.get_info('AAA'); cache.get_info('BBB')
+    clock.now += 2
+    cache.get_info('AAA'); cache.get_info('BBB')
+    assert provider.calls == ['AAA', 'BBB', 'BBB']
+    cache.get_info('AAA', max_age=1)
+    assert provider.calls[-1] == 'AAA'
+
+
+def test_least_recently_used_symbols_are_evicted(clock):
+    provider = CountingProvider({'AAA': 1.0, 'BBB': 2.0, 'CCC': 3.0})
+    cache = QuoteCache(provider, max_entries=2)
+    for ticker in ('AAA', 'BBB', 'AAA', 'CCC', 'AAA', 'BBB'): cache.get_info(ticker)
+    assert provider.calls == ['AAA', 'BBB', 'CCC', 'BBB']
+
+
+def test_errors_are_cached_briefly_and_re_raised(clock):
+    provider = CountingProvider({})
+    cache = QuoteCache(provider, ttl=60)
+    with pytest.raises(KeyError): cache.get_info('BAD')
+    assert cache.get_price('BAD') is None and provider.calls == ['BAD']
+    clock.now += ERROR_TTL
+    assert cache.get_price('BAD') is None and provider.calls == ['BAD', 'BAD']
+
+
+def test_concurrent_callers_share_one_fetch():
+    provider = CountingProvider({'AAA': 10.0}, delay=0.05)
+    cache = QuoteCache(provider)
+    prices = []
+    threads = [threading.Thread(target=lambda: prices.append(cache.get_price('AAA'))) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert prices == [10.0] * 8 and provider.calls == ['AAA']
+
+
+class BatchProvider(CountingProvider):
+    """Also resolves many symbols per request, as ``info_many``."""
+
+    def __init__(self, prices):
+        super().__init__(prices)
+        self.batches = []
+
+    def info_many(self, tickers):
+        self.batches.append(sorted(tickers))
+        return {t: {'regularMarketPrice': self.prices[t]} for t in tickers if t in self.prices}, {}
+
+
+def test_batches_fetch_only_stale_symbols_in_one_request(clock):
+    provider = BatchProvider({'AAA': 1.0, 'BBB': 2.0, 'CCC': None})
+    cache = QuoteCache(provider, ttl=15)
+    cache.get_info('AAA')
+    prices, errors = cache.get_prices(['aaa', 'BBB', 'CCC', 'BAD', 'BBB'])
+    assert prices == {'AAA': 1.0, 'BBB': 2.0} and set(errors) == {'CCC', 'BAD'}
+    assert provider.batches == [['BAD', 'BBB', 'CCC']] and provider.calls == ['AAA']
+    assert cache.get_prices(['AAA', 'BBB', 'BAD'])[0] == {'AAA': 1.0, 'BBB': 2.0} and len(provider.batches) == 1     # the miss is cached too
+
+
+def test_a_failed_batch_fails_each_symbol_on_its_own(clock):
+    provider = BatchProvider({'AAA': 1.0})
+    provider.info_many = lambda tickers: 1 / 0
+    cache = QuoteCache(provider)
+    infos, errors = cache.get_many(['AAA', 'BBB'])
+    assert infos == {} and set(errors) == {'AAA', 'BBB'} and all(isinstance(e, ZeroDivisionError) for e in errors.values())
+
+
+def test_providers_without_batching_are_fetched_concurrently():
+    provider = CountingProvider({f'S{i}': float(i) for i in range(1, 9)}, delay=0.1)
+    cache = QuoteCache(provider)
+    started = time.perf_counter()
+    prices, errors = cache.get_prices([f'S{i}' for i in range(1, 9)] + ['BAD'])
+    assert time.perf_counter() - started < 0.5      # nine 0.1 s lookups, run side by side
+    assert prices == {f'S{i}': float(i) for i in range(1, 9)} and list(errors) == ['BAD']
+    assert sorted(provider.calls) == sorted([*prices, 'BAD'])
@@ -0,0 +1,107 @@
+import threading
+import time
+import types
+
+import pytest
+
+import news_store as news_store_module
+from news_store import ERROR_TTL, RETENTION_DAYS, NewsPrefetcher, NewsStore, normalize_article
+
+NOW = 1_700_000_000.0
+
+
+def story(uuid, hours_ago, title=None):
+    return {'uuid': uuid, 'title': title or f"Story {uuid}", 'publisher': "Wire", 'link': f"https://example.com/{uuid}",
+            'providerPublishTime': int(NOW - hours_ago * 3600)}
+
+
+class NewsProvider:
+    """Serves canned items per ticker; unknown tickers raise. Records every request."""
+
+    def __init__(self, items, delay=0.0):
+        self.items, self.delay = items, delay
+        self.calls = []
+
+    def news(self, ticker):
+        self.calls.append(ticker)
+        time.sleep(self.delay)
+        return self.items[ticker]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=NOW)
+    monkeypatch.setattr(news_store_module, 'time', types.SimpleNamespace(time=lambda: clock.now, monotonic=lambda: clock.now))
+    return clock
+
+
+def make_store(tmp_path, provider, **kwargs):
+    return NewsStore(path=str(tmp_path / "news.db"), source=types.SimpleNamespace(provider=provider), **kwargs)
+
+
+def test_both_news_formats_normalize_to_one_shape():
+    flat = normalize_article(story('a1', 1))
+    nested = normalize_article({'id': 'a1', 'content': {'title': "Story a1", 'canonicalUrl': {'url': "https://example.com/a1"}, 'provider': {'displayName': "Wire"},
+                                                        'pubDate': "2023-11-14T21:13:20Z", 'summary': None}})
+    assert flat == nested == {'id': 'a1', 'title': "Story a1", 'link': "https://example.com/a1", 'publisher': "Wire", 'published_at': int(NOW - 3600), 'summary': None}
+    assert normalize_article({'title': "No link"}) is None
+
+
+def test_a_story_on_several_tickers_is_stored_and_shown_once(tmp_path, clock):
+    provider = NewsProvider({'AAA': [story('shared', 1), story('a1', 3)], 'BBB': [story('shared', 1), story('b1', 2)]})
+    store = make_store(tmp_path, provider)
+    assert store.refresh(['aaa', 'BBB', 'AAA']) == 2
+    articles = store.articles(['AAA', 'BBB'])
+    assert [a['id'] for a in articles] == ['shared', 'b1', 'a1']
+    assert articles[0]['tickers'] == ['AAA', 'BBB'] and [a['id'] for a in store.articles(['BBB'], limit=1)] == ['shared']
+
+
+def test_tickers_are_refetched_only_after_their_ttl(tmp_path, clock):
+    provider = NewsProvider({'AAA': [story('a1', 1)], 'BBB': [story('b1', 1)]})
+    store = make_store(tmp_path, provider, ttl=900)
+    store.refresh(['AAA'])
+    clock.now += 899
+    assert store.refresh(['AAA']) == 0 and store.ensure(['AAA', 'BBB']) == 1
+    clock.now += 1
+    assert store.ensure(['AAA']) == 0 and store.refresh(['AAA', 'BBB']) == 1
+    assert provider.calls == ['AAA', 'BBB', 'AAA'] and store.status('aaa') == (clock.now, None)
+
+
+def test_failed_fetches_are_recorded_and_retried_sooner(tmp_path, clock):
+    provider = NewsProvider({})
+    store = make_store(tmp_path, provider, ttl=900)
+    store.refresh(['BAD'])
+    assert store.status('BAD') == (NOW, "KeyError: 'BAD'") and store.articles(['BAD']) == []
+    clock.now += ERROR_TTL - 1
+    assert store.refresh(['BAD']) == 0
+    clock.now += 1
+    assert store.refresh(['BAD']) == 1 and provider.calls == ['BAD', 'BAD']
+
+
+def test_stories_past_retention_are_pruned(tmp_path, clock):
+    store = make_store(tmp_path, NewsProvider({'AAA': [story('old', RETENTION_DAYS * 24 + 1), story('new', 1)]}))
+    store.refresh(['AAA'])
+    assert [a['id'] for a in store.articles(['AAA'])] == ['new']
+
+
+def test_concurrent_refreshes_of_a_ticker_share_one_request(tmp_path):
+    provider = NewsProvider({'AAA': [story('a1', 1)]}, delay=0.05)
+    store = make_store(tmp_path, provider)
+    threads = [threading.Thread(target=store.refresh, args=(['AAA'],)) for _ in range(6)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert provider.calls == ['AAA'] and store.fetches == 1
+
+
+def test_the_prefetcher_refreshes_the_union_of_live_leases(tmp_path):
+    provider = NewsProvider({'AAA': [story('a1', 1)], 'BBB': [story('b1', 1)], 'CCC': []})
+    store = make_store(tmp_path, provider)
+    prefetcher = NewsPrefetcher(store, lease=60, poll=60)
+    prefetcher.watch('session-1', ['aaa', 'BBB'])
+    prefetcher.watch('session-2', ['BBB', 'CCC', ''])
+    deadline = time.monotonic() + 5
+    while store.fetches < 3 and time.monotonic() < deadline: time.sleep(0.01)
+    assert sorted(provider.calls) == ['AAA', 'BBB', 'CCC'] and prefetcher.symbols() == {'AAA', 'BBB', 'CCC'}
+    prefetcher.lease = 0
+    prefetcher.watch('session-2', ['CCC'])          # an immediately lapsed lease
+    assert prefetcher.symbols() == {'AAA', 'BBB'}
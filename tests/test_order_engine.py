@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from order_engine import BUY, LIMIT, SELL, STOP, TRAILING, MatchingEngine
+
+
+class NaiveBook:
+    """Reference model: scans every resting order on every tick."""
+
+    PRIORITY = {STOP: 0, LIMIT: 1, TRAILING: 2}   # the engine matches falling, rising, then trailing orders
+
+    def __init__(self):
+        self.orders = {}    # id -> [ticker, side, kind, trigger, oco, peak]
+
+    def place(self, order, ref_price):
+        self.orders[order.id] = [order.ticker, order.side, order.kind, order.trigger, order.oco, ref_price]
+
+    def on_price(self, ticker, price):
+        fired = []
+        for oid, o in self.orders.items():
+            if o[0] != ticker: continue
+            side, kind, trigger = o[1:4]
+            if kind == TRAILING:
+                o[5] = max(o[5], price)
+                hit = price <= o[5] - trigger
+            elif (side, kind) in ((SELL, STOP), (BUY, LIMIT)):
+                hit = price <= trigger
+            else:
+                hit = price >= trigger
+            if hit: fired.append(oid)
+        filled, closed = set(), set()
+        for oid in sorted(fired, key=lambda i: self.PRIORITY[self.orders[i][2]]):
+            oco = self.orders[oid][4]
+            if oco is not None and oco in closed: continue
+            filled.add(oid)
+            if oco is not None: closed.add(oco)
+        for oid, o in list(self.orders.items()):
+            if oid in filled or (o[4] is not None and o[4] in closed): del self.orders[oid]
+        return filled
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_engine_matches_naive_model(seed):
+    # Integer prices keep the engine's and the model's trailing-stop arithmetic exact.
+    rng = np.random.default_rng(seed)
+    engine, model = MatchingEngine(), NaiveBook()
+    tickers = ['AAA', 'BBB', 'CCC']
+    last = {t: 1000.0 for t in tickers}
+    filled = 0
+    for step in range(400):
+        ticker = tickers[rng.integers(len(tickers))]
+        if rng.random() < 0.3:
+            ref = last[ticker]
+            offsets = rng.integers(1, 60, 3).astype(float)
+            which = rng.random(3) < 0.7
+            orders = engine.place_bracket(ticker, 10, ref - offsets[0] if which[0] else None, ref + offsets[1] if which[1] else None,
+                                          offsets[2] if which[2] else None, ref_price=ref)
+            for order in orders: model.place(order, ref)
+        elif rng.random() < 0.1:
+            order = engine.place(ticker, BUY, LIMIT if rng.random() < 0.5 else STOP, 5, float(last[ticker] + rng.integers(-40, 40)))
+            model.place(order, None)
+        elif rng.random() < 0.05 and engine.orders:
+            oid = list(engine.orders)[rng.integers(len(engine.orders))]
+            engine.cancel(oid)
+            del model.orders[oid]
+        else:
+            last[ticker] = float(max(1, last[ticker] + rng.integers(-25, 26)))
+            fills = engine.on_price(ticker, last[ticker])
+            assert {order.id for order, _ in fills} == model.on_price(ticker, last[ticker]), step
+            assert all(price == last[ticker] for _, price in fills)
+            filled += len(fills)
+    assert set(engine.orders) == set(model.orders) and filled > 20
+
+
+def test_bracket_fills_once_and_cancels_siblings():
+    engine = MatchingEngine()
+    stop, limit, trail = engine.place_bracket('AAA', 10, 90.0, 120.0, 5.0, ref_price=100.0)
+    assert engine.on_price('AAA', 110.0) == []
+    fills = engine.on_price('AAA', 104.0)       # peak 110, trailing stop at 105
+    assert [order for order, _ in fills] == [trail]
+    assert not stop.active and not limit.active and engine.symbols() == []
+
+
+def test_cancelling_one_leg_keeps_the_rest_of_the_bracket():
+    engine = MatchingEngine()
+    stop, limit, trail = engine.place_bracket('AAA', 10, 90.0, 120.0, 5.0, ref_price=100.0)
+    engine.cancel(stop.id)
+    assert not stop.active and limit.active and trail.active
+    replacement = engine.place('AAA', SELL, STOP, 10, 95.0, stop.oco)
+    assert engine.on_price('AAA', 89.0) == [(replacement, 89.0)]       # the old stop no longer fires
+    assert not limit.active and not trail.active and engine.symbols() == []
+
+
+def test_trailing_stop_is_sell_only():
+    with pytest.raises(ValueError):
+        MatchingEngine().place('AAA', BUY, TRAILING, 1, 5.0)
+
+
+def test_cancel_ticker_drops_all_its_orders():
+    engine = MatchingEngine()
+    engine.place_bracket('AAA', 10, 90.0, 120.0)
+    engine.place_bracket('BBB', 10, 90.0, 120.0)
+    engine.cancel_ticker('AAA')
+    assert engine.on_price('AAA', 50.0) == [] and engine.symbols() == ['BBB']
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bar_store import BarStore
+from portfolio_analytics import PortfolioAnalytics
+from storage import Trade
+
+DAYS = pd.bdate_range('2024-01-01', periods=40)
+
+
+class FakeBars:
+    """Daily closes per ticker; records each batched request."""
+
+    def __init__(self, closes):
+        self.frames = {t: pd.DataFrame({'Close': c}, index=DAYS[:len(c)]) for t, c in closes.items()}
+        self.calls = []
+
+    def bars_many(self, tickers, interval, period=None, start=None):
+        self.calls.append(sorted(tickers))
+        return {t: self.frames[t].loc[start:] for t in tickers if t in self.frames}, {}
+
+
+def trade(i, day, side, ticker, shares, price, pl=0.0):
+    return Trade(i, pd.Timestamp(day).value, side, ticker, shares, price, pl)
+
+
+TRADES = [
+    trade(1, '2024-01-03 10:00', 'BUY', 'AAA', 10, 100.0),
+    trade(2, '2024-01-06 12:00', 'BUY', 'BBB', 5, 50.0),           # a Saturday
+    trade(3, '2024-01-17 10:00', 'SELL', 'AAA', 4, 115.0, 60.0),
+    trade(4, '2024-01-24 10:00', 'BUY', 'CCC', 2, 30.0),           # no bars: marked at its trade price
+]
+
+
+@pytest.fixture
+def bars():
+    return FakeBars({'AAA': 100.0 + np.arange(30), 'BBB': 50.0 - 0.5 * np.arange(30)})
+
+
+def test_equity_marks_every_holding_at_each_close(bars):
+    analytics = PortfolioAnalytics(bars).update(TRADES)
+    curve = analytics.curve(10000.0)
+    assert curve.index[0] == pd.Timestamp('2024-01-03') and curve.index[-1] == DAYS[29]
+    friday = DAYS.get_loc(pd.Timestamp('2024-01-05'))
+    assert curve.loc['2024-01-06', 'market_value'] == pytest.approx(10 * (100.0 + friday) + 5 * (50.0 - 0.5 * friday))   # the weekend trade marks at Friday's close
+    last = curve.iloc[-1]
+    assert last['cash'] == pytest.approx(10000.0 - 1000.0 - 250.0 + 460.0 - 60.0)
+    assert last['market_value'] == pytest.approx(6 * 129.0 + 5 * 35.5 + 2 * 30.0)
+    assert analytics.start_cash(last['cash']) == pytest.approx(10000.0)
+    frame = analytics.positions_frame({'AAA': 130.0})
+    assert frame.loc['AAA', ['shares', 'price', 'realized_pl']].tolist() == [6, 130.0, 60.0]
+    assert frame.loc['AAA', 'cost_basis'] == pytest.approx(600.0)
+
+
+def test_each_update_makes_one_batched_bar_request(bars):
+    analytics = PortfolioAnalytics(bars)
+    analytics.update(TRADES[:2]); analytics.update(TRADES)
+    assert bars.calls == [['AAA', 'BBB'], ['AAA', 'BBB', 'CCC']]
+
+
+def test_incremental_updates_match_a_single_pass(bars):
+    analytics = PortfolioAnalytics(bars)
+    for end in range(1, len(TRADES) + 1): analytics.update(TRADES[:end])
+    pd.testing.assert_frame_equal(analytics.curve(1e4), PortfolioAnalytics(bars).update(TRADES).curve(1e4))
+
+
+def test_trades_past_the_last_bar_wait_for_it(bars):
+    bars.frames = {t: f.iloc[:10] for t, f in bars.frames.items()}
+    analytics = PortfolioAnalytics(bars).update(TRADES[:3])
+    assert analytics.positions[-1].tolist() == [6, 5]       # the calendar grows to the trade's own day
+    bars.frames = FakeBars({'AAA': 100.0 + np.arange(30), 'BBB': 50.0 - 0.5 * np.arange(30)}).frames
+    analytics.update(TRADES[:3])
+    pd.testing.assert_frame_equal(analytics.curve(1e4), PortfolioAnalytics(bars).update(TRADES[:3]).curve(1e4))
+
+
+def test_stats_summarize_the_curve(bars):
+    analytics = PortfolioAnalytics(bars).update(TRADES)
+    stats, curve = analytics.stats(1e4), analytics.curve(1e4)
+    assert stats['total_return'] == pytest.approx(curve['equity'].iloc[-1] / curve['equity'].iloc[0] - 1)
+    assert stats['max_drawdown'] == pytest.approx(curve['drawdown'].min()) and stats['max_drawdown'] <= 0
+
+
+def test_the_bar_store_fetches_every_holding_in_one_request(tmp_path, synthetic_quotes):
+    store = BarStore(root=str(tmp_path), source=synthetic_quotes)
+    history = [trade(i, '2024-03-01 10:00', 'BUY', f'SYN{i:04d}', 1, 10.0) for i in range(1, 6)]
+    analytics = PortfolioAnalytics(store).update(history)
+    assert store.fetches == 1 and (analytics.closes[-1] != 10.0).all()
+    analytics.update(history + [trade(6, '2024-03-04 10:00', 'BUY', 'SYN0001', 1, 10.0)])
+    assert store.fetches == 1       # stored and fresh: nothing to fetch
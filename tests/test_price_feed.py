@@ -0,0 +1,82 @@
+import threading
+import time
+import types
+
+import pytest
+
+import price_feed as price_feed_module
+from price_feed import HISTORY, PriceFeed, SimulatedTickSource
+
+
+class RecordingSource(SimulatedTickSource):
+    def __init__(self):
+        super().__init__(seed=1)
+        self.requests = []
+
+    async def fetch(self, symbols, max_age):
+        self.requests.append((sorted(symbols), max_age))
+        return await super().fetch(symbols, max_age)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(price_feed_module, 'time', types.SimpleNamespace(monotonic=lambda: clock.now, time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def feed(clock):
+    feed = PriceFeed(RecordingSource(), lease=10)
+    feed._thread = threading.current_thread()       # keep the loop from starting; tests drive it by hand
+    return feed
+
+
+def test_a_symbol_is_polled_once_for_all_owners_at_the_shortest_interval(feed, clock):
+    feed.subscribe('aaa', 'one', interval=5)
+    feed.subscribe('AAA', 'two', interval=2)
+    feed.subscribe('BBB', 'one', interval=0.1)
+    assert feed._due_symbols(clock.now) == {'AAA': 2.0, 'BBB': 1.0}
+    assert feed._due_symbols(clock.now + 1) == {'BBB': 1.0}
+    assert feed._due_symbols(clock.now + 2) == {'AAA': 2.0, 'BBB': 1.0}
+
+
+def test_lapsed_leases_are_dropped_with_their_symbol(feed, clock):
+    feed.subscribe('AAA', 'one', interval=1)
+    feed.subscribe('AAA', 'two', interval=5)        # leases last at least three intervals
+    feed._due_symbols(clock.now)
+    assert feed._due_symbols(clock.now + 11) == {'AAA': 5.0}
+    clock.now += 14
+    feed.subscribe('AAA', 'one', interval=1)
+    assert feed._due_symbols(clock.now + 2) == {'AAA': 1.0}
+    feed._due_symbols(clock.now + 11)
+    assert feed.symbols() == [] and feed._due == {}
+
+
+def test_changes_since_returns_only_newer_ticks(feed, clock):
+    feed._publish({'AAA': 10.0, 'BBB': 20.0}, clock.now)
+    changed, version = feed.changes_since(0)
+    assert set(changed) == {'AAA', 'BBB'} and version == 2
+    feed._publish({'AAA': 10.0, 'BBB': 21.0}, clock.now)      # an unchanged price is not a tick
+    changed, version = feed.changes_since(version)
+    assert list(changed) == ['BBB'] and (changed['BBB'].price, changed['BBB'].prev) == (21.0, 20.0)
+    assert feed.changes_since(version) == ({}, version)
+
+
+def test_history_keeps_the_newest_ticks(feed, clock):
+    for i in range(HISTORY + 5):
+        clock.now += 1
+        feed._publish({'AAA': float(i)}, clock.now)
+    history = feed.history('aaa')
+    assert len(history) == HISTORY and history[-1] == (clock.now, HISTORY + 4.0) and history[0][1] == 5.0
+
+
+def test_the_loop_polls_subscribed_symbols_in_the_background():
+    source = RecordingSource()
+    feed = PriceFeed(source)
+    for owner in range(5): feed.subscribe('AAA', owner)
+    deadline = time.monotonic() + 5
+    while feed.latest('AAA') is None and time.monotonic() < deadline: time.sleep(0.01)
+    feed.stop()
+    assert feed.latest('AAA').price == source.prices['AAA']
+    assert source.requests[0] == (['AAA'], 1.0) and len(source.requests) == feed.polls
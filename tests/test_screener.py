@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bar_store import BarStore
+from indicators import ema, rsi, sma
+from screener import bars_since_cross, screen
+
+
+class FakeBars:
+    """Daily bars per ticker; records each batched request."""
+
+    def __init__(self, frames):
+        self.frames, self.calls = frames, []
+
+    def bars_many(self, tickers, interval, period=None, start=None):
+        self.calls.append((list(tickers), interval, period))
+        return {t: self.frames[t] for t in tickers if t in self.frames}, {t: KeyError(t) for t in tickers if t not in self.frames}
+
+
+def daily(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame({'Close': close, 'Volume': rng.lognormal(14, 0.5, n).round()}, index=pd.bdate_range(end='2024-06-28', periods=n))
+
+
+def test_screen_reads_each_symbols_latest_indicators():
+    frames = {'AAA': daily(300, 1), 'BBB': daily(120, 2), 'CCC': daily(0, 3)}
+    bars = FakeBars(frames)
+    table, errors = screen(['AAA', 'BBB', 'CCC', 'DDD'], bars=bars)
+    assert len(bars.calls) == 1 and list(table.index) == ['AAA', 'BBB'] and set(errors) == {'CCC', 'DDD'}
+    for ticker in table.index:
+        close, volume, row = frames[ticker]['Close'].to_numpy(), frames[ticker]['Volume'].to_numpy(), table.loc[ticker]
+        assert row['as_of'] == frames[ticker].index[-1] and row['price'] == close[-1]
+        assert row['change_pct'] == pytest.approx((close[-1] / close[-2] - 1) * 100)
+        assert row['volume_ratio'] == pytest.approx(volume[-1] / volume[-21:-1].mean())
+        assert row['RSI_14'] == pytest.approx(rsi(close)[-1]) and row['EMA_20'] == pytest.approx(ema(close, 20)[-1])
+    assert table.loc['AAA', 'SMA_200'] == pytest.approx(sma(frames['AAA']['Close'], 200)[-1]) and np.isnan(table.loc['BBB', 'SMA_200'])
+    assert table.loc['AAA', 'SMA_50>SMA_200'] is not pd.NA and table.loc['BBB', 'SMA_50>SMA_200'] is pd.NA
+
+
+def test_bars_since_cross_counts_back_to_the_latest_flip():
+    fast = np.array([[1.0, 1.0, np.nan], [3.0, 1.0, np.nan], [3.0, 1.0, 2.0], [1.0, 1.0, 3.0], [1.0, 1.0, 3.0]])
+    slow = np.full_like(fast, 2.0)
+    ago = bars_since_cross(fast, slow)
+    assert ago[0] == 1 and np.isnan(ago[1])    # the cross back down, not the earlier one up; column 1 never crosses
+    assert ago[2] == 1                                  # warm-up bars are skipped; touching then rising is a flip
+
+
+def test_the_whole_watchlist_is_fetched_in_one_request(tmp_path, synthetic_quotes):
+    store = BarStore(root=str(tmp_path), source=synthetic_quotes)
+    tickers = [f'SYN{i:04d}' for i in range(8)]
+    table, errors = screen(tickers, bars=store)
+    assert store.fetches == 1 and not errors and list(table.index) == tickers
+    screen(tickers, bars=store)
+    start = synthetic_quotes.provider.anchor - pd.Timedelta(days=30)
+    frames, _ = store.bars_many(tickers + ['SYN0100'], "1d", start=start)
+    assert store.fetches == 2       # only the new symbol is short of history
+    assert all(f.index[0] >= start and f.index[0] - start < pd.Timedelta(days=4) for f in frames.values())
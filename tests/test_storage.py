@@ -0,0 +1,71 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from storage import AccountStore, Trade
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AccountStore(str(tmp_path / "accounts.db"))
+
+
+def fill(side, ticker, shares, price, stop_loss=None, take_profit=None, trailing_stop=None, time=None):
+    return (side, ticker, shares, price, stop_loss, take_profit, trailing_stop, time)
+
+
+def test_batch_applies_in_order_and_rejections_do_not_stop_it(store):
+    account_id, created = store.open_account("a", cash=1000.0)
+    assert created
+    results = store.execute(account_id, [
+        fill('BUY', 'AAA', 5, 100.0, stop_loss=90.0),
+        fill('BUY', 'BBB', 10, 100.0),                  # 1000 > 500 left
+        fill('SELL', 'CCC', 1, 10.0),                   # nothing held
+        fill('BUY', 'AAA', 5, 80.0, take_profit=120.0),
+        fill('SELL', 'AAA', 4, 110.0),
+    ])
+    assert [type(r).__name__ for r in results] == ['Trade', 'ValueError', 'ValueError', 'Trade', 'Trade']
+    assert str(results[1]) == "Not enough cash." and str(results[2]) == "Not enough shares to sell."
+    assert results[4].profit_loss == pytest.approx((110.0 - 90.0) * 4)
+    cash, version = store.status(account_id)
+    assert cash == pytest.approx(1000.0 - 500.0 - 400.0 + 440.0) and version == 1      # one bump per batch
+    assert store.portfolio(account_id) == {'AAA': {'shares': 6, 'avg_price': 90.0, 'stop_loss': None, 'take_profit': 120.0, 'trailing_stop': None}}
+
+
+def test_trades_round_trip_as_records(store):
+    account_id, _ = store.open_account("a")
+    when = pd.Timestamp('2024-05-01 10:30:15.123456').value
+    written = store.execute(account_id, [fill('BUY', 'AAA', 3, 10.0, time=when), fill('SELL', 'AAA', None, 12.0, time=when)])
+    trades, last_id = store.trades(account_id)
+    assert trades == written and last_id == written[-1].id
+    assert trades[1] == Trade(written[1].id, when, 'SELL', 'AAA', 3, 12.0, 6.0)
+    assert store.trades(account_id, last_id) == ([], last_id)
+    assert store.portfolio(account_id) == {}
+
+
+def test_failed_batch_leaves_the_account_untouched(store):
+    account_id, _ = store.open_account("a", cash=100.0)
+    assert isinstance(store.execute(account_id, [fill('BUY', 'AAA', 2, 100.0)])[0], ValueError)
+    assert store.status(account_id) == (100.0, 0) and store.trades(account_id) == ([], 0)
+    with pytest.raises(ValueError): store.sell(account_id, 'AAA', 1, 10.0)
+
+
+def test_concurrent_writers_serialize(store):
+    account_id, _ = store.open_account("a", cash=1000.0)
+    buy = lambda: [store.buy(account_id, 'AAA', 1, 1.0) for _ in range(50)]
+    threads = [threading.Thread(target=buy) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    cash, version = store.status(account_id)
+    trades, _ = store.trades(account_id)
+    assert cash == pytest.approx(800.0) and version == 200 and store.portfolio(account_id)['AAA']['shares'] == 200
+    assert len({t.id for t in trades}) == 200
+
+
+def test_import_state_loads_a_legacy_dump(store):
+    account_id, _ = store.open_account("a")
+    store.import_state(account_id, {'cash_balance': 50.0, 'portfolio': {'AAA': {'shares': 2, 'avg_price': 9.0}},
+                                    'trade_history': [{'timestamp': '2024-01-02T10:00:00', 'type': 'BUY', 'ticker': 'AAA', 'shares': 2, 'price': 9.0}]})
+    trades, _ = store.trades(account_id)
+    assert store.status(account_id)[0] == 50.0 and trades[0].time == pd.Timestamp('2024-01-02 10:00').value and trades[0].profit_loss == 0
@@ -0,0 +1,82 @@
+import json
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from tracing import Tracer, payload_bytes
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    tracer = Tracer()
+    tracer.profiling, tracer.export_path = False, str(tmp_path / "traces.jsonl")
+    return tracer
+
+
+def test_spans_nest_and_counters_land_in_the_active_trace(tracer):
+    tracer.count('cache.hit')               # outside any trace: totals only
+    tracer.begin('rerun', key='session-1')
+    with tracer.span('load', ticker='AAA'):
+        with tracer.span('fetch'): tracer.count('cache.miss'); tracer.count('bytes', 512)
+    tracer.count('cache.hit')
+    trace = tracer.end()
+    assert [(s.name, s.depth) for s in trace.spans] == [('load', 0), ('fetch', 1)]
+    assert trace.spans[0].attrs == {'ticker': 'AAA'} and trace.spans[0].duration >= trace.spans[1].duration
+    assert trace.counters == {'cache.miss': 1, 'bytes': 512, 'cache.hit': 1}
+    assert tracer.totals['cache.hit'] == 2 and tracer.current() is None and trace.status == 'ok'
+
+
+def test_a_rerun_cut_short_is_closed_when_the_session_reruns(tracer):
+    first = tracer.begin('rerun', key='session-1')
+    tracer.begin('rerun', key='session-2')
+    second = tracer.begin('rerun', key='session-1')
+    assert first.status == 'interrupted' and list(tracer.traces) == [first]
+    assert tracer.end() is second and tracer._open.keys() == {'session-2'}
+
+
+def test_root_spans_trace_fragments_and_record_errors(tracer):
+    with tracer.span('outside'): pass
+    assert not tracer.traces
+    with pytest.raises(KeyError):
+        with tracer.span('fragment', root=True):
+            with tracer.span('draw'): raise KeyError('x')
+    (trace,) = tracer.traces
+    assert trace.name == 'fragment' and trace.status == 'KeyError' and trace.spans[1].attrs == {'error': 'KeyError'}
+    assert tracer.span_totals['outside'][0] == 1 and tracer.span_totals['draw'][0] == 1
+
+
+def test_finished_traces_are_exported_as_json_lines(tracer):
+    tracer.begin('rerun', key='s')
+    with tracer.span('load'): tracer.count('cache.miss')
+    tracer.end()
+    with open(tracer.export_path) as f: (line,) = f.readlines()
+    record = json.loads(line)
+    assert (record['name'], record['key'], record['status'], record['counters']) == ('rerun', 's', 'ok', {'cache.miss': 1})
+    assert [s['name'] for s in record['spans']] == ['load'] and tracer.jsonl() == line
+
+
+def test_prometheus_renders_the_process_totals(tracer):
+    tracer.count('cache.hit', 3)
+    tracer.begin('rerun')
+    with tracer.span('load'): pass
+    tracer.end()
+    text = tracer.prometheus()
+    assert 'odyssey_events_total{name="cache.hit"} 3\n' in text
+    assert 'odyssey_span_seconds_count{span="load"} 1\n' in text and 'odyssey_rerun_seconds_count 1\n' in text
+
+
+def test_profiling_keeps_samples_for_the_slowest_reruns(tracer):
+    tracer.profiling = True
+    tracer.begin('rerun')
+    deadline = time.perf_counter() + 0.1
+    while time.perf_counter() < deadline: pass
+    trace = tracer.end()
+    assert tracer.slowest == [trace] and any('test_tracing.py' in stack for stack in trace.profile)
+    assert not any(t.name == 'trace-sampler' for t in threading.enumerate())
+
+
+def test_payload_bytes_sizes_frames_and_dicts():
+    assert payload_bytes(None) == 0 and payload_bytes({'a': 1}) == len('{"a": 1}')
+    assert payload_bytes(pd.DataFrame({'Close': [1.0, 2.0]})) > 0
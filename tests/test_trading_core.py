@@ -0,0 +1,46 @@
+import pytest
+
+from storage import AccountStore
+from trading_core import Account, OrderRequest, TradingCore
+
+
+@pytest.fixture
+def core(tmp_path, synthetic_quotes):
+    return TradingCore(AccountStore(str(tmp_path / "accounts.db")), synthetic_quotes, hours=None)
+
+
+def test_orders_are_validated_priced_and_filled(core):
+    account, _ = core.open("a")
+    results = account.submit_many([
+        OrderRequest('BUY', 'SYN0001', 2),                              # priced from the quote cache
+        OrderRequest('BUY', 'SYN0001', 1, 50.0, stop_loss=60.0),
+        OrderRequest('BUY', 'SYN0001', 0, 50.0),
+        OrderRequest('HOLD', 'SYN0001', 1, 50.0),
+        OrderRequest('SELL', 'SYN0001', None, 55.0),
+    ])
+    assert [str(r.error) if r.error else None for r in results] == [None, "Stop-Loss must be below current price.", "Shares must be a positive whole number.", "Unknown order side 'HOLD'.", None]
+    assert results[0].trade.price > 0 and results[4].trade.shares == 2
+    assert account.positions == {} and len(account.trades) == 2
+
+
+def test_closed_market_rejects_everything(core):
+    core.hours = lambda: False
+    account, _ = core.open("a")
+    assert str(account.submit(OrderRequest('BUY', 'SYN0001', 1, 10.0)).error) == "Market is closed."
+    assert account.check_orders({'SYN0001': 1.0}) == []
+
+
+def test_protective_orders_fill_through_the_core(core):
+    account, _ = core.open("a")
+    account.buy('SYN0001', 4, 50.0, stop_loss=45.0)
+    (order, result), = account.check_orders({'SYN0001': 44.0})
+    assert order.kind == 'stop' and result.trade.price == 44.0 and result.trade.shares == 4
+    assert account.positions == {} and account.engine.symbols() == []
+
+
+def test_other_sessions_writes_are_picked_up_by_sync(core):
+    mine, _ = core.open("a")
+    theirs = Account(core, mine.id, "a")
+    theirs.sync()
+    mine.buy('SYN0001', 3, 10.0)
+    assert theirs.sync() and theirs.positions['SYN0001']['shares'] == 3 and not theirs.sync()
@@ -0,0 +1,239 @@
+"""Per-rerun tracing: nested timing spans, counters and an opt-in profiler.
+
+A trace covers one script rerun (``begin``/``end``) or one fragment rerun
+(a ``root`` span).  Inside it, ``span`` times a block and records where it
+sits in the call tree, and ``count`` bumps a named counter such as cache
+hits, misses or payload bytes.  Spans and counters are also folded into
+process-wide totals, which ``prometheus`` renders in the Prometheus text
+format; code running outside any trace (worker threads, the price feed)
+only contributes to those totals.
+
+Finished traces are kept in a ring buffer and, when ODYSSEY_TRACE_FILE is
+set, appended to that file as JSON lines.  With profiling switched on
+(ODYSSEY_PROFILE, or ``tracer.profiling = True``), a sampler thread records
+the script thread's stack every few milliseconds, and the collapsed stacks
+are kept for the slowest reruns.  ODYSSEY_METRICS_PORT serves the
+Prometheus metrics over HTTP.
+"""
+import collections
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+KEEP_TRACES = 200
+KEEP_SLOWEST = 5
+SAMPLE_INTERVAL = 0.005     # seconds between profiler samples
+MAX_STACK = 40              # frames kept per sample, innermost last
+
+
+class Span:
+    __slots__ = ('name', 'depth', 'start', 'duration', 'attrs')
+
+    def __init__(self, name, depth, start, attrs):
+        self.name, self.depth, self.start, self.duration, self.attrs = name, depth, start, None, attrs
+
+
+class Trace:
+    """One rerun's spans and counters; ``status`` is None until it finishes."""
+
+    def __init__(self, name, key=None):
+        self.name, self.key = name, key
+        self.wall = time.time()
+        self.started = self.last_activity = time.perf_counter()
+        self.duration = None
+        self.status = None
+        self.spans = []
+        self.counters = collections.Counter()
+        self.stack = []
+        self.profile = None     # collapsed stack -> samples, kept only for the slowest traces
+
+    def to_dict(self):
+        return {'name': self.name, 'key': self.key, 'at': self.wall, 'duration': self.duration, 'status': self.status,
+                'spans': [{'name': s.name, 'depth': s.depth, 'offset': s.start - self.started, 'duration': s.duration, **s.attrs} for s in self.spans],
+                'counters': dict(self.counters)}
+
+
+class _Sampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval until stopped."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(name="trace-sampler", daemon=True)
+        self.thread_id, self.interval = thread_id, interval
+        self.samples = collections.Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack: self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set(); self.join()
+        return self.samples
+
+
+class Tracer:
+    """Process-wide trace registry; the active trace is tracked per thread."""
+
+    def __init__(self):
+        self.profiling = bool(os.environ.get("ODYSSEY_PROFILE"))
+        self.export_path = os.environ.get("ODYSSEY_TRACE_FILE")
+        self.traces = collections.deque(maxlen=KEEP_TRACES)
+        self.slowest = []                       # the KEEP_SLOWEST longest traces, slowest first
+        self.totals = collections.Counter()     # counter name -> process-wide total
+        self.span_totals = {}                   # span name -> [count, seconds]
+        self.reruns = [0, 0.0]                  # finished traces, seconds
+        self._open = {}                         # key -> unfinished trace
+        self._samplers = {}                     # trace id -> _Sampler
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def current(self):
+        return getattr(self._local, 'trace', None)
+
+    def begin(self, name, key=None):
+        """Starts a trace on this thread; an unfinished trace with the same ``key`` is closed as interrupted.
+
+        Reruns cut short by ``st.rerun()`` or ``st.stop()`` never reach their
+        ``end``, so they are closed when the session's next rerun begins.
+        """
+        with self._lock: stale = self._open.pop(key, None) if key is not None else None
+        if stale is not None: self._finish(stale, "interrupted", stale.last_activity)
+        trace = Trace(name, key)
+        if key is not None:
+            with self._lock: self._open[key] = trace
+        self._local.trace = trace
+        if self.profiling:
+            sampler = _Sampler(threading.get_ident())
+            self._samplers[id(trace)] = sampler; sampler.start()
+        return trace
+
+    def end(self, status="ok"):
+        trace = self.current()
+        if trace is None: return None
+        self._local.trace = None
+        if trace.key is not None:
+            with self._lock:
+                if self._open.get(trace.key) is trace: del self._open[trace.key]
+        return self._finish(trace, status, time.perf_counter())
+
+    def _finish(self, trace, status, finished):
+        trace.status, trace.duration = status, finished - trace.started
+        sampler = self._samplers.pop(id(trace), None)
+        profile = sampler.stop() if sampler is not None else None
+        with self._lock:
+            self.traces.append(trace)
+            self.reruns[0] += 1; self.reruns[1] += trace.duration
+            if profile is not None and (len(self.slowest) < KEEP_SLOWEST or trace.duration > self.slowest[-1].duration):
+                trace.profile = profile
+                self.slowest = sorted(self.slowest + [trace], key=lambda t: t.duration, reverse=True)[:KEEP_SLOWEST]
+        if self.export_path:
+            try:
+                with open(self.export_path, 'a') as f: f.write(json.dumps(trace.to_dict(), default=str) + '\n')
+            except OSError:
+                pass    # tracing must never break a rerun
+        return trace
+
+    @contextmanager
+    def span(self, name, root=False, **attrs):
+        """Times the enclosed block as ``name``.
+
+        With no active trace the block is only counted in the process-wide
+        totals, unless ``root`` is set, in which case it becomes its own
+        trace (used for fragment reruns).
+        """
+        trace = self.current()
+        owned = trace is None and root
+        if owned: trace = self.begin(name)
+        span = None
+        if trace is not None:
+            span = Span(name, len(trace.stack), time.perf_counter(), attrs)
+            trace.spans.append(span); trace.stack.append(span)
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield span
+        except BaseException as e:
+            status = type(e).__name__
+            if span is not None: span.attrs['error'] = status
+            raise
+        finally:
+            now = time.perf_counter()
+            with self._lock:
+                total = self.span_totals.setdefault(name, [0, 0.0])
+                total[0] += 1; total[1] += now - start
+            if span is not None:
+                span.duration = now - start
+                trace.stack.pop(); trace.last_activity = now
+            if owned: self.end(status)
+
+    def count(self, name, n=1):
+        """Adds ``n`` to counter ``name`` in the process totals and the active trace."""
+        with self._lock: self.totals[name] += n
+        trace = self.current()
+        if trace is not None: trace.counters[name] += n
+
+    # --- Export ---
+    def jsonl(self):
+        with self._lock: traces = list(self.traces)
+        return ''.join(json.dumps(t.to_dict(), default=str) + '\n' for t in traces)
+
+    def prometheus(self):
+        """Process-wide counters and span timings in the Prometheus text exposition format."""
+        with self._lock:
+            totals, spans, reruns = dict(self.totals), {k: list(v) for k, v in self.span_totals.items()}, list(self.reruns)
+        lines = ["# TYPE odyssey_events_total counter"]
+        lines += [f'odyssey_events_total{{name="{name}"}} {value}' for name, value in sorted(totals.items())]
+        lines += ["# TYPE odyssey_span_seconds summary"]
+        for name, (n, seconds) in sorted(spans.items()):
+            lines += [f'odyssey_span_seconds_count{{span="{name}"}} {n}', f'odyssey_span_seconds_sum{{span="{name}"}} {seconds:.6f}']
+        lines += ["# TYPE odyssey_rerun_seconds summary", f"odyssey_rerun_seconds_count {reruns[0]}", f"odyssey_rerun_seconds_sum {reruns[1]:.6f}"]
+        return '\n'.join(lines) + '\n'
+
+
+def payload_bytes(payload):
+    """Approximate size of a decoded upstream payload (dict or DataFrame).
+
+    The providers don't expose wire sizes, so this is the closest proxy for
+    bytes transferred.
+    """
+    if payload is None: return 0
+    if hasattr(payload, 'memory_usage'): return int(payload.memory_usage(index=True).sum())
+    try:
+        return len(json.dumps(payload, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def start_metrics_server(port):
+    """Serves ``tracer.prometheus()`` at http://0.0.0.0:<port>/metrics from a daemon thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = tracer.prometheus().encode()
+            self.send_response(200 if self.path.rstrip('/') in ('', '/metrics') else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4"); self.send_header("Content-Length", str(len(body)))
+            self.end_headers(); self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+tracer = Tracer()
+if os.environ.get("ODYSSEY_METRICS_PORT"):
+    try:
+        start_metrics_server(int(os.environ["ODYSSEY_METRICS_PORT"]))
+    except OSError:
+        pass    # another app process on this host already serves the port
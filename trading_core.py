@@ -0,0 +1,202 @@
+"""Headless trading core: accounts, positions, order submission and fills.
+
+Everything that changes an account goes through ``TradingCore.execute``:
+the app's order form, its stop-loss / take-profit / trailing-stop fills
+and any script or service importing this module.  ``execute`` takes a
+batch of ``OrderRequest``s, rejects them all when the market is closed,
+prices the ones without a limit price with one quote-cache batch, checks
+each one, and hands the survivors to ``AccountStore.execute`` as a single
+transaction.  Each order gets an ``OrderResult`` holding either the
+``Trade`` it produced or the ValueError that rejected it, so one bad order
+never sinks the batch.
+
+``Account`` is a client-side view of one account (cash, positions, trades)
+that re-reads storage only when the account's version moved, plus the
+matching engine for its protective orders.  The app keeps one per session.
+"""
+from datetime import datetime
+from typing import NamedTuple
+
+import pytz
+
+from market_data import quote_cache
+from order_engine import BUY, SELL, MatchingEngine
+from storage import Trade, account_store
+from tracing import tracer
+
+
+def market_open():
+    """Checks if the NYSE market is open."""
+    now = datetime.now(pytz.timezone('US/Eastern'))
+    # Market is open 9:30 AM to 4:00 PM ET, Mon-Fri
+    return not (now.weekday() > 4 or now.hour < 9 or (now.hour == 9 and now.minute < 30) or now.hour >= 16)
+
+
+class OrderRequest(NamedTuple):
+    """A market order.  ``price=None`` fills at the current quote; ``shares=None`` sells the whole position.
+
+    The protective fields apply to buys and replace the position's existing
+    ones; ``time`` is int64 ns local wall-clock time, None for now.
+    """
+    side: str
+    ticker: str
+    shares: int
+    price: float = None
+    stop_loss: float = None
+    take_profit: float = None
+    trailing_stop: float = None
+    time: int = None
+
+
+class OrderResult(NamedTuple):
+    """The outcome of one OrderRequest: the Trade it produced, or the ValueError that rejected it."""
+    order: OrderRequest
+    trade: Trade = None
+    error: ValueError = None
+
+
+def _check(order, price):
+    """Returns why ``order`` cannot fill at ``price``, or None."""
+    if order.side not in (BUY, SELL): return f"Unknown order side {order.side!r}."
+    closing = order.side == SELL and order.shares is None
+    if not closing and (order.shares is None or order.shares <= 0 or order.shares % 1): return "Shares must be a positive whole number."
+    if not price or price <= 0: return f"No price for {order.ticker}."
+    if order.side == BUY:
+        if order.stop_loss is not None and order.stop_loss >= price: return "Stop-Loss must be below current price."
+        if order.take_profit is not None and order.take_profit <= price: return "Take-Profit must be above current price."
+        if order.trailing_stop is not None and order.trailing_stop <= 0: return "Trailing stop must be positive."
+    return None
+
+
+class TradingCore:
+    """Order validation and execution over an account store.
+
+    ``hours`` is the market-hours check; pass None to trade around the clock
+    (backtests, tests, benchmarks).
+    """
+
+    def __init__(self, store=account_store, quotes=quote_cache, hours=market_open):
+        self.store = store
+        self.quotes = quotes
+        self.hours = hours
+
+    def is_open(self):
+        return self.hours is None or self.hours()
+
+    # --- Accounts ---
+    def open(self, name):
+        """Returns (Account, created) for ``name``, creating the account if needed."""
+        account_id, created = self.store.open_account(name)
+        account = Account(self, account_id, name)
+        account.sync()
+        return account, created
+
+    def accounts(self):
+        return self.store.accounts()
+
+    # --- Orders ---
+    def execute(self, account_id, orders):
+        """Validates, prices and fills ``orders`` in one transaction; returns an OrderResult per order, in order."""
+        orders = list(orders)
+        if not self.is_open(): return [OrderResult(order, None, ValueError("Market is closed.")) for order in orders]
+        unpriced = {order.ticker for order in orders if order.price is None}
+        prices = self.quotes.get_prices(unpriced)[0] if unpriced else {}
+        results, fills, pending = [None] * len(orders), [], []
+        for i, order in enumerate(orders):
+            price = prices.get(order.ticker) if order.price is None else order.price
+            error = _check(order, price)
+            if error: results[i] = OrderResult(order, None, ValueError(error)); continue
+            fills.append((order.side, order.ticker, order.shares, price, order.stop_loss, order.take_profit, order.trailing_stop, order.time))
+            pending.append(i)
+        if fills:
+            with tracer.span("core.execute", orders=len(fills)):
+                outcomes = self.store.execute(account_id, fills)
+            for i, outcome in zip(pending, outcomes):
+                results[i] = OrderResult(orders[i], None, outcome) if isinstance(outcome, ValueError) else OrderResult(orders[i], outcome)
+        tracer.count("core.orders", len(orders))
+        tracer.count("core.rejected", sum(result.error is not None for result in results))
+        return results
+
+
+class Account:
+    """One account's cash, positions and trades as last read from storage, plus its resting orders.
+
+    ``positions`` maps ticker -> {'shares', 'avg_price', 'stop_loss',
+    'take_profit', 'trailing_stop'}; ``trades`` holds Trade records in
+    execution order.  Call ``sync`` to pick up writes from other sessions.
+    """
+
+    def __init__(self, core, id, name):
+        self.core, self.id, self.name = core, id, name
+        self.cash, self.version, self.last_trade_id = 0.0, None, 0
+        self.positions, self.trades = {}, []
+        self._engine = None
+
+    def sync(self):
+        """Refreshes this view when another write has landed in storage; returns whether it did."""
+        store = self.core.store
+        self.cash, version = store.status(self.id)
+        if version == self.version: return False
+        old, new = self.positions, store.portfolio(self.id)
+        trades, self.last_trade_id = store.trades(self.id, self.last_trade_id)
+        self.positions = new; self.trades.extend(trades); self.version = version
+        if self._engine is not None:
+            # Re-place orders only for positions that changed, so untouched trailing stops keep their peaks.
+            for ticker in old.keys() | new.keys():
+                if old.get(ticker) == new.get(ticker): continue
+                self._engine.cancel_ticker(ticker)
+                if ticker in new: self._place(ticker, new[ticker])
+        return True
+
+    @property
+    def engine(self):
+        """The matching engine for the positions' protective orders, built on first use."""
+        if self._engine is None:
+            self._engine = MatchingEngine()
+            for ticker, data in self.positions.items(): self._place(ticker, data)
+        return self._engine
+
+    def _place(self, ticker, data):
+        self._engine.place_bracket(ticker, data['shares'], data['stop_loss'], data['take_profit'], data['trailing_stop'], ref_price=data['avg_price'])
+
+    # --- Orders ---
+    def submit_many(self, orders):
+        """Executes a batch of OrderRequests (see ``TradingCore.execute``) and syncs; returns their OrderResults."""
+        results = self.core.execute(self.id, orders)
+        if any(result.trade for result in results): self.sync()
+        return results
+
+    def submit(self, order):
+        return self.submit_many([order])[0]
+
+    def _fill(self, order):
+        result = self.submit(order)
+        if result.error: raise result.error
+        return result.trade
+
+    def buy(self, ticker, shares, price=None, stop_loss=None, take_profit=None, trailing_stop=None):
+        """Buys at ``price`` (the current quote if None); returns the Trade or raises ValueError."""
+        return self._fill(OrderRequest(BUY, ticker, shares, price, stop_loss, take_profit, trailing_stop))
+
+    def sell(self, ticker, shares, price=None):
+        """Sells at ``price`` (the current quote if None); returns the Trade or raises ValueError."""
+        return self._fill(OrderRequest(SELL, ticker, shares, price))
+
+    def check_orders(self, prices=None):
+        """Fills protective orders triggered by ``prices`` (fresh quotes if None); returns [(Order, OrderResult)].
+
+        A triggered order sells the whole position at the triggering tick's
+        price, which differs from the trigger when the price gaps through
+        it.  Its result carries an error when the position was already
+        closed, possibly by another session on this account.
+        """
+        if not self.core.is_open(): return []
+        engine = self.engine
+        if prices is None: prices, _ = self.core.quotes.get_prices(engine.symbols())
+        fills = engine.on_prices(prices)
+        if not fills: return []
+        results = self.submit_many([OrderRequest(SELL, order.ticker, None, price) for order, price in fills])
+        return [(order, result) for (order, _), result in zip(fills, results)]
+
+
+trading_core = TradingCore()